@@ -0,0 +1,141 @@
+""" Vectorized bulk generation of random Pokemon
+
+    Pokemon.__init__ rolls one Pokemon's EVs, IVs and nature with a few dozen
+    separate random calls and works its stats out one at a time. This module
+    rolls the spreads of any number of Pokemon at once as NumPy arrays, with
+    the same distribution as the per-object generator:
+        - EVs: the first five are uniform between 0 and 252, except that
+        once they add up to exactly 508 the rest are 0; the sixth is whatever
+        is left of 508, so it can fall outside 0-252 as it does in setEVs
+        - IVs: six independent values uniform between 0 and 31
+        - nature: uniform over the 25 natures
+        - species: uniform over rows 0-97, as picked by Player
+    The level 100 stats are then calculated for every Pokemon at once with
+    the same integer and floating point steps as Pokemon.setStats.
+
+    The arrays can be sampled directly; PokemonSpreads.pokemon(i) builds a
+    regular Pokemon from row i only when one is needed for a battle.
+"""
+
+import numpy as np
+from Constants import Data, Natures, Stats, ROSTER_SIZE
+from PokemonGenerator import Pokemon
+
+EV_TOTAL = 508
+EV_MAX = 252
+IV_MAX = 31
+
+def base_stats():
+    "The base stats of every row of the pokedex as an (n, 6) int array"
+    return np.array([[int(value) for value in row[4:10]]
+    for row in Data.pokedex_rows[1:]], dtype=np.int64)
+
+def random_evs(rng, n):
+    """ Rolls n EV spreads the way Pokemon.setEVs does.
+
+    Parameters:
+        rng (numpy Generator): where to draw from
+        n (int): the number of spreads
+
+    Returns:
+        An (n, 6) int array
+    """
+    draws = rng.integers(0, EV_MAX + 1, size=(n, 5))
+    spent = np.cumsum(draws, axis=1)
+    # setEVs stops drawing once exactly 508 has been handed out
+    done = np.zeros((n, 5), dtype=bool)
+    done[:, 1:] = np.logical_or.accumulate(spent[:, :-1] == EV_TOTAL, axis=1)
+    draws[done] = 0
+    evs = np.empty((n, 6), dtype=np.int64)
+    evs[:, :5] = draws
+    evs[:, 5] = EV_TOTAL - draws.sum(axis=1)
+    return evs
+
+def random_ivs(rng, n):
+    "Rolls n IV spreads the way Pokemon.setIVs does, as an (n, 6) int array"
+    return rng.integers(0, IV_MAX + 1, size=(n, 6))
+
+def level_100_stats(bases, evs, ivs, natures):
+    """ Calculates level 100 stats the way Pokemon.setStats does.
+
+    Parameters:
+        bases (int array): (n, 6) base stats
+        evs (int array): (n, 6) EVs
+        ivs (int array): (n, 6) IVs
+        natures (int array): (n,) nature ids
+
+    Returns:
+        An (n, 6) int array, in Stats.stat_list order
+    """
+    # // floors like math.floor(ev/4), also for a negative sixth EV
+    raw = 2 * bases + ivs + evs // 4
+    stats = np.empty_like(raw)
+    stats[:, 0] = raw[:, 0] + 115
+    others = (raw[:, 1:] + 5) * np.array(Natures.multipliers)[natures]
+    stats[:, 1:] = np.floor(others).astype(np.int64)
+    return stats
+
+class PokemonSpreads:
+    """ The species, EVs, IVs, natures and stats of many Pokemon, as arrays
+    with one row per Pokemon.
+
+    Attributes:
+        dexnos (int array) = (n,) the row of each Pokemon's species
+        evs (int array) = (n, 6) EVs, in Stats.stat_list order
+        ivs (int array) = (n, 6) IVs
+        natures (int array) = (n,) indexes into Natures.nature_list
+        stats (int array) = (n, 6) level 100 stats
+    """
+    def __init__(self, dexnos, evs, ivs, natures, stats=None):
+        self.dexnos = np.asarray(dexnos, dtype=np.int64)
+        self.evs = np.asarray(evs, dtype=np.int64)
+        self.ivs = np.asarray(ivs, dtype=np.int64)
+        self.natures = np.asarray(natures, dtype=np.int64)
+        if stats is None:
+            stats = level_100_stats(base_stats()[self.dexnos], self.evs,
+            self.ivs, self.natures)
+        self.stats = stats
+
+    @classmethod
+    def generate(cls, n, dexno=None, seed=None):
+        """ Rolls n random Pokemon.
+
+        Parameters:
+            n (int): the number of Pokemon
+            dexno (int or int array): the species of every Pokemon, or of
+            each one; uniform over rows 0-97 if None
+            seed (int): seed for NumPy's random generator
+
+        Returns:
+            A PokemonSpreads
+        """
+        rng = np.random.default_rng(seed)
+        if dexno is None:
+            dexnos = rng.integers(0, ROSTER_SIZE, size=n)
+        else:
+            dexnos = np.broadcast_to(np.asarray(dexno, dtype=np.int64), (n,))
+        return cls(dexnos, random_evs(rng, n), random_ivs(rng, n),
+        rng.integers(0, len(Natures.nature_list), size=n))
+
+    def __len__(self):
+        return len(self.dexnos)
+
+    def stat(self, name):
+        "The column of one stat, by its name in Stats.stat_list"
+        return self.stats[:, Stats.stat_list.index(name)]
+
+    def pokemon(self, index, events=None, rng=None):
+        """ Builds the Pokemon in one row. Its moves and types come from its
+        species, as for any other Pokemon.
+
+        Parameters:
+            index (int): the row
+            events (sink), rng (random number stream): as for Pokemon
+
+        Raises:
+            IndexError or KeyError like Pokemon() for species whose moves are
+            misspelled in the pokedex
+        """
+        return Pokemon.from_spread(int(self.dexnos[index]),
+        self.evs[index].tolist(), self.ivs[index].tolist(),
+        int(self.natures[index]), self.stats[index].tolist(), events, rng)
@@ -1,13 +1,160 @@
-import pandas as pd
+import os, csv, pickle
 
-class Data:
-    movelist = pd.read_csv(r'C:\Users\abcoo\OneDrive\Desktop\PokemonSimulator\Gen1_Moves.csv')
-    pokedex = pd.read_csv(r"C:\Users\abcoo\OneDrive\Desktop\PokemonSimulator\Kanto_Pokemon_100.csv")
+class DataSet:
+    """ The movelist and pokedex csv files. They are found relative to this
+    file and only read the first time something asks for them. The parsed
+    rows are cached in a pickled snapshot keyed on the csv files' sizes and
+    modification times, so later runs skip csv parsing entirely. pandas is
+    only imported if the old DataFrame views (movelist, pokedex) are used.
+
+    Rows are tuples in csv column order. Integer columns are converted;
+    everything else stays a string exactly as written in the csv (so a move
+    without power has the power "None").
+
+    Attributes:
+        directory (str) = the folder holding the csv files
+        moves_path (str) = path of the movelist csv file
+        pokedex_path (str) = path of the pokedex csv file
+        snapshot_path (str) = path of the cached snapshot
+    """
+    SNAPSHOT_VERSION = 1
+    MOVE_INTS = ("Index", "PP", "Generation")
+    POKEDEX_INTS = ("Key", "HP", "Atk", "Def", "SpA", "SpD", "Spe")
+
+    def __init__(self, directory=None, moves_file="Gen1_Moves.csv",
+    pokedex_file="Kanto_Pokemon_100.csv", snapshot_path=None):
+        self.directory = directory or os.path.dirname(os.path.abspath(__file__))
+        self.moves_path = os.path.join(self.directory, moves_file)
+        self.pokedex_path = os.path.join(self.directory, pokedex_file)
+        self.snapshot_path = snapshot_path or os.path.join(self.directory,
+        "__pycache__", "data_snapshot.pickle")
+        self.tables = None
+        self.frames = {}
+
+    def sources(self):
+        "What the snapshot is keyed on: each csv file's path, mtime and size"
+        key = [self.SNAPSHOT_VERSION]
+        for path in (self.moves_path, self.pokedex_path):
+            info = os.stat(path)
+            key.append((os.path.abspath(path), info.st_mtime_ns, info.st_size))
+        return key
+
+    @staticmethod
+    def read_csv(path, int_columns):
+        """ Reads a csv file into a header tuple and a list of row tuples,
+        converting the named columns to int.
+        """
+        with open(path, newline="") as f:
+            reader = csv.reader(f)
+            header = tuple(next(reader))
+            convert = [column.strip() in int_columns for column in header]
+            rows = [tuple(int(value) if as_int else value
+            for value, as_int in zip(row, convert)) for row in reader if row]
+        return header, rows
+
+    def compile(self):
+        "Parses both csv files into the tables stored in the snapshot"
+        move_columns, moves = self.read_csv(self.moves_path, self.MOVE_INTS)
+        pokedex_columns, pokedex = self.read_csv(self.pokedex_path,
+        self.POKEDEX_INTS)
+        name = move_columns.index("Name")
+        effect = move_columns.index("Effect")
+        effects = {}
+        for row in moves:
+            effects.setdefault(row[effect], []).append(row[name])
+        return {
+            "sources": self.sources(),
+            "move_columns": move_columns,
+            "moves": moves,
+            "pokedex_columns": pokedex_columns,
+            "pokedex": pokedex,
+            "effects": effects
+        }
+
+    def load(self):
+        """ Returns the tables, reading the snapshot if it is up to date and
+        rebuilding (and re-saving) it from the csv files otherwise.
+        """
+        if self.tables is not None:
+            return self.tables
+        sources = self.sources()
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                tables = pickle.load(f)
+            if tables.get("sources") != sources:
+                tables = None
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            tables = None
+        if tables is None:
+            tables = self.compile()
+            try:
+                os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+                temp_path = "{}.{}.tmp".format(self.snapshot_path, os.getpid())
+                with open(temp_path, "wb") as f:
+                    pickle.dump(tables, f, pickle.HIGHEST_PROTOCOL)
+                os.replace(temp_path, self.snapshot_path)
+            except OSError:
+                pass # a read-only install just parses the csv files each run
+        self.tables = tables
+        return tables
+
+    def reload(self):
+        "Forgets everything loaded so far; the next access reads it again"
+        self.tables = None
+        self.frames = {}
+
+    @property
+    def move_columns(self):
+        return self.load()["move_columns"]
+
+    @property
+    def move_rows(self):
+        return self.load()["moves"]
+
+    @property
+    def pokedex_columns(self):
+        return self.load()["pokedex_columns"]
+
+    @property
+    def pokedex_rows(self):
+        return self.load()["pokedex"]
+
+    def moves_with_effect(self, effect):
+        "Names of every move whose Effect column is exactly effect"
+        return list(self.load()["effects"].get(effect, []))
+
+    def frame(self, table):
+        "A pandas DataFrame of a table; needs pandas, which is imported here"
+        if table not in self.frames:
+            import pandas as pd
+            columns = self.load()[table + "_columns"]
+            self.frames[table] = pd.DataFrame(self.load()[table],
+            columns=list(columns))
+        return self.frames[table]
+
+    @property
+    def movelist(self):
+        return self.frame("moves")
+
+    @property
+    def pokedex(self):
+        return self.frame("pokedex")
+
+# The data set used by the simulator
+Data = DataSet()
+
+# Player.__init__ picks from rows 0-97, the species battles are played with
+ROSTER_SIZE = 98
 
 class Type:
     """ Establishes all 16 (including "None") Pokemon types.
         This includes their offensive relationships: super-effective,
         not very effective, and not effective.
+
+        Each type also has a small integer id (its index in type_list). The
+        relationships are compiled into chart, a flat tuple holding the
+        multiplier of every attacking type against every (type 1, type 2)
+        pair of defending types, so effectiveness is a single indexed read.
     """
     NORMAL = "Normal"
     FIRE = "Fire"
@@ -29,6 +176,12 @@ class Type:
     type_set = set([NORMAL, FIRE, WATER, GRASS, ELECTRIC, ICE, FIGHTING, 
     POISON, GROUND, FLYING, PSYCHIC, BUG, ROCK, GHOST, DRAGON, NONE])
 
+    # A type's id is its index in this list
+    type_list = [NORMAL, FIRE, WATER, GRASS, ELECTRIC, ICE, FIGHTING, POISON,
+    GROUND, FLYING, PSYCHIC, BUG, ROCK, GHOST, DRAGON, NONE]
+    ids = {name: type_id for type_id, name in enumerate(type_list)}
+    COUNT = len(type_list)
+
     # The type initially referenced in each set is the offensive type
     super_effective = {
         NORMAL : {},
@@ -87,10 +240,107 @@ class Type:
         NONE: {}
     }
 
+    # Filled in by compile_chart below
+    chart = ()
+
+    # Only these exact multipliers have ever been announced in battle
+    messages = {
+        0: "It had no effect.",
+        2: "It's super effective!",
+        .5: "It's not very effective."
+    }
+
+    @classmethod
+    def get_id(cls, name):
+        """ Returns the id of a type. Types outside of type_list (the movelist
+        has a Dark move) are treated as "None", which is neutral against
+        everything.
+        """
+        return cls.ids.get(name, cls.ids[cls.NONE])
+
+    @classmethod
+    def single_multiplier(cls, attacking, defending):
+        """ The multiplier of an attacking type against one defending type,
+        both given by name.
+        """
+        if defending in cls.no_effect[attacking]:
+            return 0
+        elif defending in cls.super_effective[attacking]:
+            return 2
+        elif defending in cls.not_very_effective[attacking]:
+            return .5
+        return 1
+
+    @classmethod
+    def compile_chart(cls):
+        """ Builds chart from the relationship tables above. The entry for
+        attacking type a against defending types (d1, d2) is at index
+        (a * COUNT + d1) * COUNT + d2.
+        """
+        chart = []
+        for attacking in cls.type_list:
+            for type1 in cls.type_list:
+                first = cls.single_multiplier(attacking, type1)
+                for type2 in cls.type_list:
+                    if first == 0 or type2 == cls.NONE:
+                        chart.append(first)
+                    else:
+                        chart.append(first * cls.single_multiplier(attacking,
+                        type2))
+        cls.chart = tuple(chart)
+
+    @classmethod
+    def effectiveness(cls, attack_id, defender_ids):
+        """ Looks up the damage multiplier of an attack.
+
+        Parameters:
+            attack_id (int): the id of the move's type
+            defender_ids (tuple of int): the ids of the defender's two types
+
+        Returns:
+            The multiplier (0, .25, .5, 1, 2 or 4)
+        """
+        return cls.chart[(attack_id * cls.COUNT + defender_ids[0]) * cls.COUNT
+        + defender_ids[1]]
+
+    @classmethod
+    def effect_message(cls, multiplier):
+        """ Returns what the battle announces for a multiplier, or None if it
+        announces nothing.
+        """
+        return cls.messages.get(multiplier)
+
+Type.compile_chart()
+
 class Stats:
     "List of each type of stat used for calculation of EVs and stats"
     stat_list = ["HP", "Attack", "Defense", "SpAtk", "SpDef", "Speed"] 
 
+class DamageFormula:
+    """ The numbers used by the damage formula in Player.damageCalc. Anything
+    that predicts damage should read them from here so that it agrees with
+    live battles. Every Pokemon is level 100, so the level factor is
+    2 * 100 / 5 + 2 = 42.
+    """
+    LEVEL_FACTOR = 42
+    DIVISOR = 50
+    BASE = 2
+    STAB = 1.5
+    CRIT_MULTIPLIER = 2
+    # damage is multiplied by randint(RANDOM_MIN, RANDOM_MAX) / 100
+    RANDOM_MIN = 85
+    RANDOM_MAX = 100
+    # a critical hit happens when randint(0, n - 1) rolls 0
+    CRIT_ROLL = 16
+    HIGH_CRIT_ROLL = 8
+    BOOSTED_CRIT_ROLL = 2
+    BOOSTED_HIGH_CRIT_ROLL = 1
+    # number of hits of a multi-hit move for each roll of randint(1, 8)
+    MULTI_HIT = (2, 2, 2, 3, 3, 3, 4, 5)
+    TWO_HIT = 2
+    # power of the typeless physical attack a confused Pokemon hits itself with
+    CONFUSION_POWER = 40
+
 class Statuses:
     """Establishes each possible status condition as a constant and categorizes
     each status move accordingly."""
@@ -103,6 +353,10 @@ class Statuses:
     FRZ = "Freeze"
     CON = "Confuse"
 
+    # A status's id is its index in this list
+    status_list = [HEALTHY, PRZ, PSN, TOX, BRN, SLP, FRZ, CON]
+    ids = {status: status_id for status_id, status in enumerate(status_list)}
+
     # Types of statuses
     IMMOBILIZERS = [PRZ, SLP, FRZ]
     CHIP_DAMAGE = [PSN, BRN, TOX]
@@ -152,3 +406,54 @@ class Natures:
     IMPISH, LAX, RELAXED, MODEST, MILD, BASHFUL, RASH, QUIET, CALM, GENTLE,
     CAREFUL, QUIRKY, SASSY, TIMID, HASTY, JOLLY, NAIVE, SERIOUS]
 
+    # Filled in by compile_table below
+    multipliers = ()
+
+    @classmethod
+    def compile_table(cls):
+        """ Builds multipliers from nature_list: multipliers[nature_id][index]
+        is the nature's multiplier of the stat at that index (1.1, .9 or 1).
+        """
+        signs = {"+": 1.1, "-": .9, ".": 1}
+        cls.multipliers = tuple(tuple(signs[sign] for sign in nature)
+        for nature in cls.nature_list)
+
+Natures.compile_table()
+
+class StatStages:
+    """ Stat stages go from -6 to +6 and start at 0. At stage s >= 0 a stat
+    is multiplied by (2 + s) / 2, and at stage s < 0 by 2 / (2 - s). More
+    about stat stages can be found in the link below:
+    https://bulbapedia.bulbagarden.net/wiki/Stat_modifier
+    """
+    MIN = -6
+    MAX = 6
+
+    # multipliers[s - MIN] is the multiplier of stage s
+    multipliers = tuple((2 + s) / 2 if s >= 0 else 2 / (2 - s)
+    for s in range(MIN, MAX + 1))
+
+    # The stage, stat and current stat slots of each stat that has stages;
+    # accuracy has no stat slot because it is always 100 at stage 0
+    slots = {
+        "Attack": ("ATKstage", "attack", "currentAttack"),
+        "Defense": ("DEFstage", "defense", "currentDefense"),
+        "SpAtk": ("SPATKstage", "spatk", "currentSpAtk"),
+        "SpDef": ("SPDEFstage", "spdef", "currentSpDef"),
+        "Speed": ("SPEEDstage", "speed", "currentSpeed"),
+        "Accuracy": ("ACCstage", None, "accuracy")
+    }
+
+    @classmethod
+    def multiplier(cls, stage):
+        return cls.multipliers[stage - cls.MIN]
+
+    @classmethod
+    def clamp(cls, stage):
+        "The stage limited to MIN thru MAX"
+        if stage > cls.MAX:
+            return cls.MAX
+        if stage < cls.MIN:
+            return cls.MIN
+        return stage
+
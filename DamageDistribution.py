@@ -0,0 +1,252 @@
+""" Damage distributions of a move for matchup analysis
+
+    Player.damageCalc rolls one random damage number per use. This module
+    works out every number it could have rolled, either exactly by enumerating
+    the discrete roll space (critical hit or not, times the 16 damage rolls,
+    times the number of hits) or by drawing millions of samples in one NumPy
+    call. Both read the formula's numbers from Constants.DamageFormula and do
+    the floating point operations in the same order as damageCalc, so every
+    damage value they produce is one a live battle can produce.
+
+    As in damageCalc, only the last hit of a multi-hit move is applied to the
+    defender; pass total=True to get the damage of all hits added up instead.
+"""
+
+import math
+import numpy as np
+from Constants import DamageFormula
+from Moves import Effect
+
+def _base_damage(attacker, move, defender):
+    """ Damage before the critical hit, STAB and random multipliers.
+
+    Raises:
+        ValueError if the move doesn't use the damage formula
+    """
+    if move.getCategory() not in ("Physical", "Special") or \
+    move.getPower() == "None":
+        raise ValueError("{} does not use the damage formula".format(
+            move.getName()))
+    if move.getCategory() == "Physical":
+        ad_ratio = attacker.getAttack() / defender.getDefense()
+    else:
+        ad_ratio = attacker.getSpAtk() / defender.getSpdef()
+    damage = ((DamageFormula.LEVEL_FACTOR * move.getPower() * ad_ratio)
+    / DamageFormula.DIVISOR) + DamageFormula.BASE
+    return damage * move.effectiveness(defender.getTypeIds())
+
+def crit_roll(attacker, move):
+    "The n such that a critical hit happens when randint(0, n - 1) is 0"
+    high_crit = move.descriptor.code == Effect.HIGH_CRIT
+    if attacker.hasCritBoost():
+        return (DamageFormula.BOOSTED_HIGH_CRIT_ROLL if high_crit
+        else DamageFormula.BOOSTED_CRIT_ROLL)
+    return DamageFormula.HIGH_CRIT_ROLL if high_crit else DamageFormula.CRIT_ROLL
+
+def hit_distribution(move):
+    "Maps each possible number of hits of a move to its probability"
+    counts = move.descriptor.hits
+    hits = {}
+    for count in counts:
+        hits[count] = hits.get(count, 0) + 1 / len(counts)
+    return hits
+
+def hit_chance(move):
+    "Probability that accuracyRoll lets the move hit"
+    if move.getAccuracy() == "None":
+        return 1.0
+    return min(move.getAccuracy(), 100) / 100
+
+def _finish(damage, crit, stab, rolls):
+    """ Applies the critical hit, STAB and random multipliers to base damage
+    in the order damageCalc does.
+
+    Parameters:
+        damage (float): base damage
+        crit (bool or ndarray of bool): whether each hit is critical
+        stab (bool): whether the move gets the same type attack bonus
+        rolls (ndarray of int): the random rolls between RANDOM_MIN and
+        RANDOM_MAX
+    """
+    damage = np.where(crit, damage * DamageFormula.CRIT_MULTIPLIER, damage)
+    if stab:
+        damage = damage * DamageFormula.STAB
+    return np.floor(damage * (rolls / 100)).astype(np.int64)
+
+def _convolve(first, second):
+    "Distribution of the sum of two independent {damage: probability} maps"
+    total = {}
+    for a, p in first.items():
+        for b, q in second.items():
+            total[a + b] = total.get(a + b, 0) + p * q
+    return total
+
+class DamageDistribution:
+    """ The distribution of the damage one use of a move does to a defender.
+
+    Attributes:
+        values (ndarray of int) = every distinct damage amount, ascending;
+        includes 0 when the move can miss or has no effect
+        probabilities (ndarray of float) = the probability of each amount
+        hp (int) = the defender's HP that KO figures are measured against
+    """
+    def __init__(self, values, probabilities, hp):
+        order = np.argsort(values)
+        self.values = np.asarray(values, dtype=np.int64)[order]
+        self.probabilities = np.asarray(probabilities, dtype=float)[order]
+        self.hp = hp
+
+    @classmethod
+    def exact(cls, attacker, move, defender, accuracy=True, total=False):
+        """ Enumerates every critical hit, damage roll and hit count.
+
+        Parameters:
+            attacker (Pokemon): the Pokemon using the move
+            move (Move): the damaging move
+            defender (Pokemon): the Pokemon being hit
+            accuracy (bool): whether misses count as 0 damage uses
+            total (bool): add up the damage of every hit instead of applying
+            only the last one
+
+        Returns:
+            A DamageDistribution
+        """
+        base = _base_damage(attacker, move, defender)
+        stab = move.getType() in attacker.getBothTypes()
+        rolls = np.arange(DamageFormula.RANDOM_MIN, DamageFormula.RANDOM_MAX + 1)
+        p_roll = 1 / len(rolls)
+        p_crit = 1 / crit_roll(attacker, move)
+        single = {}
+        for crit, p in ((False, 1 - p_crit), (True, p_crit)):
+            if p == 0:
+                continue
+            for damage in _finish(base, crit, stab, rolls).tolist():
+                single[damage] = single.get(damage, 0) + p * p_roll
+        if total:
+            per_use = {}
+            for hits, p in hit_distribution(move).items():
+                summed = single
+                for _ in range(hits - 1):
+                    summed = _convolve(summed, single)
+                for damage, q in summed.items():
+                    per_use[damage] = per_use.get(damage, 0) + p * q
+        else:
+            per_use = single
+        if accuracy:
+            chance = hit_chance(move)
+            per_use = {damage: p * chance for damage, p in per_use.items()}
+            per_use[0] = per_use.get(0, 0) + 1 - chance
+        return cls(list(per_use.keys()), list(per_use.values()),
+        defender.getCurrentHP())
+
+    @staticmethod
+    def sample(attacker, move, defender, n, seed=None, accuracy=True,
+    total=False):
+        """ Draws the damage of n uses of a move in one vectorized call.
+
+        Parameters:
+            attacker (Pokemon), move (Move), defender (Pokemon): as in exact
+            n (int): the number of uses to draw
+            seed (int): seed for NumPy's random generator
+            accuracy (bool): whether misses count as 0 damage uses
+            total (bool): add up the damage of every hit
+
+        Returns:
+            ndarray of n damage amounts
+        """
+        rng = np.random.default_rng(seed)
+        base = _base_damage(attacker, move, defender)
+        stab = move.getType() in attacker.getBothTypes()
+        roll = crit_roll(attacker, move)
+        hits = hit_distribution(move)
+        counts = rng.choice(list(hits.keys()), size=n, p=list(hits.values()))
+        def one_hit():
+            crit = rng.integers(0, roll, n) == 0
+            rolls = rng.integers(DamageFormula.RANDOM_MIN,
+            DamageFormula.RANDOM_MAX + 1, n)
+            return _finish(base, crit, stab, rolls)
+        damage = one_hit()
+        if total:
+            for extra in range(1, int(counts.max())):
+                damage = damage + np.where(counts > extra, one_hit(), 0)
+        if accuracy:
+            chance = hit_chance(move)
+            if chance < 1:
+                damage = np.where(rng.random(n) < chance, damage, 0)
+        return damage
+
+    @classmethod
+    def monte_carlo(cls, attacker, move, defender, n=1000000, seed=None,
+    accuracy=True, total=False):
+        """ Estimates the distribution from n sampled uses.
+
+        Returns:
+            A DamageDistribution of the empirical frequencies
+        """
+        samples = cls.sample(attacker, move, defender, n, seed, accuracy, total)
+        values, counts = np.unique(samples, return_counts=True)
+        return cls(values, counts / n, defender.getCurrentHP())
+
+    def mean(self):
+        return float(np.dot(self.values, self.probabilities))
+
+    def minimum(self):
+        return int(self.values[self.probabilities > 0][0])
+
+    def maximum(self):
+        return int(self.values[self.probabilities > 0][-1])
+
+    def ko_probability(self, hp=None):
+        "Probability that a single use does at least hp damage"
+        hp = self.hp if hp is None else hp
+        return float(self.probabilities[self.values >= hp].sum())
+
+    def ko_by_use(self, uses, hp=None):
+        """ Probability of having KOed the defender within each number of uses.
+
+        Returns:
+            ndarray whose entry k - 1 is the probability of a KO within k uses
+        """
+        hp = self.hp if hp is None else hp
+        # remaining[h] is the probability that the defender has h HP left
+        remaining = np.zeros(hp + 1)
+        remaining[hp] = 1.0
+        knocked_out = np.zeros(uses)
+        for use in range(uses):
+            after = np.zeros(hp + 1)
+            for damage, p in zip(self.values.tolist(),
+            self.probabilities.tolist()):
+                if damage >= hp:
+                    after[0] += p * remaining[1:].sum()
+                elif damage > 0:
+                    after[1:hp + 1 - damage] += p * remaining[1 + damage:]
+                    after[0] += p * remaining[1:1 + damage].sum()
+                else:
+                    after[1:] += p * remaining[1:]
+            after[0] += remaining[0]
+            remaining = after
+            knocked_out[use] = remaining[0]
+        return knocked_out
+
+    def expected_hits_to_ko(self, hp=None):
+        """ The expected number of uses it takes to KO the defender from hp,
+        or infinity if the move can never do damage.
+        """
+        hp = self.hp if hp is None else hp
+        p_zero = float(self.probabilities[self.values <= 0].sum())
+        if p_zero >= 1:
+            return math.inf
+        positive = self.values > 0
+        damages = self.values[positive]
+        probs = self.probabilities[positive]
+        # expected[h] is the expected number of uses to KO from h HP
+        expected = np.zeros(hp + 1)
+        for h in range(1, hp + 1):
+            before = np.maximum(h - damages, 0)
+            expected[h] = (1 + np.dot(probs, expected[before])) / (1 - p_zero)
+        return float(expected[hp])
+
+    def __str__(self):
+        return ("damage {}-{} (mean {:.1f}), KO chance {:.4f}, "
+        "expected hits to KO {:.2f}").format(self.minimum(), self.maximum(),
+        self.mean(), self.ko_probability(), self.expected_hits_to_ko())
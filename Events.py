@@ -0,0 +1,437 @@
+""" Battle events and the sinks they are dispatched to
+
+    Everything that happens in a battle is reported by calling
+    sink.emit(EventType, *args) instead of printing. The event object is only
+    built by sinks that want it, so the NullSink used for bulk simulation pays
+    for a single no-op call per event. ConsoleSink reproduces the text the
+    simulator has always printed; BufferedSink keeps the events themselves.
+"""
+
+import sys
+from Constants import Type, Statuses
+
+class Event:
+    """ Base class for battle events. Subclasses list their fields in
+    __slots__ and take the live objects (Pokemon, Move, Player) in their
+    constructor, keeping only plain values so that logged events don't change
+    as the battle goes on.
+    """
+    __slots__ = ()
+
+    def as_dict(self):
+        fields = {"event": type(self).__name__}
+        for slot in self.__slots__:
+            fields[slot] = getattr(self, slot)
+        return fields
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, ", ".join(
+            "{}={!r}".format(slot, getattr(self, slot))
+            for slot in self.__slots__))
+
+class PokemonCreated(Event):
+    "A Pokemon was generated"
+    __slots__ = ("pokemon",)
+    def __init__(self, pokemon):
+        self.pokemon = pokemon.getName()
+
+class BattleStarted(Event):
+    "Both players have sent out their Pokemon"
+    __slots__ = ("player1", "pokemon1", "player2", "pokemon2")
+    def __init__(self, player1, player2):
+        self.player1 = player1.getName()
+        self.pokemon1 = player1.getPokemon().getName()
+        self.player2 = player2.getName()
+        self.pokemon2 = player2.getPokemon().getName()
+
+class TurnStarted(Event):
+    "A new turn began"
+    __slots__ = ("turn",)
+    def __init__(self, turn):
+        self.turn = turn
+
+class ActionRequested(Event):
+    "A player is about to choose their action; text is the player's summary"
+    __slots__ = ("player", "text")
+    def __init__(self, player):
+        self.player = player.getName()
+        self.text = str(player)
+
+class InputRejected(Event):
+    "A human player typed something that isn't a valid move"
+    __slots__ = ("message",)
+    def __init__(self, message):
+        self.message = message
+
+class MoveUsed(Event):
+    "A Pokemon used a move"
+    __slots__ = ("pokemon", "move")
+    def __init__(self, pokemon, move):
+        self.pokemon = pokemon.getName()
+        self.move = move.getName()
+
+class Charging(Event):
+    "A Pokemon started charging a two-turn move"
+    __slots__ = ("pokemon", "move")
+    def __init__(self, pokemon, move):
+        self.pokemon = pokemon.getName()
+        self.move = move.getName()
+
+class MoveMissed(Event):
+    "A Pokemon's move missed"
+    __slots__ = ("pokemon", "move")
+    def __init__(self, pokemon, move):
+        self.pokemon = pokemon.getName()
+        self.move = move.getName()
+
+class Crashed(Event):
+    "A Pokemon missed a move with crash damage and hurt itself"
+    __slots__ = ("pokemon", "move")
+    def __init__(self, pokemon, move):
+        self.pokemon = pokemon.getName()
+        self.move = move.getName()
+
+class Roll(Event):
+    "A random number was drawn for a crit, flinch, status or stat drop check"
+    __slots__ = ("kind", "value")
+    def __init__(self, kind, value):
+        self.kind = kind
+        self.value = value
+
+class Effectiveness(Event):
+    "A damaging move was super effective, not very effective or had no effect"
+    __slots__ = ("move", "multiplier")
+    def __init__(self, move, multiplier):
+        self.move = move.getName()
+        self.multiplier = multiplier
+
+class CriticalHit(Event):
+    "A hit was a critical hit"
+    __slots__ = ("pokemon", "move")
+    def __init__(self, pokemon, move):
+        self.pokemon = pokemon.getName()
+        self.move = move.getName()
+
+class Damage(Event):
+    "One hit of a move did damage"
+    __slots__ = ("attacker", "defender", "move", "damage")
+    def __init__(self, attacker, defender, move, damage):
+        self.attacker = attacker.getName()
+        self.defender = defender.getName()
+        self.move = move.getName()
+        self.damage = damage
+
+class MultiHit(Event):
+    "A multi-hit move finished"
+    __slots__ = ("move", "hits")
+    def __init__(self, move, hits):
+        self.move = move.getName()
+        self.hits = hits
+
+class Recoil(Event):
+    "A Pokemon took recoil damage"
+    __slots__ = ("pokemon", "damage")
+    def __init__(self, pokemon, damage):
+        self.pokemon = pokemon.getName()
+        self.damage = damage
+
+class Drained(Event):
+    "A Pokemon restored HP by draining its opponent"
+    __slots__ = ("pokemon", "amount")
+    def __init__(self, pokemon, amount):
+        self.pokemon = pokemon.getName()
+        self.amount = amount
+
+class StatusInflicted(Event):
+    "A Pokemon was given a status condition (including confusion)"
+    __slots__ = ("pokemon", "status")
+    def __init__(self, pokemon, status):
+        self.pokemon = pokemon.getName()
+        self.status = status
+
+class StatusCheck(Event):
+    "A Pokemon's status condition is checked before it moves"
+    __slots__ = ("pokemon", "status")
+    def __init__(self, pokemon, status):
+        self.pokemon = pokemon.getName()
+        self.status = status
+
+class Immobilized(Event):
+    "A Pokemon couldn't move because of its status condition"
+    __slots__ = ("pokemon", "status")
+    def __init__(self, pokemon, status):
+        self.pokemon = pokemon.getName()
+        self.status = status
+
+class StatusCured(Event):
+    "A Pokemon woke up, thawed out or snapped out of confusion"
+    __slots__ = ("pokemon", "status")
+    def __init__(self, pokemon, status):
+        self.pokemon = pokemon.getName()
+        self.status = status
+
+class ConfusionCheck(Event):
+    "A confused Pokemon tries to move"
+    __slots__ = ("pokemon",)
+    def __init__(self, pokemon):
+        self.pokemon = pokemon.getName()
+
+class ConfusionSelfHit(Event):
+    "A confused Pokemon hurt itself"
+    __slots__ = ("pokemon", "damage")
+    def __init__(self, pokemon, damage):
+        self.pokemon = pokemon.getName()
+        self.damage = damage
+
+class ThrashFatigue(Event):
+    "A Pokemon became confused at the end of a thrash-like move"
+    __slots__ = ("pokemon",)
+    def __init__(self, pokemon):
+        self.pokemon = pokemon.getName()
+
+class Recharging(Event):
+    "A Pokemon spent its turn recharging"
+    __slots__ = ("pokemon",)
+    def __init__(self, pokemon):
+        self.pokemon = pokemon.getName()
+
+class Flinched(Event):
+    "A Pokemon flinched"
+    __slots__ = ("pokemon",)
+    def __init__(self, pokemon):
+        self.pokemon = pokemon.getName()
+
+class StatChanged(Event):
+    "A status move raised or lowered a stat"
+    __slots__ = ("pokemon", "stat", "stages")
+    def __init__(self, pokemon, stat, stages):
+        self.pokemon = pokemon.getName()
+        self.stat = stat
+        self.stages = stages
+
+class CritBoosted(Event):
+    "A Pokemon raised its critical hit ratio"
+    __slots__ = ("pokemon",)
+    def __init__(self, pokemon):
+        self.pokemon = pokemon.getName()
+
+class MoveFailed(Event):
+    "A status move failed"
+    __slots__ = ("move",)
+    def __init__(self, move):
+        self.move = move.getName()
+
+class MoveHadNoEffect(Event):
+    "A status move didn't affect the defender's type"
+    __slots__ = ("move", "defender")
+    def __init__(self, move, defender):
+        self.move = move.getName()
+        self.defender = defender.getName()
+
+class ChipDamage(Event):
+    "A Pokemon was hurt by its burn or poison"
+    __slots__ = ("pokemon", "status", "damage")
+    def __init__(self, pokemon, status, damage):
+        self.pokemon = pokemon.getName()
+        self.status = status
+        self.damage = damage
+
+class Fainted(Event):
+    "A Pokemon fainted"
+    __slots__ = ("pokemon",)
+    def __init__(self, pokemon):
+        self.pokemon = pokemon.getName()
+
+class PlayerLost(Event):
+    "A player lost the battle"
+    __slots__ = ("player", "turns")
+    def __init__(self, player, turns):
+        self.player = player.getName()
+        self.turns = turns
+
+class Draw(Event):
+    "The battle reached its turn limit"
+    __slots__ = ("turns",)
+    def __init__(self, turns):
+        self.turns = turns
+
+STAT_NAMES = {
+    "Attack": "attack",
+    "Defense": "defense",
+    "SpAtk": "special attack",
+    "SpDef": "special defense",
+    "Speed": "speed"
+}
+
+STATUS_INFLICTED_TEXT = {
+    Statuses.BRN: " was burned!",
+    Statuses.PRZ: " was paralyzed! It might not be able to move!",
+    Statuses.PSN: " was poisoned!",
+    Statuses.TOX: " was badly poisoned!",
+    Statuses.FRZ: " was frozen!"
+}
+
+IMMOBILIZED_TEXT = {
+    Statuses.PRZ: " is fully paralyzed!",
+    Statuses.SLP: " is fast asleep!",
+    Statuses.FRZ: " is frozen solid!"
+}
+
+STATUS_CURED_TEXT = {
+    Statuses.SLP: " woke up!",
+    Statuses.FRZ: " thawed out!",
+    Statuses.CON: " snapped out of confusion!"
+}
+
+def _status_text(table):
+    def text(e):
+        suffix = table.get(e.status)
+        return None if suffix is None else e.pokemon + suffix
+    return text
+
+# How ConsoleSink renders each event; None means the event prints nothing
+CONSOLE_TEXT = {
+    PokemonCreated: lambda e: e.pokemon,
+    BattleStarted: lambda e: "{} has {}. {} has {}.".format(
+        e.player1, e.pokemon1, e.player2, e.pokemon2),
+    TurnStarted: lambda e: "",
+    ActionRequested: lambda e: e.text + "\n",
+    InputRejected: lambda e: e.message,
+    MoveUsed: lambda e: e.pokemon + " used " + e.move + "!",
+    Charging: lambda e: e.pokemon + " is charging",
+    MoveMissed: lambda e: "The attack missed!",
+    Crashed: lambda e: e.pokemon + " kept going and crashed!",
+    Roll: lambda e: "{} roll: {}".format(e.kind, e.value),
+    Effectiveness: lambda e: Type.effect_message(e.multiplier),
+    CriticalHit: lambda e: "A critical hit!",
+    Damage: lambda e: "Damage: {}".format(e.damage),
+    MultiHit: lambda e: "It hit {} times!".format(e.hits),
+    Recoil: lambda e: "Recoil: {}".format(e.damage),
+    Drained: lambda e: "Drained: {}".format(e.amount),
+    StatusInflicted: _status_text(STATUS_INFLICTED_TEXT),
+    StatusCheck: lambda e: "",
+    Immobilized: _status_text(IMMOBILIZED_TEXT),
+    StatusCured: _status_text(STATUS_CURED_TEXT),
+    ConfusionCheck: lambda e: e.pokemon + " is confused!",
+    ConfusionSelfHit: lambda e: e.pokemon + " hit itself in confusion!",
+    ThrashFatigue: lambda e: e.pokemon + " is confused due to fatigue!",
+    Recharging: lambda e: e.pokemon + " is recharging!",
+    Flinched: lambda e: e.pokemon + " flinched!",
+    StatChanged: lambda e: "{}'s {} {}!".format(e.pokemon,
+        STAT_NAMES[e.stat], "rose" if e.stages > 0 else "fell"),
+    CritBoosted: lambda e: e.pokemon + " is getting pumped!",
+    MoveFailed: lambda e: "But it failed!",
+    MoveHadNoEffect: lambda e: "It had no effect!",
+    ChipDamage: lambda e: e.pokemon + (" is hurt by its burn!"
+        if e.status == Statuses.BRN else " is hurt by poison!"),
+    Fainted: lambda e: "\n" + e.pokemon + " fainted.",
+    PlayerLost: lambda e: e.player + " lost!",
+    Draw: lambda e: "\nThe battle ended in a draw."
+}
+
+def render(event):
+    """ Returns the console text of an event, or None if it prints nothing """
+    return CONSOLE_TEXT[type(event)](event)
+
+class NullSink:
+    """ Discards every event without building it. """
+    def emit(self, event_type, *args):
+        pass
+
+class ConsoleSink:
+    """ Prints every event the way the simulator always has.
+
+    Attributes:
+        stream (file) = where to print; sys.stdout at the time of each event
+        if this is None
+    """
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def emit(self, event_type, *args):
+        text = render(event_type(*args))
+        if text is not None:
+            print(text, file=self.stream or sys.stdout)
+
+class BufferedSink:
+    """ Keeps the events of a battle in memory.
+
+    If a stream is given, the buffered events are rendered to it as console
+    text whenever capacity events have been collected, and on flush(), so that
+    long runs can be logged to a file with bounded memory.
+
+    Attributes:
+        events (list of Event) = the events that have not been flushed yet
+        stream (file) = where flushed events are written; None keeps them all
+        capacity (int) = the number of events to buffer before flushing
+    """
+    def __init__(self, stream=None, capacity=1024):
+        self.events = []
+        self.stream = stream
+        self.capacity = capacity
+
+    def emit(self, event_type, *args):
+        self.events.append(event_type(*args))
+        if self.stream is not None and len(self.events) >= self.capacity:
+            self.flush()
+
+    def text(self):
+        "The buffered events as the console would have shown them"
+        lines = [render(event) for event in self.events]
+        return "\n".join(line for line in lines if line is not None)
+
+    def flush(self):
+        if self.stream is not None and self.events:
+            self.stream.write(self.text() + "\n")
+            self.events = []
+
+    def clear(self):
+        self.events = []
+
+class Tap:
+    """ Passes every event on to another sink, after showing it to see().
+    Subclasses override see() to count the events they want.
+
+    Attributes:
+        inner (sink) = where the events go after they are seen
+    """
+    def __init__(self, inner):
+        self.inner = inner
+
+    def emit(self, event_type, *args):
+        self.see(event_type, args)
+        self.inner.emit(event_type, *args)
+
+    def see(self, event_type, args):
+        pass
+
+class MoveUsageSink(Tap):
+    """ Counts the moves each Pokemon uses on the way to another sink.
+
+    Attributes:
+        uses (dict) = the number of times each (Pokemon, Move) was used
+    """
+    def __init__(self, inner):
+        super().__init__(inner)
+        self.uses = {}
+
+    def see(self, event_type, args):
+        if event_type is MoveUsed:
+            key = (args[0], args[1])
+            self.uses[key] = self.uses.get(key, 0) + 1
+
+    def counts(self, pokemon):
+        """ How many times a Pokemon used each of its moves, in move slot
+        order. A move a Pokemon has twice is counted in its first slot.
+        """
+        counts = []
+        for index, move in enumerate(pokemon.moves):
+            if move in pokemon.moves[:index]:
+                counts.append(0)
+            else:
+                counts.append(self.uses.get((pokemon, move), 0))
+        return counts
+
+# Shared sinks; CONSOLE is what battles use unless told otherwise
+NULL = NullSink()
+CONSOLE = ConsoleSink()
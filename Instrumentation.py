@@ -0,0 +1,188 @@
+""" Opt-in timing and counters for battles
+
+    A BattleMetrics object is attached to a Battle before it starts. It wraps
+    the battle's phases (is_mobile, each player's take_turn, damageCalc and
+    secondary effects, chip_damage and start itself) on that battle and its
+    players only, and puts a CountingSink in front of the battle's event
+    sink to count what happens. Battles it isn't attached to run exactly the
+    code they always have, so there is no cost when it is off.
+
+    One BattleMetrics can be attached to every battle of a batch run to add
+    them all up, and the totals can be written as JSON or as a Prometheus
+    text file.
+
+    Phase timings are inclusive: take_turn's time includes its damageCalc
+    and secondary effect time.
+"""
+
+import time, json
+from Players import Player
+import Events
+
+# the counters kept for each event type
+EVENT_COUNTERS = {
+    Events.TurnStarted: "turns",
+    Events.Damage: "damage_rolls",
+    Events.CriticalHit: "crits",
+    Events.MoveMissed: "misses",
+    Events.Crashed: "misses",
+    Events.ChipDamage: "status_ticks",
+}
+
+COUNTERS = ("battles", "turns", "is_mobile_checks", "damage_rolls",
+"secondary_effects", "status_ticks", "misses", "crits", "errors")
+
+PHASES = ("battle", "is_mobile", "take_turn", "damage_calc",
+"secondary_effects", "chip_damage")
+
+# the prefix of every Prometheus metric name
+PROMETHEUS_PREFIX = "pokemon_battle"
+
+class CountingSink(Events.Tap):
+    """ Counts events on the way to another sink.
+
+    Attributes:
+        counters (dict) = the counts by counter name
+    """
+    def __init__(self, inner, counters):
+        super().__init__(inner)
+        self.counters = counters
+
+    def see(self, event_type, args):
+        counter = EVENT_COUNTERS.get(event_type)
+        if counter is not None:
+            self.counters[counter] += 1
+
+# the player methods attach wraps on the instance, which detach removes
+INSTANCE_WRAPPERS = ("take_turn", "damageCalc", "secondaryEffectHandler")
+
+class BattleMetrics:
+    """ Timings and counters added up over every battle it is attached to.
+
+    Attributes:
+        counters (dict) = the count of each of COUNTERS
+        timings (dict) = [calls, seconds] for each of PHASES
+    """
+    def __init__(self):
+        self.counters = {counter: 0 for counter in COUNTERS}
+        self.timings = {phase: [0, 0.0] for phase in PHASES}
+
+    def timed(self, phase, function, counter=None):
+        """ Wraps a bound method so that its calls are timed under phase and
+        counted under counter, if given.
+        """
+        timing = self.timings[phase]
+        counters = self.counters
+        clock = time.perf_counter
+        def wrapper(*args):
+            start = clock()
+            try:
+                return function(*args)
+            finally:
+                timing[0] += 1
+                timing[1] += clock() - start
+                if counter is not None:
+                    counters[counter] += 1
+        return wrapper
+
+    def attach(self, battle):
+        """ Instruments a battle that hasn't started yet and both of its
+        players.
+
+        Side Effects:
+            Replaces the battle's event sink with a CountingSink in front of
+            it, on the battle, its players and their Pokemon
+        """
+        sink = CountingSink(battle.events, self.counters)
+        battle.events = sink
+        battle.is_mobile = self.timed("is_mobile", battle.is_mobile,
+        "is_mobile_checks")
+        battle.chip_damage = self.timed("chip_damage", battle.chip_damage)
+        battle.start = self.timed("battle", battle.start, "battles")
+        for player in (battle.player1, battle.player2):
+            player.setEvents(sink)
+            player.take_turn = self.timed("take_turn", player.take_turn)
+            player.damageCalc = self.timed("damage_calc", player.damageCalc)
+            player.secondaryEffectHandler = self.secondary(
+                player.secondaryEffectHandler)
+
+    def detach(self, players):
+        """ Takes the wrappers attach put on players off again, so a player
+        that is reset and reused for another battle isn't wrapped twice.
+        Their events are set again when they are reset.
+
+        Parameters:
+            players (list of Player): the players of an instrumented battle
+        """
+        for player in players:
+            for name in INSTANCE_WRAPPERS:
+                player.__dict__.pop(name, None)
+
+    def secondary(self, handler):
+        """ Wraps a player's secondaryEffectHandler; only moves with a
+        handler in Player.SECONDARY_EFFECTS count as dispatches
+        """
+        timed = self.timed("secondary_effects", handler)
+        counters = self.counters
+        def wrapper(name, move, damage, defender):
+            if move.descriptor.code in Player.SECONDARY_EFFECTS:
+                counters["secondary_effects"] += 1
+            return timed(name, move, damage, defender)
+        return wrapper
+
+    def merge(self, other):
+        "Adds another BattleMetrics' totals to this one's"
+        for counter, count in other.counters.items():
+            self.counters[counter] += count
+        for phase, (calls, seconds) in other.timings.items():
+            self.timings[phase][0] += calls
+            self.timings[phase][1] += seconds
+
+    def as_dict(self):
+        return {
+            "counters": dict(self.counters),
+            "phases": {phase: {"calls": calls, "seconds": seconds}
+            for phase, (calls, seconds) in self.timings.items()}
+        }
+
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+    def prometheus_text(self):
+        "The totals in the Prometheus text exposition format"
+        calls = PROMETHEUS_PREFIX + "_phase_calls_total"
+        seconds = PROMETHEUS_PREFIX + "_phase_seconds_total"
+        lines = [
+            "# HELP {} Calls of each battle phase.".format(calls),
+            "# TYPE {} counter".format(calls)
+        ]
+        lines += ['{}{{phase="{}"}} {}'.format(calls, phase, timing[0])
+        for phase, timing in self.timings.items()]
+        lines += [
+            "# HELP {} Seconds spent in each battle phase.".format(seconds),
+            "# TYPE {} counter".format(seconds)
+        ]
+        lines += ['{}{{phase="{}"}} {:.9f}'.format(seconds, phase, timing[1])
+        for phase, timing in self.timings.items()]
+        for counter, count in self.counters.items():
+            name = "{}_{}_total".format(PROMETHEUS_PREFIX, counter)
+            lines += [
+                "# TYPE {} counter".format(name),
+                "{} {}".format(name, count)
+            ]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        with open(path, "w") as f:
+            f.write(self.prometheus_text())
+
+    def __str__(self):
+        lines = ["{:<20}{:>10}{:>12}{:>12}".format("phase", "calls",
+        "seconds", "us/call")]
+        for phase, (calls, seconds) in self.timings.items():
+            lines.append("{:<20}{:>10}{:>12.4f}{:>12.2f}".format(phase, calls,
+            seconds, 1e6 * seconds / calls if calls else 0.0))
+        lines.append("  ".join("{}={}".format(counter, count)
+        for counter, count in self.counters.items()))
+        return "\n".join(lines)
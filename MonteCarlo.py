@@ -0,0 +1,325 @@
+""" Monte Carlo tree search for choosing moves
+
+    MCTSPlayer decides by playing many quick battles (rollouts) from the
+    current position. Each rollout copies both Pokemon, makes the searching
+    Pokemon use one of its moves and plays the battle out to the end with
+    the regular Battle class, silently, with both sides picking their moves
+    by a cheap policy. Which move each rollout starts with is picked by UCB1
+    from the rewards of the rollouts before it, so promising moves get most
+    of the rollouts, and the move tried the most is the one used.
+
+    Rollouts are handed out in batches, so they can run in this process or
+    on a pool of worker processes. While a wave of batches is out, its
+    rollouts count as losses for UCB1 ("virtual loss") so one wave still
+    spreads over several moves.
+
+    A Player doesn't know whether it is player 1 or 2 or how much of the
+    current turn has been played, so every rollout starts a new turn with
+    the searching Pokemon in a random seat. Rollouts that raise an error
+    score as draws.
+"""
+
+import os, math, time, random
+from concurrent.futures import ProcessPoolExecutor
+from Constants import DamageFormula
+from Players import ComputerPlayer
+from battle import Battle
+import Events
+
+WIN = 1.0
+DRAW = 0.5
+LOSS = 0.0
+
+# rollouts still going after this many turns are scored as draws
+ROLLOUT_TURNS = 100
+
+POLICIES = ("random", "greedy")
+
+MASK32 = (1 << 32) - 1
+
+def move_score(move, attacker, defender):
+    "A rough guess at how much damage a move does, for greedy rollouts"
+    if move.category == "Status" or move.power == "None":
+        return 0
+    if move.category == "Physical":
+        score = move.power * attacker.getAttack() / defender.getDefense()
+    else:
+        score = move.power * attacker.getSpAtk() / defender.getSpdef()
+    score *= move.effectiveness(defender.type_ids)
+    if move.type in attacker.types:
+        score *= DamageFormula.STAB
+    if move.accuracy != "None":
+        score *= min(move.accuracy, 100) / 100
+    return score
+
+class RolloutPlayer(ComputerPlayer):
+    """ A computer player for rollouts. It plays a Pokemon it is given (a
+    copy of one in the real battle) instead of creating one.
+
+    Attributes:
+        first_move (int) = the index of the move to use the first time this
+        player picks one; None to use the policy from the start
+        policy (str) = how moves are picked, one of POLICIES: "random" picks
+        uniformly, "greedy" picks the move with the best move_score three
+        times out of four and a random one otherwise
+    """
+    def __init__(self, name, pokemon, first_move=None, policy="random"):
+        self.name = name
+        self.pokemon = pokemon
+        self.events = Events.NULL
+        self.rng = pokemon.rng
+        self.first_move = first_move
+        self.policy = policy
+
+    def chooseMove(self, other_pkmn):
+        if self.first_move is not None:
+            index = self.first_move
+            self.first_move = None
+            return index
+        if self.policy == "greedy" and self.rng.randint(0,3) != 0:
+            moves = self.pokemon.moves
+            scores = [move_score(move, self.pokemon, other_pkmn)
+            for move in moves]
+            return scores.index(max(scores))
+        return self.rng.randint(0,3)
+
+def rollout(me, opp, first_move, rng, max_turns=ROLLOUT_TURNS,
+policy="random"):
+    """ Plays one battle from a position on copies of both Pokemon.
+
+    Parameters:
+        me (Pokemon): the searching player's Pokemon
+        opp (Pokemon): the opposing Pokemon
+        first_move (int): the index of me's first move
+        rng (random number stream): where the battle's random numbers come
+        from
+        max_turns (int): the number of turns after which it is a draw
+        policy (str): how both sides pick their moves, one of POLICIES
+
+    Returns:
+        WIN, DRAW or LOSS for me, or None if the battle raised an error
+    """
+    mine = RolloutPlayer("me", me.copy(), first_move, policy)
+    theirs = RolloutPlayer("opponent", opp.copy(), None, policy)
+    if rng.randint(0,1) == 0:
+        battle = Battle(mine, theirs, max_turns, Events.NULL, rng)
+    else:
+        battle = Battle(theirs, mine, max_turns, Events.NULL, rng)
+    try:
+        winner = battle.start()
+    except Exception:
+        return None
+    if winner is None:
+        return DRAW
+    return WIN if winner is mine else LOSS
+
+def run_rollouts(me, opp, first_moves, seed, max_turns=ROLLOUT_TURNS,
+policy="random"):
+    """ Plays one rollout for each entry of first_moves, drawing from one
+    stream seeded with seed. This is the unit of work given to a worker
+    process.
+
+    Returns:
+        A list with the result of each rollout, as returned by rollout
+    """
+    rng = random.Random(seed)
+    return [rollout(me, opp, index, rng, max_turns, policy)
+    for index in first_moves]
+
+class MonteCarloSearch:
+    """ Runs the rollouts of each decision and keeps their statistics.
+
+    Attributes:
+        rollouts (int) = the most rollouts per decision
+        max_time (float) = the most seconds to spend per decision; None for
+        no time limit
+        workers (int) = the number of processes that play rollouts; 1 plays
+        them in this process
+        batch_size (int) = the number of rollouts in one unit of work
+        exploration (float) = the UCB1 exploration constant
+        max_turns (int) = the turn limit of each rollout
+        policy (str) = the rollout policy, one of POLICIES
+        pool (ProcessPoolExecutor) = the worker processes, started by the
+        first decision that needs them
+        visits (list of int) = the rollouts of each of the last decision's
+        moves
+        totals (list of float) = the summed rewards of each of those moves
+        decisions (int) = the number of decisions made
+        total_rollouts (int) = the rollouts played over every decision
+        errors (int) = the rollouts that raised an error
+        rollout_time (float) = seconds spent on decisions in total
+        latencies (list of float) = the seconds each decision took
+    """
+    def __init__(self, rollouts=1000, max_time=None, workers=1, batch_size=32,
+    exploration=math.sqrt(2), max_turns=ROLLOUT_TURNS, policy="random"):
+        if policy not in POLICIES:
+            raise ValueError("Unknown rollout policy: {}".format(policy))
+        self.rollouts = rollouts
+        self.max_time = max_time
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.exploration = exploration
+        self.max_turns = max_turns
+        self.policy = policy
+        self.pool = None
+        self.visits = []
+        self.totals = []
+        self.decisions = 0
+        self.total_rollouts = 0
+        self.errors = 0
+        self.rollout_time = 0.0
+        self.latencies = []
+
+    def select(self, visits, totals, pending):
+        "The move UCB1 picks next, counting pending rollouts as losses"
+        played = sum(visits) + sum(pending)
+        best = None
+        best_value = -math.inf
+        for k in range(len(visits)):
+            n = visits[k] + pending[k]
+            if n == 0:
+                return k
+            value = totals[k] / n + self.exploration * math.sqrt(
+            math.log(played) / n)
+            if value > best_value:
+                best = k
+                best_value = value
+        return best
+
+    def play(self, me, opp, waves, seeds):
+        "Plays batches of rollouts, in this process or on the pool"
+        if self.workers == 1:
+            return [run_rollouts(me, opp, wave, seed, self.max_turns,
+            self.policy) for wave, seed in zip(waves, seeds)]
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(self.workers)
+        futures = [self.pool.submit(run_rollouts, me, opp, wave, seed,
+        self.max_turns, self.policy) for wave, seed in zip(waves, seeds)]
+        return [future.result() for future in futures]
+
+    def best_move(self, me, opp, seed):
+        """ Picks the move whose rollouts went best.
+
+        Parameters:
+            me (Pokemon): the searching player's Pokemon
+            opp (Pokemon): the opposing Pokemon
+            seed (int): every rollout's seed is derived from this, so a
+            decision without a time limit depends on it alone
+
+        Returns:
+            The index of the chosen move in me's moves
+        """
+        start = time.perf_counter()
+        # the copies lose the battle's rng so they can be sent to workers;
+        # every rollout gives them its own
+        me = me.copy()
+        me.setEvents(Events.NULL)
+        me.setRng(None)
+        opp = opp.copy()
+        opp.setEvents(Events.NULL)
+        opp.setRng(None)
+        # duplicate moves share their statistics
+        indices = [index for index, move in enumerate(me.moves)
+        if move not in me.moves[:index]]
+        visits = [0] * len(indices)
+        totals = [0.0] * len(indices)
+        played = 0
+        units = 0
+        while played < self.rollouts:
+            if (self.max_time is not None and played > 0 and
+            time.perf_counter() - start > self.max_time):
+                break
+            size = min(self.batch_size * self.workers, self.rollouts - played)
+            pending = [0] * len(indices)
+            picks = []
+            for _ in range(size):
+                k = self.select(visits, totals, pending)
+                pending[k] += 1
+                picks.append(k)
+            batches = [picks[i:i + self.batch_size]
+            for i in range(0, size, self.batch_size)]
+            waves = [[indices[k] for k in batch] for batch in batches]
+            seeds = [(seed * 1000003 + units + i) & MASK32
+            for i in range(len(batches))]
+            units += len(batches)
+            for batch, results in zip(batches, self.play(me, opp, waves,
+            seeds)):
+                for k, reward in zip(batch, results):
+                    if reward is None:
+                        self.errors += 1
+                        reward = DRAW
+                    visits[k] += 1
+                    totals[k] += reward
+            played += size
+        self.visits = visits
+        self.totals = totals
+        best = max(range(len(indices)),
+        key=lambda k: (visits[k], totals[k] / max(visits[k], 1)))
+        elapsed = time.perf_counter() - start
+        self.decisions += 1
+        self.total_rollouts += played
+        self.rollout_time += elapsed
+        self.latencies.append(elapsed)
+        return indices[best]
+
+    def metrics(self):
+        """ Throughput and latency over every decision so far.
+
+        Returns:
+            A dict with the number of decisions, rollouts and rollout errors,
+            rollouts per second, and the mean, median, 99th percentile and
+            maximum decision latency in seconds
+        """
+        latencies = sorted(self.latencies)
+        if not latencies:
+            latencies = [0.0]
+        return {
+            "decisions": self.decisions,
+            "rollouts": self.total_rollouts,
+            "errors": self.errors,
+            "rollouts_per_second": (self.total_rollouts / self.rollout_time
+            if self.rollout_time > 0 else 0.0),
+            "latency_mean": sum(latencies) / len(latencies),
+            "latency_p50": latencies[len(latencies) // 2],
+            "latency_p99": latencies[min(len(latencies) - 1,
+            int(len(latencies) * 0.99))],
+            "latency_max": latencies[-1]
+        }
+
+    def close(self):
+        "Shuts down the worker processes, if any were started"
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+class MCTSPlayer(ComputerPlayer):
+    """ A computer player that picks its moves with Monte Carlo rollouts.
+    Charging and thrashing are handled by ComputerPlayer.take_turn as usual.
+
+    Attributes:
+        search (MonteCarloSearch) = the search, which also keeps the metrics
+    """
+    def __init__(self, name, dexno=None, events=None, rng=None, rollouts=1000,
+    max_time=None, workers=1, policy="random"):
+        """ Parameters:
+            name, dexno, events, rng: as for Player
+            rollouts (int): the most rollouts per decision
+            max_time (float): the most seconds to spend per decision; None
+            for no limit, which keeps seeded battles reproducible
+            workers (int): the number of processes that play rollouts; None
+            for one per CPU. Call close() when done with more than one.
+            policy (str): the rollout policy, one of POLICIES
+        """
+        super().__init__(name, dexno, events, rng)
+        self.search = MonteCarloSearch(rollouts, max_time, workers,
+        policy=policy)
+
+    def chooseMove(self, other_pkmn):
+        seed = self.rng.randint(0, MASK32)
+        return self.search.best_move(self.pokemon, other_pkmn, seed)
+
+    def metrics(self):
+        return self.search.metrics()
+
+    def close(self):
+        self.search.close()
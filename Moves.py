@@ -1,48 +1,199 @@
-from Constants import Data, Type
+from Constants import Data, Type, Statuses, DamageFormula
+import Events
+
+class Effect:
+    """ Codes for what a move does besides dealing damage. Every Move carries
+    a MoveEffect with one of these codes, and the Player applies it by looking
+    the code up in a dispatch table.
+    """
+    NONE = 0
+    # secondary effects of damaging moves
+    FLINCH = 1
+    STATUS_CHANCE = 2
+    STAT_DROP_CHANCE = 3
+    STAT_DROP = 4
+    RECOIL = 5
+    ABSORB = 6
+    CRASH = 7
+    HIGH_CRIT = 8
+    RECHARGE = 9
+    THRASH = 10
+    TWO_TURN = 11
+    MULTI_HIT = 12
+    TRAP = 13
+    PRIORITY = 14
+    # effects of status moves
+    INFLICT = 15
+    STAT_CHANGE = 16
+    CRIT_BOOST = 17
+
+class MoveEffect:
+    """ A move's effect code and its parameters, parsed once from the
+    movelist's Effect column.
+
+    Attributes:
+        code (int) = one of the Effect codes
+        chance (int) = the percent chance that the effect happens
+        statuses (tuple of str) = the status conditions the move can
+        inflict, tried in order until one sticks
+        stats (tuple) = (stat name, stages) pairs; positive stages raise the
+        user's stat, negative stages lower the defender's
+        hits (tuple of int) = the numbers of hits the move can make, one of
+        which is picked at random
+        divisor (int) = the user loses damage / divisor HP after hitting, or
+        gains it back if divisor is negative
+    """
+    __slots__ = ("code", "chance", "statuses", "stats", "hits", "divisor")
+
+    def __init__(self, code=Effect.NONE, chance=100, statuses=(), stats=(),
+    hits=(1,), divisor=None):
+        self.code = code
+        self.chance = chance
+        self.statuses = statuses
+        self.stats = stats
+        self.hits = hits
+        self.divisor = divisor
+
+    @staticmethod
+    def parse(effect):
+        "The MoveEffect of an Effect column entry; NO_EFFECT if it has none"
+        return EFFECTS.get(effect, NO_EFFECT)
+
+    def __repr__(self):
+        return "MoveEffect({})".format(", ".join("{}={!r}".format(slot,
+        getattr(self, slot)) for slot in self.__slots__))
+
+NO_EFFECT = MoveEffect()
+
+# The keys are matched against the movelist exactly as they were when these
+# effects were kept in the SecondaryEffects and StatusMoves lists below.
+EFFECTS = {
+    'Flinch10': MoveEffect(Effect.FLINCH, chance=10),
+    'Flinch20': MoveEffect(Effect.FLINCH, chance=20),
+    'Flinch30': MoveEffect(Effect.FLINCH, chance=30),
+    'BRN10': MoveEffect(Effect.STATUS_CHANCE, 10, (Statuses.BRN,)),
+    'FRZ10': MoveEffect(Effect.STATUS_CHANCE, 10, (Statuses.FRZ,)),
+    'PRZ10': MoveEffect(Effect.STATUS_CHANCE, 10, (Statuses.PRZ,)),
+    'PBF10': MoveEffect(Effect.STATUS_CHANCE, 10,
+    (Statuses.BRN, Statuses.FRZ, Statuses.PRZ)), # Tri Attack
+    'PRZ30': MoveEffect(Effect.STATUS_CHANCE, 30, (Statuses.PRZ,)),
+    'PSN30': MoveEffect(Effect.STATUS_CHANCE, 30, (Statuses.PSN,)),
+    'PRZ40': MoveEffect(Effect.STATUS_CHANCE, 40, (Statuses.PSN,)),
+    'Confuse10': MoveEffect(Effect.STATUS_CHANCE, 10, (Statuses.CON,)),
+    'Confuse20': MoveEffect(Effect.STATUS_CHANCE, 20, (Statuses.CON,)),
+    'AttackDrop10': MoveEffect(Effect.STAT_DROP_CHANCE, 10,
+    stats=(("Attack", -1),)),
+    'SpdefDrop10': MoveEffect(Effect.STAT_DROP_CHANCE, 10,
+    stats=(("SpDef", -1),)),
+    'SpeedDrop10': MoveEffect(Effect.STAT_DROP_CHANCE, 10,
+    stats=(("Speed", -1),)),
+    'SpeedDrop100': MoveEffect(Effect.STAT_DROP, stats=(("Speed", -1),)),
+    'Recoil4': MoveEffect(Effect.RECOIL, divisor=4),
+    'Recoil3': MoveEffect(Effect.RECOIL, divisor=3),
+    'Absorb': MoveEffect(Effect.ABSORB, divisor=-2),
+    'Crash': MoveEffect(Effect.CRASH),
+    'High-Crit': MoveEffect(Effect.HIGH_CRIT),
+    'Recharge': MoveEffect(Effect.RECHARGE),
+    'Thrash-Like': MoveEffect(Effect.THRASH),
+    '2Turn': MoveEffect(Effect.TWO_TURN),
+    '2Hit': MoveEffect(Effect.MULTI_HIT, hits=(DamageFormula.TWO_HIT,)),
+    'Multi-Hit': MoveEffect(Effect.MULTI_HIT, hits=DamageFormula.MULTI_HIT),
+    'Trap': MoveEffect(Effect.TRAP),
+    'Priority1': MoveEffect(Effect.PRIORITY),
+    'SLP Inflict': MoveEffect(Effect.INFLICT, statuses=(Statuses.SLP,)),
+    'PRZ Inflict': MoveEffect(Effect.INFLICT, statuses=(Statuses.PRZ,)),
+    'TOX Inflict': MoveEffect(Effect.INFLICT, statuses=(Statuses.TOX,)),
+    'PSN Inflict': MoveEffect(Effect.INFLICT, statuses=(Statuses.PSN,)),
+    # 'Confuse Inflict' isn't implemented yet; like every other status move
+    # without an entry here, it falls through to the Focus Energy handler
+    'ATKdrop': MoveEffect(Effect.STAT_CHANGE, stats=(("Attack", -1),)),
+    'ATKboost': MoveEffect(Effect.STAT_CHANGE, stats=(("Attack", 1),)),
+    'Atk and Spatk Boost': MoveEffect(Effect.STAT_CHANGE,
+    stats=(("Attack", 1), ("SpAtk", 1))), # Growth
+    'DEFdrop': MoveEffect(Effect.STAT_CHANGE, stats=(("Defense", -1),)),
+    'DEFdrop2': MoveEffect(Effect.STAT_CHANGE, stats=(("Defense", -2),)),
+    'DEFboost': MoveEffect(Effect.STAT_CHANGE, stats=(("Defense", 1),)),
+    'DEFboost2': MoveEffect(Effect.STAT_CHANGE, stats=(("Defense", 2),)),
+    'SpdefBoost2': MoveEffect(Effect.STAT_CHANGE, stats=(("SpDef", 2),)),
+    'Speed Drop': MoveEffect(Effect.STAT_CHANGE, stats=(("Speed", -1),)),
+    'SPEEDboost2': MoveEffect(Effect.STAT_CHANGE, stats=(("Speed", 2),)),
+    'CritBoost': MoveEffect(Effect.CRIT_BOOST),
+}
 
 class Move:
     """ Establishes the characteristics of a Pokemon's move
+
+    Moves are compiled once from the movelist into the MoveTable. They are
+    immutable and interned: Move(name) returns the one shared record for that
+    move instead of searching the movelist again.
     
     Attributes:
+        id (int) = this move's row in the movelist
         name (str) = this move's name
         type (Type) = this move's type
+        type_id (int) = the id of this move's type in the type chart
         category (str) = this category of this move
         power (float) = this move's power; is "None" if this move uses no
         damage calculation, and is an int between 0 and 100 otherwise
         accuracy (str or int) = this move's accuracy; is "None" if this
         move cannot miss; is an int between 0 and 100 otherwise
+        effect (str) = the move's entry in the movelist's Effect column
+        descriptor (MoveEffect) = the effect code and parameters parsed from
+        the Effect column
     """
+    __slots__ = ("id", "name", "type", "category", "power", "accuracy",
+    "effect", "type_id", "descriptor")
 
-    def __init__(self, move_name):
-        move = self.moveInfo(move_name)
-        self.name = move_name
-        self.type = move.values[0][2]
-        self.category = move.values[0][3]
-        self.power = self.parsePower(move.values[0][6])
-        self.accuracy = self.parseAccuracy(move.values[0][7])
+    def __new__(cls, move_name):
+        return MoveTable.get(move_name)
 
-    def moveInfo(self, move_name):
-        move = Data.movelist.loc[Data.movelist['Name'] == move_name]
+    @classmethod
+    def compile(cls, move_id, name, move_type, category, power, accuracy,
+    effect):
+        "Builds a new Move record; only MoveTable should call this"
+        move = object.__new__(cls)
+        for slot, value in zip(cls.__slots__, (move_id, name, move_type,
+        category, cls.parsePower(power), cls.parseAccuracy(accuracy),
+        effect.strip(), Type.get_id(move_type), MoveEffect.parse(effect))):
+            object.__setattr__(move, slot, value)
         return move
 
-    def parsePower(self, power): 
+    def __setattr__(self, name, value):
+        raise AttributeError("Move objects are immutable")
+
+    def __reduce__(self):
+        # unpickling (e.g. in a worker process) interns the move again
+        return (Move, (self.name,))
+
+    def __repr__(self):
+        return "Move({!r})".format(self.name)
+
+    @staticmethod
+    def parsePower(power): 
         # power can be an int or a string
         if power != "None":
             power = int(power)
         return power
             
-    def parseAccuracy(self, accuracy): 
+    @staticmethod
+    def parseAccuracy(accuracy): 
         # accuracy can be an int or a string
         if accuracy != "None":
             accuracy = int(accuracy)
         return accuracy
 
+    def getId(self):
+        return self.id
+
     def getName(self):
         return self.name
 
     def getType(self):
         return self.type
 
+    def getTypeId(self):
+        return self.type_id
+
     def getCategory(self):
         return self.category
 
@@ -52,6 +203,9 @@ class Move:
     def getAccuracy(self):
         return self.accuracy
 
+    def getDescriptor(self):
+        return self.descriptor
+
     def accuracyRoll(self, randNo):
         """ Determines whether or not a move will hit this turn.
         
@@ -67,7 +221,7 @@ class Move:
         if self.accuracy <= randNo:
             return False
 
-    def effect_multiplier(self, type1, type2):
+    def effect_multiplier(self, type1, type2, events=None):
         """ Determines if this move is super effective, not very effective,
             or not effective against the defending Pokemon.
             
@@ -75,70 +229,100 @@ class Move:
            type1 (str): The defending Pokemon's primary type
            type2 (str): The defending Pokemon's secondary type; equal to "None"
            if the defender has no secondary type.
+           events (sink): where to report the result; defaults to the console
         
         Returns:
             multiplier (int): is used to multiply the damage output accordingly
         
         Side Effects:
-            Prints the result ("it's super effective!" if super effective)
+            Reports the result ("it's super effective!" if super effective)
         """
-        # Checks primary type
-        multiplier = 1
-        if type1 in Type.no_effect.get(self.type):
-            multiplier = 0
-            print("It had no effect.")
-            return multiplier
-        elif type1 in Type.super_effective.get(self.type):
-            multiplier *= 2
-        elif type1 in Type.not_very_effective.get(self.type):
-            multiplier *= .5
-
-        #Checks secondary type
-        if type2 == Type.NONE:
-            if multiplier == 2:
-                print("It's super effective!")
-            elif multiplier == .5:
-                print("It's not very effective.")
-            elif multiplier == 0:
-                print("It had no effect.")
-            return multiplier
-        elif type2 in Type.no_effect.get(self.type):
-            multiplier = 0
-            print("It had no effect.")
-            return multiplier
-        elif type2 in Type.super_effective.get(self.type):
-            multiplier *= 2
-        elif type2 in Type.not_very_effective.get(self.type):
-            multiplier *= .5      
-            
-        # Prints based on multiplier; "no effect" cases are covered above
-        if multiplier == 2:
-            print("It's super effective!")
-        elif multiplier == .5:
-            print("It's not very effective.")
+        multiplier = self.effectiveness((Type.get_id(type1), Type.get_id(type2)))
+        if Type.effect_message(multiplier) is not None:
+            if events is None:
+                events = Events.CONSOLE
+            events.emit(Events.Effectiveness, self, multiplier)
         return multiplier
 
+    def effectiveness(self, defender_ids):
+        """ Looks up this move's damage multiplier in the type chart without
+        announcing anything.
+
+        Parameters:
+            defender_ids (tuple of int): the ids of the defender's two types
+
+        Returns:
+            multiplier (int): is used to multiply the damage output accordingly
+        """
+        return Type.effectiveness(self.type_id, defender_ids)
+
+class MoveTable:
+    """ Every move in the movelist compiled into Move records, indexed by
+    name and by id. Built once when this module is imported.
+    """
+    by_id = []
+    by_name = {}
+
+    @classmethod
+    def load(cls, data):
+        """ Compiles every row of the movelist. Names are stripped of stray
+        whitespace; if a name appears twice, its first row is used.
+
+        Parameters:
+            data (DataSet): the data set holding the movelist
+        """
+        cls.by_id = []
+        cls.by_name = {}
+        columns = [data.move_columns.index(column) for column in
+        ("Name", "Type", "Category", "Power", "Accuracy", "Effect")]
+        for move_id, row in enumerate(data.move_rows):
+            name, move_type, category, power, accuracy, effect = [
+                row[column] for column in columns]
+            move = Move.compile(move_id, name.strip(), move_type, category,
+            power, accuracy, effect)
+            cls.by_id.append(move)
+            cls.by_name.setdefault(move.name, move)
+
+    @classmethod
+    def get(cls, move_name):
+        """ Returns the Move with the given name.
+
+        Raises:
+            KeyError if no move has that name
+        """
+        try:
+            return cls.by_name[move_name]
+        except KeyError:
+            return cls.by_name[move_name.strip()]
+
+    @classmethod
+    def get_by_id(cls, move_id):
+        return cls.by_id[move_id]
+
+MoveTable.load(Data)
+
 class StatusMoves:
-    """ Various collections of moves with the category "Status" 
+    """ Various collections of moves with the category "Status". Battles
+    read each Move's descriptor instead; these are kept for reference.
     """
     # Moves that inflict status conditions based on movelist
-    SLP_INFLICT = Data.movelist.loc[Data.movelist['Effect'] == 'SLP Inflict']['Name'].tolist()
-    PRZ_INFLICT = Data.movelist.loc[Data.movelist['Effect'] == 'PRZ Inflict']['Name'].tolist()
-    TOX_INFLICT = Data.movelist.loc[Data.movelist['Effect'] == 'TOX Inflict']['Name'].tolist()
-    PSN_INFLICT = Data.movelist.loc[Data.movelist['Effect'] == 'PSN Inflict']['Name'].tolist()
-    CON_INFLICT = Data.movelist.loc[Data.movelist['Effect'] == 'Confuse Inflict']['Name'].tolist()
+    SLP_INFLICT = Data.moves_with_effect('SLP Inflict')
+    PRZ_INFLICT = Data.moves_with_effect('PRZ Inflict')
+    TOX_INFLICT = Data.moves_with_effect('TOX Inflict')
+    PSN_INFLICT = Data.moves_with_effect('PSN Inflict')
+    CON_INFLICT = Data.moves_with_effect('Confuse Inflict')
 
     # Moves that affect stats based on movelist
-    ATK_DROP = Data.movelist.loc[Data.movelist['Effect'] == 'ATKdrop']['Name'].tolist()
-    ATK_BOOST = Data.movelist.loc[Data.movelist['Effect'] == 'ATKboost']['Name'].tolist() + ["Growth"]
-    DEF_DROP = Data.movelist.loc[Data.movelist['Effect'] == 'DEFdrop']['Name'].tolist()
-    DEF_DROP_2 = Data.movelist.loc[Data.movelist['Effect'] == 'DEFdrop2']['Name'].tolist()
-    DEF_BOOST = Data.movelist.loc[Data.movelist['Effect'] == 'DEFboost']['Name'].tolist()
-    DEF_BOOST_2 = Data.movelist.loc[Data.movelist['Effect'] == 'DEFboost2']['Name'].tolist()
+    ATK_DROP = Data.moves_with_effect('ATKdrop')
+    ATK_BOOST = Data.moves_with_effect('ATKboost') + ["Growth"]
+    DEF_DROP = Data.moves_with_effect('DEFdrop')
+    DEF_DROP_2 = Data.moves_with_effect('DEFdrop2')
+    DEF_BOOST = Data.moves_with_effect('DEFboost')
+    DEF_BOOST_2 = Data.moves_with_effect('DEFboost2')
     SPATK_BOOST = ["Growth"]
-    SPDEF_BOOST_2 = Data.movelist.loc[Data.movelist['Effect'] == 'SpdefBoost2']['Name'].tolist()
-    SPEED_DROP = Data.movelist.loc[Data.movelist['Effect'] == 'Speed Drop']['Name'].tolist()
-    SPEED_BOOST_2 = Data.movelist.loc[Data.movelist['Effect'] == 'SPEEDboost2']['Name'].tolist()
+    SPDEF_BOOST_2 = Data.moves_with_effect('SpdefBoost2')
+    SPEED_DROP = Data.moves_with_effect('Speed Drop')
+    SPEED_BOOST_2 = Data.moves_with_effect('SPEEDboost2')
     CRIT_BOOST = ["Focus Energy"]
 
     STATUS_INFLICT = SLP_INFLICT + PRZ_INFLICT + PSN_INFLICT + TOX_INFLICT
@@ -148,54 +332,55 @@ class StatusMoves:
 class SecondaryEffects:
     """ Establishes all of the moves with secondary effects. Many of these
     effects are the chance that something (stat drop, flinch, status, etc)
-    will occur."""
+    will occur. Battles read each Move's descriptor instead; these are kept
+    for reference."""
     # moves w/chance to flinch (IMPLEMENTED)
-    FLINCH_10 = Data.movelist.loc[Data.movelist['Effect'] == 'Flinch10']['Name'].tolist()
-    FLINCH_20 = Data.movelist.loc[Data.movelist['Effect'] == 'Flinch20']['Name'].tolist()
-    FLINCH_30 = Data.movelist.loc[Data.movelist['Effect'] == 'Flinch30']['Name'].tolist()
+    FLINCH_10 = Data.moves_with_effect('Flinch10')
+    FLINCH_20 = Data.moves_with_effect('Flinch20')
+    FLINCH_30 = Data.moves_with_effect('Flinch30')
     FLINCH_CHANCE = FLINCH_10 + FLINCH_20 + FLINCH_30
 
     # moves w/chance to inflict a status condition (IMPLEMENTED)
-    BRN_10 = Data.movelist.loc[Data.movelist['Effect'] == 'BRN10']['Name'].tolist() + ["Tri Attack"]
-    FRZ_10 = Data.movelist.loc[Data.movelist['Effect'] == 'FRZ10']['Name'].tolist() + ["Tri Attack"]
-    PRZ_10 = Data.movelist.loc[Data.movelist['Effect'] == 'PRZ10']['Name'].tolist() + ["Tri Attack"]
-    PRZ_30 = Data.movelist.loc[Data.movelist['Effect'] == 'PRZ30']['Name'].tolist()
-    PSN_30 = Data.movelist.loc[Data.movelist['Effect'] == 'PSN30']['Name'].tolist()
-    PSN_40 = Data.movelist.loc[Data.movelist['Effect'] == 'PRZ40']['Name'].tolist()
-    CON_10 = Data.movelist.loc[Data.movelist['Effect'] == 'Confuse10']['Name'].tolist()
-    CON_20 = Data.movelist.loc[Data.movelist['Effect'] == 'Confuse20']['Name'].tolist()
+    BRN_10 = Data.moves_with_effect('BRN10') + ["Tri Attack"]
+    FRZ_10 = Data.moves_with_effect('FRZ10') + ["Tri Attack"]
+    PRZ_10 = Data.moves_with_effect('PRZ10') + ["Tri Attack"]
+    PRZ_30 = Data.moves_with_effect('PRZ30')
+    PSN_30 = Data.moves_with_effect('PSN30')
+    PSN_40 = Data.moves_with_effect('PRZ40')
+    CON_10 = Data.moves_with_effect('Confuse10')
+    CON_20 = Data.moves_with_effect('Confuse20')
     STATUS_INFLICT_CHANCE = BRN_10 + FRZ_10 + PRZ_10 + CON_10 + CON_20 + PRZ_30 + PSN_30 + PSN_40
 
     # moves w/chance to drop the opponent's stats (IMPLEMENTED)
-    ATTACK_DROP_10 = Data.movelist.loc[Data.movelist['Effect'] == 'AttackDrop10']['Name'].tolist()
-    SPDEF_DROP_10 = Data.movelist.loc[Data.movelist['Effect'] == 'SpdefDrop10']['Name'].tolist()
-    SPEED_DROP_10 = Data.movelist.loc[Data.movelist['Effect'] == 'SpeedDrop10']['Name'].tolist()
+    ATTACK_DROP_10 = Data.moves_with_effect('AttackDrop10')
+    SPDEF_DROP_10 = Data.moves_with_effect('SpdefDrop10')
+    SPEED_DROP_10 = Data.moves_with_effect('SpeedDrop10')
     STAT_DROP_CHANCE = ATTACK_DROP_10 + SPDEF_DROP_10 + SPEED_DROP_10
 
     # moves that always drop stats (IMPLEMENTED)
-    SPEED_DROP_100 = Data.movelist.loc[Data.movelist['Effect'] == 'SpeedDrop100']['Name'].tolist()
+    SPEED_DROP_100 = Data.moves_with_effect('SpeedDrop100')
 
     # moves that affect the user's HP in some way (IMPLEMENTED)
-    RECOIL_4 = Data.movelist.loc[Data.movelist['Effect'] == 'Recoil4']['Name'].tolist()
-    RECOIL_3 = Data.movelist.loc[Data.movelist['Effect'] == 'Recoil3']['Name'].tolist()
-    ABSORB = Data.movelist.loc[Data.movelist['Effect'] == 'Absorb']['Name'].tolist()
-    CRASH = Data.movelist.loc[Data.movelist['Effect'] == 'Crash']['Name'].tolist()
+    RECOIL_4 = Data.moves_with_effect('Recoil4')
+    RECOIL_3 = Data.moves_with_effect('Recoil3')
+    ABSORB = Data.moves_with_effect('Absorb')
+    CRASH = Data.moves_with_effect('Crash')
     RECOIL = RECOIL_3 + RECOIL_4
     
     # moves w/high chance to crit (IMPLEMENTED)
-    HIGH_CRIT = Data.movelist.loc[Data.movelist['Effect'] == 'High-Crit']['Name'].tolist()
+    HIGH_CRIT = Data.moves_with_effect('High-Crit')
 
     # moves that span multiple turns
-    RECHARGE = Data.movelist.loc[Data.movelist['Effect'] == 'Recharge']['Name'].tolist()
-    THRASH_LIKE = Data.movelist.loc[Data.movelist['Effect'] == 'Thrash-Like']['Name'].tolist()
-    TWO_TURN = Data.movelist.loc[Data.movelist['Effect'] == '2Turn']['Name'].tolist()
-    CONSECUTIVE = Data.movelist.loc[Data.movelist['Effect'] == 'SpeedDrop10']['Name'].tolist()
+    RECHARGE = Data.moves_with_effect('Recharge')
+    THRASH_LIKE = Data.moves_with_effect('Thrash-Like')
+    TWO_TURN = Data.moves_with_effect('2Turn')
+    CONSECUTIVE = Data.moves_with_effect('SpeedDrop10')
 
     # moves involving multiple hits or chip damage (IMPLEMENTED)
-    TWO_HIT = Data.movelist.loc[Data.movelist['Effect'] == '2Hit']['Name'].tolist()
-    MULTI_HIT = Data.movelist.loc[Data.movelist['Effect'] == 'Multi-Hit']['Name'].tolist()
+    TWO_HIT = Data.moves_with_effect('2Hit')
+    MULTI_HIT = Data.moves_with_effect('Multi-Hit')
     # may not implement trap moves
-    TRAP = Data.movelist.loc[Data.movelist['Effect'] == 'Trap']['Name'].tolist()
+    TRAP = Data.moves_with_effect('Trap')
 
     # move(s) with higher priority (may not implement)
-    PRIORITY_1 = Data.movelist.loc[Data.movelist['Effect'] == 'Priority1']['Name'].tolist()
\ No newline at end of file
+    PRIORITY_1 = Data.moves_with_effect('Priority1')
\ No newline at end of file
@@ -0,0 +1,364 @@
+""" Moveset search for one species by successive halving
+
+    The pokedex gives every species four hand-picked moves. A moveset
+    search draws candidate sets of four moves for a species from the
+    movelist and ranks them by the win rate they get against the roster,
+    with both players picking moves as the batch runner's computer players
+    do. Most candidates are plainly weak, so they are raced: every candidate
+    plays a few battles, the better half (or 1/eta) goes on to play as many
+    again, and so on until one is left. The strongest candidates end up
+    with most of the battles, and so with the tightest win rates.
+
+    Battle k of any candidate is the same battle: the same opponent, seat
+    and seed, drawn from the master seed alone, so candidates are compared
+    on the same luck and a search is reproducible whatever the number of
+    workers. Each round's battles are split into one task per candidate
+    and run on a process pool.
+"""
+
+import os, math, random, time, json, itertools
+from concurrent.futures import ProcessPoolExecutor
+from Constants import Data, Type
+from Moves import MoveTable, Effect, NO_EFFECT
+from PokemonGenerator import SpeciesTable
+from batch import play, MAX_TURNS
+from tournament import battle_seed, ROSTER_SIZE
+from Rng import make_rng
+from OnlineStats import wilson_interval
+
+# the Implementation column entries of moves that battles play
+IMPLEMENTED = ("Y", "YNS", "T")
+
+# where candidates draw their moves from: the species' own types and
+# Normal, or every playable move
+POOLS = ("types", "all")
+
+def playable(move):
+    """ Whether a battle can use a move as the movelist describes it:
+    implemented, with the power a damaging move needs, not a Crash move that
+    can miss (which raises an error), and not a status move without an
+    effect (which acts like Focus Energy).
+    """
+    if move.category == "Status":
+        return move.descriptor is not NO_EFFECT
+    if move.power == "None":
+        return False
+    return not (move.descriptor.code == Effect.CRASH
+    and move.accuracy != "None" and move.accuracy < 100)
+
+def implemented_ids():
+    "The ids of the moves the movelist marks as implemented"
+    column = Data.move_columns.index("Implementation")
+    return set(move_id for move_id, row in enumerate(Data.move_rows)
+    if row[column] in IMPLEMENTED)
+
+def move_pool(dexno, pool="types"):
+    """ The moves a species' candidates are drawn from.
+
+    Parameters:
+        dexno (int): the species' row
+        pool (str): one of POOLS
+
+    Returns:
+        A list of Moves: the species' own moves and every playable move in
+        the pool, each once, in movelist order
+    """
+    if pool not in POOLS:
+        raise ValueError("Unknown move pool: {}".format(pool))
+    species = SpeciesTable.get(dexno)
+    implemented = implemented_ids()
+    own = set(species.move_ids or ())
+    moves = []
+    for move in MoveTable.by_id:
+        if MoveTable.by_name[move.name] is not move:
+            continue # a repeated name; battles use its first row
+        if move.id not in own:
+            if move.id not in implemented or not playable(move):
+                continue
+            if pool == "types" and move.type != Type.NORMAL and (
+            move.type not in species.types):
+                continue
+        moves.append(move)
+    return moves
+
+def sample_candidates(dexno, n, pool="types", seed=0):
+    """ Draws distinct movesets for a species.
+
+    Returns:
+        Up to n tuples of four move ids, sorted within each tuple; the
+        species' own moveset comes first, and every other one has at least
+        one damaging move
+    """
+    species = SpeciesTable.get(dexno)
+    moves = move_pool(dexno, pool)
+    ids = [move.id for move in moves]
+    damaging = set(move.id for move in moves if move.category != "Status")
+    if len(ids) < 4:
+        raise ValueError("{} has only {} moves to choose from".format(
+            species.name, len(ids)))
+    candidates = []
+    seen = set()
+    if species.move_ids is not None and len(set(species.move_ids)) == 4:
+        candidates.append(tuple(sorted(species.move_ids)))
+        seen.add(candidates[0])
+    # every moveset of the pool with a damaging move, and the species' own
+    # if it isn't one of them
+    available = math.comb(len(ids), 4) - math.comb(len(ids) - len(damaging), 4)
+    if candidates and not (set(candidates[0]) <= set(ids) and
+    damaging.intersection(candidates[0])):
+        available += 1
+    limit = min(n, available)
+    rng = random.Random(seed)
+    if limit == available:
+        # every moveset is wanted, so list them instead of drawing
+        rest = [moveset for moveset in itertools.combinations(sorted(ids), 4)
+        if moveset not in seen and damaging.intersection(moveset)]
+        rng.shuffle(rest)
+        candidates.extend(rest)
+    while len(candidates) < limit:
+        moveset = tuple(sorted(rng.sample(ids, 4)))
+        if moveset in seen or not damaging.intersection(moveset):
+            continue
+        seen.add(moveset)
+        candidates.append(moveset)
+    return candidates[:limit]
+
+def schedule(roster, master_seed):
+    """ The order in which candidates meet their opponents: every
+    (opponent, seat) pairing once, shuffled by the master seed, so that the
+    few battles of the first round are spread over the whole roster.
+    """
+    pairings = [(opponent, seat) for opponent in roster for seat in (1, 2)]
+    random.Random(master_seed).shuffle(pairings)
+    return pairings
+
+def play_battles(dexno, start, stop, pairings, master_seed, max_turns,
+backend, ai, rng, spares, moves=None, spread=None):
+    """ Plays battles start to stop - 1 of one species against the schedule,
+    with the moves or the spread being searched for. Both searches play
+    their battles here, so battle k is the same battle in either.
+
+    Parameters:
+        dexno (int): the species
+        start, stop (int): the range of battle numbers to play
+        pairings (list): the schedule's (opponent, seat) pairings
+        master_seed (int): the search's master seed
+        max_turns (int): the number of turns after which a battle is a draw
+        backend (str): the random number backend, one of Rng.BACKENDS
+        ai (str): both players' kind of computer player, a key of
+        batch.AI_PLAYERS
+        rng (Rng): the random number generator, reseeded for every battle
+        spares (dict): spare players to reuse, as for batch.play
+        moves (tuple of Move): the species' moves; its own if None
+        spread (tuple): the species' (EVs, IVs, nature id); rolled if None
+
+    Returns:
+        (wins, errors) over those battles; draws and errors are not wins
+    """
+    wins = errors = 0
+    for k in range(start, stop):
+        opponent, seat = pairings[k % len(pairings)]
+        seed = battle_seed(master_seed, dexno, opponent, k)
+        if seat == 1:
+            dexnos = (dexno, opponent)
+            movesets, spreads = (moves, None), (spread, None)
+        else:
+            dexnos = (opponent, dexno)
+            movesets, spreads = (None, moves), (None, spread)
+        result = play(seed, dexnos[0], dexnos[1], max_turns, backend=backend,
+        rng=rng, ai1=ai, ai2=ai, spares=spares, movesets=movesets,
+        spreads=spreads)
+        if result.error is not None:
+            errors += 1
+        elif result.winner == seat:
+            wins += 1
+    return wins, errors
+
+def evaluate(dexno, move_ids, start, stop, roster, master_seed,
+max_turns=MAX_TURNS, backend="python", ai="random"):
+    """ Plays battles start to stop - 1 of one candidate.
+
+    Parameters:
+        dexno (int): the candidate's species
+        move_ids (tuple of int): the candidate's moves
+        start, stop (int): the range of battle numbers to play
+        roster (list of int): the opponents' rows
+        master_seed (int): the search's master seed
+        max_turns (int), backend (str), ai (str): as for play_battles
+
+    Returns:
+        (wins, errors) over those battles; draws and errors are not wins
+    """
+    moves = tuple(MoveTable.get_by_id(move_id) for move_id in move_ids)
+    return play_battles(dexno, start, stop, schedule(roster, master_seed),
+    master_seed, max_turns, backend, ai, make_rng(None, backend), {},
+    moves=moves)
+
+class Candidate:
+    """ One moveset and how it has done so far.
+
+    Attributes:
+        move_ids (tuple of int) = its moves
+        battles (int) = the battles it has played
+        wins (int) = the battles it won
+        errors (int) = the battles that raised an error
+        rounds (int) = the number of rounds it played in
+    """
+    def __init__(self, move_ids):
+        self.move_ids = tuple(move_ids)
+        self.battles = 0
+        self.wins = 0
+        self.errors = 0
+        self.rounds = 0
+
+    @property
+    def names(self):
+        return [MoveTable.get_by_id(move_id).name for move_id in self.move_ids]
+
+    def win_rate(self):
+        return self.wins / self.battles if self.battles else None
+
+    def interval(self):
+        return wilson_interval(self.wins, self.battles)
+
+    def as_dict(self):
+        interval = self.interval()
+        return {
+            "moves": self.names,
+            "move_ids": list(self.move_ids),
+            "battles": self.battles,
+            "wins": self.wins,
+            "errors": self.errors,
+            "rounds": self.rounds,
+            "win_rate": self.win_rate(),
+            "interval": list(interval) if interval else None
+        }
+
+class SearchReport:
+    """ The results of a moveset search
+
+    Attributes:
+        dexno (int) = the species searched for
+        candidates (list of Candidate) = every candidate, best first: those
+        that lasted more rounds rank above those knocked out earlier, and
+        win rate decides within a round
+        baseline (Candidate) = the species' own moveset, if it was a
+        candidate
+        rounds (list of (int, int)) = the number of candidates in each round
+        and the battles each had played by its end
+        battles (int) = the battles played in all
+        elapsed (float) = wall-clock seconds spent on the search
+    """
+    def __init__(self, dexno, candidates, baseline, rounds, elapsed):
+        self.dexno = dexno
+        self.candidates = sorted(candidates, key=lambda c: (c.rounds,
+        c.win_rate() or 0), reverse=True)
+        self.baseline = baseline
+        self.rounds = rounds
+        self.battles = sum(c.battles for c in candidates)
+        self.elapsed = elapsed
+
+    def rank(self, candidate):
+        return self.candidates.index(candidate) + 1
+
+    def as_dict(self):
+        return {
+            "dexno": self.dexno,
+            "species": SpeciesTable.get(self.dexno).name,
+            "battles": self.battles,
+            "elapsed_seconds": self.elapsed,
+            "rounds": [{"candidates": n, "battles_each": battles}
+            for n, battles in self.rounds],
+            "baseline_rank": self.rank(self.baseline)
+            if self.baseline else None,
+            "candidates": [c.as_dict() for c in self.candidates]
+        }
+
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+    def lines(self, top=10):
+        "The report as text, with the top candidates and the baseline"
+        lines = ["{}: {} candidates, {} battles in {:.2f}s".format(
+            SpeciesTable.get(self.dexno).name, len(self.candidates),
+            self.battles, self.elapsed)]
+        shown = self.candidates[:top]
+        if self.baseline is not None and self.baseline not in shown:
+            shown.append(self.baseline)
+        for candidate in shown:
+            low, high = candidate.interval()
+            lines.append("{:3}. {:.3f} [{:.3f}, {:.3f}] {:5} battles  {}{}"
+            .format(self.rank(candidate), candidate.win_rate(), low, high,
+            candidate.battles, ", ".join(candidate.names),
+            " (current)" if candidate is self.baseline else ""))
+        return lines
+
+def successive_halving(dexno, candidates=64, battles=24, eta=2, seed=0,
+workers=None, pool="types", roster=None, max_turns=MAX_TURNS,
+backend="python", ai="random"):
+    """ Searches for a species' best moveset.
+
+    Parameters:
+        dexno (int): the species' row
+        candidates (int): the number of movesets to draw, counting the
+        species' own
+        battles (int): the battles each candidate plays in the first round;
+        each round multiplies it by eta
+        eta (int): 1/eta of the candidates go on to each next round
+        seed (int): the master seed, for the candidates and the battles
+        workers (int): the number of worker processes; defaults to the
+        number of CPUs. 1 runs everything in this process.
+        pool (str): where moves are drawn from, one of POOLS
+        roster (list of int): the opponents' rows; every species by default
+        max_turns (int): the number of turns after which a battle is a draw
+        backend (str): the random number backend, one of Rng.BACKENDS
+        ai (str): both players' kind of computer player
+
+    Returns:
+        A SearchReport
+    """
+    if eta < 2:
+        raise ValueError("eta must be at least 2")
+    roster = list(range(ROSTER_SIZE)) if roster is None else list(roster)
+    movesets = sample_candidates(dexno, candidates, pool, seed)
+    everyone = [Candidate(move_ids) for move_ids in movesets]
+    species = SpeciesTable.get(dexno)
+    baseline = None
+    if species.move_ids is not None and everyone and (
+    everyone[0].move_ids == tuple(sorted(species.move_ids))):
+        baseline = everyone[0]
+    workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+    rounds = []
+    start = time.perf_counter()
+    try:
+        alive = list(everyone)
+        target = battles
+        while alive:
+            tasks = [(c, (dexno, c.move_ids, c.battles, target, roster, seed,
+            max_turns, backend, ai)) for c in alive]
+            if executor is None:
+                results = [evaluate(*args) for _, args in tasks]
+            else:
+                futures = [executor.submit(evaluate, *args)
+                for _, args in tasks]
+                results = [future.result() for future in futures]
+            for (candidate, _), (wins, errors) in zip(tasks, results):
+                candidate.wins += wins
+                candidate.errors += errors
+                candidate.battles = target
+                candidate.rounds += 1
+            rounds.append((len(alive), target))
+            if len(alive) == 1:
+                break
+            alive.sort(key=Candidate.win_rate, reverse=True)
+            alive = alive[:max(1, len(alive) // eta)]
+            if len(alive) == 1:
+                break
+            target *= eta
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return SearchReport(dexno, everyone, baseline, rounds,
+    time.perf_counter() - start)
@@ -0,0 +1,225 @@
+""" Online statistics over a stream of battles
+
+    A BattleAggregator keeps running totals instead of battle results: wins
+    and games for every species vs. species pairing, what happened with
+    every move, and a histogram of battle lengths. Its memory use is fixed
+    by the number of species and moves, however many battles it sees.
+
+    It is fed from two places. Its tap() is an event sink put in front of a
+    battle's sink, which counts each move's uses, misses, damage rolls,
+    critical hits and knockouts as they happen; add() then counts the
+    battle's result. Totals are plain integer arrays, so aggregators built
+    in separate worker processes can be pickled back and merged, and the
+    merged totals are exactly those of one aggregator that saw every battle.
+"""
+
+import math, json
+import numpy as np
+from Constants import Data, ROSTER_SIZE
+from Moves import MoveTable
+import Events
+
+# battles of this many turns or more share the last histogram bin
+TURN_BINS = 100
+
+# z for 95% confidence intervals
+Z95 = 1.959964
+
+# the per-move counters, the columns of BattleAggregator.moves
+MOVE_COUNTERS = ("uses", "misses", "damage_rolls", "crits", "knockouts")
+USES, MISSES, DAMAGE_ROLLS, CRITS, KNOCKOUTS = range(len(MOVE_COUNTERS))
+
+def wilson_interval(successes, n, z=Z95):
+    """ The Wilson score interval of a proportion.
+
+    Parameters:
+        successes (float): the number of successes; may be fractional, as
+        for mirror matches that count half a win each
+        n (float): the number of trials
+        z (float): the normal quantile of the confidence level
+
+    Returns:
+        (low, high), or None if there were no trials
+    """
+    if n <= 0:
+        return None
+    p = successes / n
+    denominator = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return (max(0.0, center - margin), min(1.0, center + margin))
+
+class AggregatorTap(Events.Tap):
+    """ Counts move events on the way to another sink. Use one tap per
+    battle.
+
+    Attributes:
+        moves (int array) = the aggregator's per-move counters
+        last_hit (tuple) = the defending Pokemon and move id of the last
+        damage roll, or None if something else has hurt a Pokemon since
+    """
+    def __init__(self, inner, moves):
+        super().__init__(inner)
+        self.moves = moves
+        self.last_hit = None
+
+    def see(self, event_type, args):
+        if event_type is Events.MoveUsed:
+            self.moves[args[1].id, USES] += 1
+        elif event_type is Events.Damage:
+            self.moves[args[2].id, DAMAGE_ROLLS] += 1
+            self.last_hit = (args[1], args[2].id)
+        elif event_type is Events.CriticalHit:
+            self.moves[args[1].id, CRITS] += 1
+        elif event_type is Events.MoveMissed or event_type is Events.Crashed:
+            self.moves[args[1].id, MISSES] += 1
+        elif (event_type is Events.ChipDamage or
+        event_type is Events.ConfusionSelfHit):
+            self.last_hit = None
+
+    def knockout(self):
+        """ The id of the move that knocked a Pokemon out, if the battle
+        ended that way; None if it didn't, or if a Pokemon fainted from
+        poison, a burn or confusion
+        """
+        if self.last_hit is None:
+            return None
+        defender, move_id = self.last_hit
+        return move_id if defender.getCurrentHP() == 0 else None
+
+class BattleAggregator:
+    """ Running totals over every battle added to it.
+
+    Attributes:
+        wins (int array) = wins[i, j] is the number of battles species i won
+        against species j, counting both seatings
+        games (int array) = games[i, j] is the number of decided or drawn
+        battles between species i and j, counting both seatings
+        errors (int array) = errors[i, j] is the number of battles between
+        species i as player 1 and j as player 2 that raised an error
+        moves (int array) = one row per move id, one column per counter in
+        MOVE_COUNTERS
+        turns (int array) = the number of decided or drawn battles of each
+        length; the last bin holds TURN_BINS turns or more
+        battles (int) = the number of battles added
+    """
+    def __init__(self, species=ROSTER_SIZE):
+        self.wins = np.zeros((species, species), dtype=np.int64)
+        self.games = np.zeros((species, species), dtype=np.int64)
+        self.errors = np.zeros((species, species), dtype=np.int64)
+        self.moves = np.zeros((len(MoveTable.by_id), len(MOVE_COUNTERS)),
+        dtype=np.int64)
+        self.turns = np.zeros(TURN_BINS + 1, dtype=np.int64)
+        self.battles = 0
+
+    def tap(self, inner):
+        "A sink for one battle that counts its moves and passes events on"
+        return AggregatorTap(inner, self.moves)
+
+    def add(self, result, tap=None):
+        """ Counts one battle.
+
+        Parameters:
+            result (BattleResult): the battle's result
+            tap (AggregatorTap): the battle's tap, to credit a knockout to
+            the move that did it
+        """
+        self.battles += 1
+        if len(result.dexnos) < 2:
+            return # a Pokemon couldn't be built
+        i, j = result.dexnos
+        if result.error is not None:
+            self.errors[i, j] += 1
+            return
+        self.games[i, j] += 1
+        if i != j:
+            self.games[j, i] += 1
+        if result.winner == 1:
+            self.wins[i, j] += 1
+        elif result.winner == 2:
+            self.wins[j, i] += 1
+        self.turns[min(result.turns, TURN_BINS)] += 1
+        if tap is not None and result.winner is not None:
+            move_id = tap.knockout()
+            if move_id is not None:
+                self.moves[move_id, KNOCKOUTS] += 1
+
+    def merge(self, other):
+        "Adds another aggregator's totals to this one's"
+        self.wins += other.wins
+        self.games += other.games
+        self.errors += other.errors
+        self.moves += other.moves
+        self.turns += other.turns
+        self.battles += other.battles
+
+    def species_win_rate(self, i, z=Z95):
+        """ Species i's win rate over all of its battles.
+
+        Returns:
+            (games, win rate, (low, high)), with None for the rate and
+            interval if it hasn't played
+        """
+        games = int(self.games[i].sum())
+        if games == 0:
+            return games, None, None
+        # mirror wins are counted once for each copy of species i
+        wins = float(self.wins[i].sum() - 0.5 * self.wins[i, i])
+        return games, wins / games, wilson_interval(wins, games, z)
+
+    def matchup_win_rate(self, i, j, z=Z95):
+        "Like species_win_rate, for species i against species j"
+        games = int(self.games[i, j])
+        if games == 0:
+            return games, None, None
+        wins = float(self.wins[i, j] * (0.5 if i == j else 1))
+        return games, wins / games, wilson_interval(wins, games, z)
+
+    def move_rates(self, move_id):
+        """ What happened with one move.
+
+        Returns:
+            A dict of its counters, and its hit rate (uses that didn't miss),
+            crit rate (per damage roll) and knockout rate (per use), which
+            are None if it was never used or never rolled damage
+        """
+        counts = dict(zip(MOVE_COUNTERS, self.moves[move_id].tolist()))
+        uses = counts["uses"]
+        rolls = counts["damage_rolls"]
+        counts["hit_rate"] = 1 - counts["misses"] / uses if uses else None
+        counts["crit_rate"] = counts["crits"] / rolls if rolls else None
+        counts["knockout_rate"] = counts["knockouts"] / uses if uses else None
+        return counts
+
+    def mean_turns(self):
+        "The mean length of decided or drawn battles, with long ones capped"
+        total = self.turns.sum()
+        if total == 0:
+            return None
+        return float((self.turns * np.arange(len(self.turns))).sum() / total)
+
+    def as_dict(self, z=Z95):
+        species = []
+        for i in range(len(self.games)):
+            games, rate, interval = self.species_win_rate(i, z)
+            species.append({"dexno": i, "name": Data.pokedex_rows[i + 1][1],
+            "games": games, "win_rate": rate,
+            "interval": list(interval) if interval else None})
+        moves = []
+        for move in MoveTable.by_id:
+            if self.moves[move.id, USES]:
+                moves.append(dict(id=move.id, name=move.name,
+                **self.move_rates(move.id)))
+        return {
+            "battles": self.battles,
+            "errors": int(self.errors.sum()),
+            "confidence_z": z,
+            "species": species,
+            "moves": moves,
+            "turns_histogram": self.turns.tolist(),
+            "mean_turns": self.mean_turns()
+        }
+
+    def write_json(self, path, z=Z95):
+        with open(path, "w") as f:
+            json.dump(self.as_dict(z), f, indent=2)
@@ -2,8 +2,16 @@
 
 import random, math
 from PokemonGenerator import Pokemon
-from Constants import Statuses, Type
-from Moves import SecondaryEffects, StatusMoves
+from Constants import Statuses, Type, DamageFormula
+from Moves import Effect
+import Events
+
+# the types that can't be given each status condition by a secondary effect
+STATUS_IMMUNITIES = {
+    Statuses.BRN: Type.FIRE,
+    Statuses.FRZ: Type.ICE,
+    Statuses.PSN: Type.POISON,
+}
 
 class Player:
     """ Base class for the Player
@@ -11,14 +19,58 @@ class Player:
     Attributes:
         name (str): the player's name
         pokemon (Pokemon): the player's Pokemon
+        events (sink): where this player reports what happens in battle
+        rng (random number stream): where this player's random numbers come
+        from; shared with its Pokemon
     """
-    def __init__(self, name):
+    def __init__(self, name, dexno=None, events=None, rng=None):
+        """ Parameters:
+            name (str): the player's name
+            dexno (int): the row of the Pokemon this player will use; a
+            random Pokemon is picked if this is None
+            events (sink): the event sink to report to; defaults to the
+            console
+            rng (random number stream): where to draw random numbers from;
+            defaults to the random module
+        """
         self.name = name
-        self.pokemon = Pokemon(random.randint(0,97)) # Can't hit 98?
+        self.events = events if events is not None else Events.CONSOLE
+        self.rng = rng if rng is not None else random
+        if dexno is None:
+            dexno = self.rng.randint(0,97) # Can't hit 98?
+        self.pokemon = Pokemon(dexno, self.events, self.rng)
+
+    def reset(self, dexno=None, events=None, rng=None):
+        """ Gives this player a new Pokemon by resetting the one it has,
+        drawing the same random numbers as constructing a new player would.
+        Subclasses that keep state between turns must reset it too.
+
+        Parameters:
+            dexno, events, rng: as for __init__; events and rng are kept if
+            None
+        """
+        if events is not None:
+            self.events = events
+        if rng is not None:
+            self.rng = rng
+        if dexno is None:
+            dexno = self.rng.randint(0,97)
+        self.pokemon.reset(dexno, self.events, self.rng)
 
     def getPokemon(self):
         return self.pokemon
 
+    def setEvents(self, events):
+        """ Sends this player's and its Pokemon's events to a different sink """
+        self.events = events
+        self.pokemon.setEvents(events)
+
+    def setRng(self, rng):
+        """ Makes this player and its Pokemon draw from a different random
+        number stream """
+        self.rng = rng
+        self.pokemon.setRng(rng)
+
     def getName(self):
         return self.name
 
@@ -30,7 +82,7 @@ class Player:
         Parameters:
             randNo: Randomly generated number between 0 and 15
         """
-        print("Crit roll: {}".format(randNo))
+        self.events.emit(Events.Roll, "Crit", randNo)
         if randNo == 0:
             return True
         else:
@@ -41,95 +93,68 @@ class Player:
         a move with a chance to flinch is used AND the defender is slower than
         the attacker.
         
-        Moves have either a 10, 20, or 30 percent chance to cause flinching.
+        Moves have either a 10, 20, or 30 percent chance to cause flinching,
+        given by the chance in their descriptor.
         """
-        flinch_roll = random.randint(1, 10)
-        print("Flinch roll: {}".format(flinch_roll))
-        move_name = flinch_move.getName()
-        if move_name in SecondaryEffects.FLINCH_10:
-            if flinch_roll == 1:
-                return True
-        elif move_name in SecondaryEffects.FLINCH_20:
-            if flinch_roll == 1 or flinch_roll == 2:
-                return True
-        elif move_name in SecondaryEffects.FLINCH_30:
-            if flinch_roll >= 1 and flinch_roll <= 3:
-                return True
-        return False
+        flinch_roll = self.rng.randint(1, 10)
+        self.events.emit(Events.Roll, "Flinch", flinch_roll)
+        return flinch_roll <= flinch_move.descriptor.chance // 10
     
-    def statusChanceHandler(self, status_move, defender):
+    def statusChanceHandler(self, status_move, damage, defender):
         """ Determines whether or not the defending pokemon will be inflicted
         with a certain status condition. Chances range from 10-40%. 
         
-        Confusion is the only status condition that can stack on top of another
+        Confusion is the only status condition that can stack on top of
+        another. A move that can inflict several conditions (Tri Attack)
+        inflicts the first one the defender isn't immune to.
+
+        Parameters:
+            status_move (Move) = the move with a chance to inflict a status
+            damage (int) = the damage the move dealt
+            defender (Pokemon) = the defending Pokemon
         """
-        status_roll = random.randint(1, 10)
-        print("Status roll: {}".format(status_roll))
-        name = status_move.getName()
-        # I need to optimize this, it hurts to look at
-        if name == "Tri Attack" and defender.getStatus == Statuses.HEALTHY:
-            tri_roll = random.randint(1,3)
-            if tri_roll == 1 and not Type.FIRE in defender.getBothTypes():
-                defender.setStatus(Statuses.BRN)
-            elif tri_roll == 1 and Type.FIRE in defender.getBothTypes():
-                tri_roll = random.randint(2,3)
-            elif tri_roll == 2:
-                defender.setStatus(Statuses.FRZ)
-            elif tri_roll == 3:
-                defender.setStatus(Statuses.PRZ)
-        else:
-            if (name in SecondaryEffects.BRN_10 and status_roll == 1
-            and defender.getStatus() == Statuses.HEALTHY and not Type.FIRE
-            in defender.getBothTypes()):
-                defender.setStatus(Statuses.BRN)
-            elif (name in SecondaryEffects.FRZ_10 and status_roll == 1
-            and defender.getStatus() == Statuses.HEALTHY and not Type.ICE
-            in defender.getBothTypes()):
-                defender.setStatus(Statuses.FRZ)
-            elif (name in SecondaryEffects.PRZ_10 and status_roll == 1
-            and defender.getStatus() == Statuses.HEALTHY):
-                defender.setStatus(Statuses.PRZ)
-            elif (name in SecondaryEffects.CON_10 and status_roll == 1):
+        status_roll = self.rng.randint(1, 10)
+        self.events.emit(Events.Roll, "Status", status_roll)
+        effect = status_move.descriptor
+        if status_roll > effect.chance // 10:
+            return
+        for status in effect.statuses:
+            if status == Statuses.CON:
                 defender.set_confusion(True)
-            elif (name in SecondaryEffects.CON_20 and (status_roll == 1
-            or status_roll == 2)):
-                defender.set_confusion(False)
-            elif (name in SecondaryEffects.PRZ_30 and status_roll >= 1
-            and status_roll <= 3 and defender.getStatus() == Statuses.HEALTHY):
-                defender.setStatus(Statuses.PRZ)
-            elif (name in SecondaryEffects.PSN_30 and status_roll >= 1
-            and status_roll <= 3 and defender.getStatus() == Statuses.HEALTHY
-            and not Type.POISON in defender.getBothTypes()):
-                defender.setStatus(Statuses.PSN)
-            elif (name in SecondaryEffects.PSN_40 and status_roll >= 1
-            and status_roll <= 4 and defender.getStatus() == Statuses.HEALTHY
-            and not Type.POISON in defender.getBothTypes()):
-                defender.setStatus(Statuses.PSN)
-
-    def statDropHandler(self, move, defender):
+                return
+            if (defender.getStatus() == Statuses.HEALTHY and
+            STATUS_IMMUNITIES.get(status) not in defender.getBothTypes()):
+                defender.setStatus(status)
+                return
+
+    def statDropHandler(self, move, damage, defender):
         """ Handles moves that have a chance to drop the defending Pokemon's stats
         
         Parameters:
             move (Move) = the move with a chance to drop one of the defending 
             Pokemon's stats
+            damage (int) = the damage the move dealt
             defender (Pokemon) = the defending Pokemon
 
         Side Effects:
             Calls the Pokemon setCurrentStat method
         """
         # HANDLE PRINTS HERE
-        name = move.getName()
-        if name in SecondaryEffects.SPEED_DROP_100:
-            defender.setCurrentStat("Speed", -1)
-        stat_drop_roll = random.randint(1,10)
-        print("Stat drop roll: {}".format(stat_drop_roll))
-        if stat_drop_roll == 1:
-            if name in SecondaryEffects.ATTACK_DROP_10:
-                defender.setCurrentStat("Attack", -1)
-            elif name in SecondaryEffects.SPDEF_DROP_10:
-                defender.setCurrentStat("SpDef", -1)
-            elif name in SecondaryEffects.SPEED_DROP_10:
-                defender.setCurrentStat("Speed", -1)
+        effect = move.descriptor
+        stat_drop_roll = self.rng.randint(1,10)
+        self.events.emit(Events.Roll, "Stat drop", stat_drop_roll)
+        if stat_drop_roll <= effect.chance // 10:
+            for stat, stages in effect.stats:
+                defender.setCurrentStat(stat, stages)
+
+    def recoilHandler(self, move, damage, defender):
+        """ Applies the recoil or drained HP of a move to the user """
+        change = self.HPchange(move, damage)
+        self.pokemon.setCurrentHP(change)
+
+    def rechargeHandler(self, move, damage, defender):
+        """ Makes the user spend its next turn recharging """
+        self.pokemon.setRecharging(True)
 
     def HPchange(self, move, damage_dealt):
         """ Calculates recoil or drained HP based on Bulbapedia's list of moves
@@ -139,7 +164,7 @@ class Player:
 
         Parameters:
             move (Move) = the move with recoil used by the attacking Pokemon.
-            It can be assumed that this move is in the RECOIL list.
+            It can be assumed that this move has a RECOIL or ABSORB effect.
             damage_dealt (int) = the amount of damage the attacking Pokemon dealt
             with the recoil move.
 
@@ -147,16 +172,12 @@ class Player:
             recoil (int): the amount of recoil damage the attacking Pokemon 
             will take.
         """
-        name = move.getName()
-        if name in SecondaryEffects.RECOIL_3:
-            net_change = math.floor(damage_dealt / 3)
-            print("Recoil: {}".format(net_change))
-        elif name in SecondaryEffects.RECOIL_4:
-            net_change = math.floor(damage_dealt / 4)
-            print("Recoil: {}".format(net_change))
-        elif name in SecondaryEffects.ABSORB:
-            net_change = math.floor(damage_dealt / -2)
-            print("Drained: {}".format(net_change * -1))
+        effect = move.descriptor
+        net_change = math.floor(damage_dealt / effect.divisor)
+        if effect.code == Effect.ABSORB:
+            self.events.emit(Events.Drained, self.pokemon, net_change * -1)
+        else: # effect.code == Effect.RECOIL
+            self.events.emit(Events.Recoil, self.pokemon, net_change)
         return net_change
 
     def damageCalc(self, selected, defender):
@@ -174,24 +195,19 @@ class Player:
             selected (Move): the selected move
             defender (Pokemon): the opposing Pokemon
         """
-        name = selected.getName()
+        effect = selected.descriptor
+        high_crit = effect.code == Effect.HIGH_CRIT
         # evaluates the number of attacks the move will do
-        attacks_remaining = 1
-        if name in SecondaryEffects.TWO_HIT:
-            attacks_remaining = 2
-        elif name in SecondaryEffects.MULTI_HIT:
-            multi_hit_roll = random.randint(1,8)
-            if multi_hit_roll >= 1 and multi_hit_roll <= 3:
-                attacks_remaining = 2
-            elif multi_hit_roll >= 4 and multi_hit_roll <= 6:
-                attacks_remaining = 3
-            elif multi_hit_roll == 7:
-                attacks_remaining = 4
-            else: # multi_hit_roll == 8
-                attacks_remaining = 5
+        if len(effect.hits) == 1:
+            attacks_remaining = effect.hits[0]
+        else:
+            attacks_remaining = self.rng.choice(effect.hits)
         print_num = 0
         if attacks_remaining > 1:
             print_num = attacks_remaining
+        # Checks if super effective, not very effective, or not effective
+        multiplier = selected.effectiveness(defender.getTypeIds())
+        effect_message = Type.effect_message(multiplier)
         while attacks_remaining > 0:
             # Attack / Defense (depicted as "A/D" on bulbapedia)
             if selected.getCategory() == "Physical":
@@ -199,41 +215,46 @@ class Player:
             else: # selected.getCategory() == "Special"
                 ad_ratio = self.pokemon.getSpAtk() / defender.getSpdef()
                 # Status moves have yet to be implemented, so no damage is returned
-            damage = ((42 * selected.getPower() * ad_ratio) / 50) + 2
-            # Checks if super effective, not very effective, or not effective
-            damage = damage * selected.effect_multiplier(
-                defender.getTypes(0), defender.getTypes(1))
+            damage = ((DamageFormula.LEVEL_FACTOR * selected.getPower()
+            * ad_ratio) / DamageFormula.DIVISOR) + DamageFormula.BASE
+            damage = damage * multiplier
+            if effect_message is not None:
+                self.events.emit(Events.Effectiveness, selected, multiplier)
             # Checks for a critical hit
             if self.pokemon.hasCritBoost():
-                if name in SecondaryEffects.HIGH_CRIT:
+                if high_crit:
                     crit_check = 0
                 else: # not a high-crit move
-                    crit_check = random.randint(0,1)
+                    crit_check = self.rng.randint(0,
+                    DamageFormula.BOOSTED_CRIT_ROLL - 1)
             else: # not crit-boosted
-                if name in SecondaryEffects.HIGH_CRIT:
-                    crit_check = random.randint(0,7)
+                if high_crit:
+                    crit_check = self.rng.randint(0,
+                    DamageFormula.HIGH_CRIT_ROLL - 1)
                 else: # not a high-crit move
-                    crit_check = random.randint(0,15)
+                    crit_check = self.rng.randint(0, DamageFormula.CRIT_ROLL - 1)
             if self.criticalHit(crit_check):
                 # THIS DOES NOT ACCOUNT FOR STAT DROPS, MAKE IT DO THAT
-                damage *= 2
-                print("A critical hit!")
+                damage *= DamageFormula.CRIT_MULTIPLIER
+                self.events.emit(Events.CriticalHit, self.pokemon, selected)
             # Checks for same type attack bonus (STAB)
             if selected.getType() in self.pokemon.getBothTypes():
-                damage *= 1.5
-            damage *= (random.randint(85,100) / 100)
+                damage *= DamageFormula.STAB
+            damage *= (self.rng.randint(DamageFormula.RANDOM_MIN,
+            DamageFormula.RANDOM_MAX) / 100)
             damage = math.floor(damage) # debugging purposes
-            print("Damage: {}".format(damage))
+            self.events.emit(Events.Damage, self.pokemon, defender, selected,
+            damage)
             if (self.pokemon.getSpeed() >= defender.getSpeed() and 
-            name in SecondaryEffects.FLINCH_CHANCE):
+            effect.code == Effect.FLINCH):
                 flinched = self.flinch(selected)
                 if flinched:
                     defender.setFlinch(True)
             # decrement the number of attacks remaining, ends the turn if 0
             attacks_remaining -= 1
         if print_num != 0:
-            print("It hit {} times!".format(print_num))
-        if name in SecondaryEffects.THRASH_LIKE:
+            self.events.emit(Events.MultiHit, selected, print_num)
+        if effect.code == Effect.THRASH:
             self.pokemon.incrementThrashTurns()
             self.pokemon.setThrashMove(selected)
         return damage
@@ -246,95 +267,54 @@ class Player:
             defender (Pokemon): the opposing Pokemon
 
         Side Effects:
-            prints a message based on the move's effect
+            reports a message based on the move's effect
         """
-        user = self.getPokemon()
-        move = selected.getName()
-        if move in StatusMoves.STATUS_INFLICT:
-            if defender.getStatus() != Statuses.HEALTHY:
-                print("But it failed!") # should swap spots with next piece of code
-                return
-            else: # defending Pokemon's current status is Healthy
-                if ((move == "Thunder Wave" and Type.GROUND in
-                defender.getBothTypes()) or (selected.getType == Type.POISON 
-                and Type.POISON in defender.getBothTypes)):
-                    # Thunder Wave doesn't hit ground types
-                    # poison types cannot get poisoned.
-                    print ("It had no effect!")
-                    return
-                else: # the move does affect the defending Pokemon
-                    if move in StatusMoves.SLP_INFLICT:
-                        defender.setStatus(Statuses.SLP)
-                        return
-                    elif move in StatusMoves.PRZ_INFLICT:
-                        defender.setStatus(Statuses.PRZ)
-                        return 
-                    # elif move in Statuses.BRN_INFLICT:
-                        # defender.setStatus(Statuses.BRN)
-                        # return
-                    elif move in StatusMoves.PSN_INFLICT:
-                        defender.setStatus(Statuses.PSN)
-                        return
-                    elif move in StatusMoves.CON_INFLICT:
-                        defender.set_confusion(True)
-                    else: # move == "Toxic" (not implemented yet)
-                        defender.setStatus(Statuses.TOX)
-                        return
-        elif move in StatusMoves.STAT_BOOST or move in StatusMoves.STAT_DROP:
-            # there will be more
-            # PRINT HERE
-            pkmn = user.getName()
-            other_pkmn = defender.getName()
-            if move in StatusMoves.ATK_BOOST:
-                user.setCurrentStat("Attack", 1)
-                print(pkmn + "'s attack rose!")
-            elif move in StatusMoves.ATK_DROP:
-                defender.setCurrentStat("Attack", -1)
-                print(other_pkmn + "'s attack fell!")
-            if move in StatusMoves.DEF_BOOST:
-                user.setCurrentStat("Defense", 1)
-                print(pkmn + "'s defense rose!")
-            elif move in StatusMoves.DEF_BOOST_2:
-                user.setCurrentStat("Defense", 2)
-                print(pkmn + "'s defense rose!")
-            elif move in StatusMoves.DEF_DROP:
-                defender.setCurrentStat("Defense", -1)
-                print(other_pkmn + "'s defense fell!")
-            elif move in StatusMoves.DEF_DROP_2:
-                defender.setCurrentStat("Defense", -2)
-                print(other_pkmn + "'s defense fell!")
-            if move in StatusMoves.SPATK_BOOST:
-                user.setCurrentStat("SpAtk", 1)
-                print(pkmn + "'s special attack rose!")
-            if move in StatusMoves.SPDEF_BOOST_2:
-                user.setCurrentStat("SpDef", 2)
-                print(pkmn + "'s special defense rose!")
-            if move in StatusMoves.SPEED_BOOST_2:
-                user.setCurrentStat("Speed", 2)
-                print(pkmn + "'s speed rose!")
-            elif move in StatusMoves.SPEED_DROP:
-                defender.setCurrentStat("Speed", -1)
-                print(other_pkmn + "'s speed fell!")
-            return
         # THERE NEEDS TO BE A CONFUSION SECTION HERE
-        else: # move in Statuses.CRIT_BOOST (assumed to be "Focus Energy" for now)
-            if user.hasCritBoost():
-                print("But it failed!")
-            else: # user is not yet crit-boosted
-                print(user.getName() + " is getting pumped!")
-                user.setCritBoost()
+        handler = Player.STATUS_EFFECTS.get(selected.descriptor.code,
+        Player.critBoostHandler)
+        handler(self, selected, defender)
+
+    def inflictHandler(self, selected, defender):
+        """ Inflicts the status condition of a status move on the defender """
+        if defender.getStatus() != Statuses.HEALTHY:
+            self.events.emit(Events.MoveFailed, selected) # should swap spots with next piece of code
             return
+        # defending Pokemon's current status is Healthy
+        if ((selected.getName() == "Thunder Wave" and Type.GROUND in
+        defender.getBothTypes()) or (selected.getType == Type.POISON 
+        and Type.POISON in defender.getBothTypes)):
+            # Thunder Wave doesn't hit ground types
+            # poison types cannot get poisoned.
+            self.events.emit(Events.MoveHadNoEffect, selected, defender)
+            return
+        # the move does affect the defending Pokemon
+        defender.setStatus(selected.descriptor.statuses[0])
+
+    def statChangeHandler(self, selected, defender):
+        """ Raises the user's stats or lowers the defender's, in the order the
+        move's descriptor lists them
+        """
+        user = self.getPokemon()
+        for stat, stages in selected.descriptor.stats:
+            target = user if stages > 0 else defender
+            target.setCurrentStat(stat, stages)
+            self.events.emit(Events.StatChanged, target, stat, stages)
+
+    def critBoostHandler(self, selected, defender):
+        """ Focus Energy; also used for status moves that aren't implemented """
+        user = self.getPokemon()
+        if user.hasCritBoost():
+            self.events.emit(Events.MoveFailed, selected)
+        else: # user is not yet crit-boosted
+            self.events.emit(Events.CritBoosted, user)
+            user.setCritBoost()
     
     def secondaryEffectHandler(self, name, move, damage, defender):
-        if name in SecondaryEffects.RECOIL or name in SecondaryEffects.ABSORB:
-            change = self.HPchange(move, damage)
-            self.pokemon.setCurrentHP(change)
-        elif name in SecondaryEffects.STAT_DROP_CHANCE:
-            self.statDropHandler(move, defender)
-        elif name in SecondaryEffects.STATUS_INFLICT_CHANCE:
-            self.statusChanceHandler(move, defender)
-        elif name in SecondaryEffects.RECHARGE:
-            self.pokemon.setRecharging(True)
+        """ Applies the secondary effect of a damaging move, if it has one
+        with a handler in SECONDARY_EFFECTS """
+        handler = Player.SECONDARY_EFFECTS.get(move.descriptor.code)
+        if handler is not None:
+            handler(self, move, damage, defender)
 
     def take_turn(self):
         """ Selects a move and calculates the damage.
@@ -347,6 +327,21 @@ class Player:
         """
         raise NotImplementedError
 
+# Dispatch tables from a move's effect code to the Player method that applies
+# it. Damaging moves whose code has no entry have no secondary effect yet.
+Player.SECONDARY_EFFECTS = {
+    Effect.RECOIL: Player.recoilHandler,
+    Effect.ABSORB: Player.recoilHandler,
+    Effect.STAT_DROP_CHANCE: Player.statDropHandler,
+    Effect.STATUS_CHANCE: Player.statusChanceHandler,
+    Effect.RECHARGE: Player.rechargeHandler,
+}
+Player.STATUS_EFFECTS = {
+    Effect.INFLICT: Player.inflictHandler,
+    Effect.STAT_CHANGE: Player.statChangeHandler,
+    Effect.CRIT_BOOST: Player.critBoostHandler,
+}
+
 class ComputerPlayer(Player):
     """ A computer tic tac toe player. Chooses its moves at random. """
     def damageCalc(self, selected, defender):
@@ -358,8 +353,20 @@ class ComputerPlayer(Player):
     def secondaryEffectHandler(self, name, move, damage, defender):
         return super().secondaryEffectHandler(name, move, damage, defender)
 
+    def chooseMove(self, other_pkmn):
+        """ Picks which of this player's moves to use this turn.
+
+        Parameters:
+            other_pkmn (Pokemon): the opposing Pokemon
+
+        Returns:
+            The index (0 thru 3) of the chosen move; random by default
+        """
+        return self.rng.randint(0,3)
+
     def take_turn(self, other_pkmn):
-        """ Randomly selects a move.
+        """ Selects a move with chooseMove, which picks at random unless a
+        subclass overrides it.
         
         Args:
             other_pkmn (Pokemon): the opposing Pokemon.
@@ -370,7 +377,7 @@ class ComputerPlayer(Player):
         """
         if self.pokemon.is_charging():
                 move = self.pokemon.getChargingMove()
-                print(self.pokemon.getName() + " used " + move.getName() + "!")
+                self.events.emit(Events.MoveUsed, self.pokemon, move)
                 damage = self.damageCalc(move, other_pkmn)
                 other_pkmn.setCurrentHP(damage)
                 self.pokemon.resetChargingMove()
@@ -379,34 +386,33 @@ class ComputerPlayer(Player):
         elif self.pokemon.getThrashTurns() > 0:
             move = self.pokemon.getThrashMove()
             name = move.getName()
-            print(self.pokemon.getName() + " used " + name + "!")
+            self.events.emit(Events.MoveUsed, self.pokemon, move)
             damage = self.damageCalc(move, other_pkmn) # thrash turns incremented here
-            thrash_roll = random.randint(2,3)
+            thrash_roll = self.rng.randint(2,3)
             if self.pokemon.getThrashTurns() > 3 or (self.pokemon.getThrashTurns() == 2
             and thrash_roll == 2):
                 self.pokemon.resetThrashMove()
                 self.pokemon.resetThrashTurns()
                 self.pokemon.set_confusion(True)
-                print(self.pokemon.getName() + " is confused due to fatigue!")
+                self.events.emit(Events.ThrashFatigue, self.pokemon)
         else:
-            index = random.randint(0,3)
+            index = self.chooseMove(other_pkmn)
             move = self.pokemon.getMoves(index)
             name = move.getName()
-            print(self.pokemon.getName() + " used " + name + "!")
-            if name in SecondaryEffects.TWO_TURN:
-                print(self.pokemon.getName() + " is charging") # generic message, replace soon
+            self.events.emit(Events.MoveUsed, self.pokemon, move)
+            if move.descriptor.code == Effect.TWO_TURN:
+                self.events.emit(Events.Charging, self.pokemon, move) # generic message, replace soon
                 self.pokemon.set_charging(True)
                 self.pokemon.setChargingMove(move)
-                print(move)
                 return
             if move.getAccuracy() != "None":
-                if not move.accuracyRoll(random.randint(0,99)):
-                    if name in SecondaryEffects.CRASH:
-                        print(self.pokemon.getName() + " kept going and crashed!")
+                if not move.accuracyRoll(self.rng.randint(0,99)):
+                    if move.descriptor.code == Effect.CRASH:
+                        self.events.emit(Events.Crashed, self.pokemon, move)
                         crash_damage = math.floor(self.pokemon.getMaxHP / 2)
                         self.pokemon.setCurrentHP(crash_damage)
                     else: # move does not inflict crash damage
-                        print("The attack missed!")
+                        self.events.emit(Events.MoveMissed, self.pokemon, move)
                     return
             if (move.getCategory() == "Physical" 
             or move.getCategory() == "Special"):
@@ -426,7 +432,15 @@ class ComputerPlayer(Player):
 
 class HumanPlayer(Player):
     """ The human player. Makes their own decisions.
+
+    Attributes:
+        read_input (callable): shows a prompt and returns the line the player
+        typed; input by default, or a recorded session when replaying
     """
+    def __init__(self, name, dexno=None, events=None, rng=None,
+    read_input=None):
+        super().__init__(name, dexno, events, rng)
+        self.read_input = read_input if read_input is not None else input
 
     def getPokemon(self):
         return super().getPokemon()
@@ -451,7 +465,7 @@ class HumanPlayer(Player):
             if self.pokemon.is_charging():
                 # DISTINGUISH BETWEEN DIFFERENT TYPES
                 move = self.pokemon.getChargingMove()
-                print(self.pokemon.getName() + " used " + move.getName() + "!")
+                self.events.emit(Events.MoveUsed, self.pokemon, move)
                 damage = self.damageCalc(move, other_pkmn)
                 other_pkmn.setCurrentHP(damage)
                 self.pokemon.resetChargingMove()
@@ -460,40 +474,39 @@ class HumanPlayer(Player):
             elif self.pokemon.getThrashTurns() > 0:
                 move = self.pokemon.getThrashMove()
                 name = move.getName()
-                print(self.pokemon.getName() + " used " + name + "!")
+                self.events.emit(Events.MoveUsed, self.pokemon, move)
                 damage = self.damageCalc(move, other_pkmn) # thrash turns incremented here
-                thrash_roll = random.randint(2,3)
+                thrash_roll = self.rng.randint(2,3)
                 if self.pokemon.getThrashTurns() > 3 or (self.pokemon.getThrashTurns() == 2
                 and thrash_roll == 2):
                     self.pokemon.resetThrashMove()
                     self.pokemon.resetThrashTurns()
                     self.pokemon.set_confusion(True)
-                    print(self.pokemon.getName() + " is confused due to fatigue!")
+                    self.events.emit(Events.ThrashFatigue, self.pokemon)
             else:
-                select = input("Select a move by typing the corresponding number: ")
+                select = self.read_input("Select a move by typing the corresponding number: ")
                 try:
                     index = int(select)
                 except ValueError:
-                    print("Please enter a number")
+                    self.events.emit(Events.InputRejected, "Please enter a number")
                     continue
                 if index >= 1 and index <= 4:
                     move = self.pokemon.getMoves(index - 1)
                     name = move.getName()
-                    print(self.pokemon.getName() + " used " + name + "!")
-                    if name in SecondaryEffects.TWO_TURN:
-                        print(self.pokemon.getName() + " is charging") # generic message, replace soon
+                    self.events.emit(Events.MoveUsed, self.pokemon, move)
+                    if move.descriptor.code == Effect.TWO_TURN:
+                        self.events.emit(Events.Charging, self.pokemon, move) # generic message, replace soon
                         self.pokemon.set_charging(True)
                         self.pokemon.setChargingMove(move)
-                        print(move)
                         return
                     if move.getAccuracy() != "None":
-                        if not move.accuracyRoll(random.randint(0,99)):
-                            if name in SecondaryEffects.CRASH:
-                                print(self.pokemon.getName() + " kept going and crashed!")
+                        if not move.accuracyRoll(self.rng.randint(0,99)):
+                            if move.descriptor.code == Effect.CRASH:
+                                self.events.emit(Events.Crashed, self.pokemon, move)
                                 crash_damage = math.floor(self.pokemon.getMaxHP / 2)
                                 self.pokemon.setCurrentHP(crash_damage)
                             else: # move does not inflict crash damage
-                                print("The attack missed!")
+                                self.events.emit(Events.MoveMissed, self.pokemon, move)
                             return
                     if (move.getCategory() == "Physical" 
                     or move.getCategory() == "Special"):
@@ -505,7 +518,8 @@ class HumanPlayer(Player):
                         self.executeStatus(move, other_pkmn)
                         return
                 else:
-                    print("Please enter a number between 1 and 4")
+                    self.events.emit(Events.InputRejected,
+                    "Please enter a number between 1 and 4")
     
     def __str__(self):
         pkmn_string = self.pokemon.getName() + """ {}/{}
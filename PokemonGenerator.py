@@ -1,6 +1,92 @@
-import pandas as pd, random, math
+import random, math
 from Moves import Move
-from Constants import Stats, Natures, Statuses, Data
+from Constants import Stats, Natures, Statuses, StatStages, Data, Type
+import Events
+
+BRN_ID = Statuses.ids[Statuses.BRN]
+PRZ_ID = Statuses.ids[Statuses.PRZ]
+STAGE_MIN = StatStages.MIN
+STAGE_MAX = StatStages.MAX
+STAGE_MULTIPLIERS = StatStages.multipliers
+NATURE_MULTIPLIERS = Natures.multipliers
+
+def calc_stats(base_stats, EVs, IVs, nature_id):
+    """ Calculates all six level 100 stats at once, with the same steps as
+    Pokemon.setStats.
+
+    Parameters:
+        base_stats, EVs, IVs (int tuple): in Stats.stat_list order
+        nature_id (int): the nature's index in Natures.nature_list
+
+    Returns:
+        The six stats, as a tuple
+    """
+    multipliers = NATURE_MULTIPLIERS[nature_id]
+    hp = 2 * base_stats[0] + IVs[0] + EVs[0] // 4 + 115
+    return (hp,) + tuple(math.floor((2 * base + iv + ev // 4 + 5) * multiplier)
+    for base, iv, ev, multiplier in zip(base_stats[1:], IVs[1:], EVs[1:],
+    multipliers))
+
+class Species:
+    """ One row of the pokedex compiled for building Pokemon: everything a
+    Pokemon gets from its species, parsed once instead of on every
+    construction.
+
+    Attributes:
+        dexno (int) = the row's dexno (its index in the pokedex minus one)
+        name (str) = the species' name
+        types (str tuple) = its two types; the second may be "None"
+        type_ids (int tuple) = the ids of its types in the type chart
+        base_stats (int tuple) = its base stats, in Stats.stat_list order
+        move_names (str tuple) = its four moves as written in the pokedex
+        moves (Move tuple) = its four moves; None if one of them isn't in
+        the movelist, in which case building it raises KeyError
+        move_ids (int tuple) = the ids of its moves; None like moves
+    """
+    __slots__ = ("dexno", "name", "types", "type_ids", "base_stats",
+    "move_names", "moves", "move_ids")
+
+    def __init__(self, dexno, row):
+        self.dexno = dexno
+        self.name = row[1]
+        self.types = (row[2], row[3])
+        self.type_ids = (Type.get_id(row[2]), Type.get_id(row[3]))
+        self.base_stats = tuple(int(value) for value in row[4:10])
+        self.move_names = tuple(row[10:14])
+        try:
+            self.moves = tuple(Move(name) for name in self.move_names)
+            self.move_ids = tuple(move.id for move in self.moves)
+        except KeyError:
+            self.moves = self.move_ids = None
+
+    def __repr__(self):
+        return "Species({}, {!r})".format(self.dexno, self.name)
+
+class SpeciesTable:
+    """ Every row of the pokedex compiled into a Species, in pokedex order.
+    Built once when this module is imported; call load again after
+    switching data sets.
+    """
+    by_row = []
+
+    @classmethod
+    def load(cls, data):
+        """ Compiles every row of the pokedex.
+
+        Parameters:
+            data (DataSet): the data set holding the pokedex
+        """
+        cls.by_row = [Species(row_index - 1, row)
+        for row_index, row in enumerate(data.pokedex_rows)]
+
+    @classmethod
+    def get(cls, dexno):
+        """ Returns the Species of a dexno.
+
+        Raises:
+            IndexError like pokeInfo if there is no such row
+        """
+        return cls.by_row[dexno + 1]
 
 class Pokemon:
     """ Generates a random Pokemon out of 100 possible choices,
@@ -8,10 +94,13 @@ class Pokemon:
         
     Attributes:
         name (str) = this Pokemon's name
-        types (str List) = this Pokemon's types. If it only has one type,
+        dexno (int) = the row of the csv file this Pokemon was generated from
+        types (str tuple) = this Pokemon's types. If it only has one type,
         the second type will be "None"
+        type_ids (int tuple) = the ids of this Pokemon's types in the type chart
         status (str): String representing this Pokemon's status condition; will
-        be "Healthy" by default.
+        be "Healthy" by default. Stored as status_id, its index in
+        Statuses.status_list.
         inflicted_turns (int): The # of turns this Pokemon has been inflicted
         with a status condition for. Relevant for TOX and SLP
         confused (boolean): Whether or not this Pokemon is confused
@@ -19,9 +108,10 @@ class Pokemon:
         Ranges from 0-5.
         recharging (boolean): whether or not this Pokemon has to recharge this
         turn. Hyper beam is the only move that currently does this.
-        EVs (int List): this Pokemon's Effort Values
-        IVs (int List): this Pokemon's Individual Values
-        nature (str List): string list representing this Pokemon's nature
+        EVs (int tuple): this Pokemon's Effort Values
+        IVs (int tuple): this Pokemon's Individual Values
+        nature (str List): string list representing this Pokemon's nature.
+        Stored as nature_id, its index in Natures.nature_list.
         maxHP (int) = the starting # of hit points
         attack (int) = this Pokemon's attack stat
         defense (int) = this Pokemon's defense stat
@@ -38,25 +128,154 @@ class Pokemon:
         has been boosted
         flinchedThisTurn (boolean) = whether or not this Pokemon has flinched on
         this particular turn
-        moves (list of moves) = the moves this Pokemon has; usually contains
+        moves (tuple of moves) = the moves this Pokemon has; usually contains
         four entries
+        events (sink) = where this Pokemon reports what happens to it
+        rng (random number stream) = where this Pokemon's random numbers
+        come from
+
+    Pokemon are simulated in very large numbers, so their state is kept in
+    __slots__ rather than a __dict__; copy() clones a Pokemon mid-battle for
+    searches and rollouts. Everything that comes from the species is read
+    from its precompiled Species, and reset() turns an existing Pokemon into
+    a new one so batches can reuse the object instead of allocating another.
     """
-
-    def __init__(self, dexno):
+    __slots__ = ("events", "rng", "dexno", "name", "types", "type_ids", "status_id",
+    "inflicted_turns", "confused", "confusedTurns", "recharging", "charging",
+    "chargingMove", "thrash_turns", "thrash_move", "EVs", "IVs", "nature_id",
+    "maxHP", "attack", "defense", "spatk", "spdef", "speed", "currentHP",
+    "currentAttack", "currentDefense", "currentSpAtk", "currentSpDef",
+    "currentSpeed", "accuracy", "critBoost", "flinchedThisTurn", "ATKstage",
+    "DEFstage", "SPATKstage", "SPDEFstage", "SPEEDstage", "ACCstage", "moves")
+
+    def __init__(self, dexno, events=None, rng=None):
         """ Establishes the Pokemon that will be used by the Player object.
         
         Parameters:
             dexno (int): integer between 0 and 98 which represents the
             column of info that this function will isolate and return.
+            events (sink): the event sink to report to; defaults to the
+            console
+            rng (random number stream): where to draw random numbers from;
+            defaults to the random module
         
         Side Effects:
             Creates a Pokemon object with all of the above attributes
         """
-        info = self.pokeInfo(dexno)
-        self.name = info.values[1]
-        print(self.name)
-        self.types = ([info.values[2],info.values[3]])
-        self.status = Statuses.HEALTHY
+        self.events = events if events is not None else Events.CONSOLE
+        self.rng = rng if rng is not None else random
+        self.reset(dexno)
+
+    def reset(self, dexno, events=None, rng=None):
+        """ Turns this Pokemon into a new random Pokemon, drawing exactly
+        the random numbers that constructing one would, so a batch can
+        recycle one object per seat instead of allocating a Pokemon per
+        battle.
+
+        Parameters:
+            dexno (int): the row of the new Pokemon, as for __init__
+            events (sink), rng (random number stream): replace this
+            Pokemon's sink and random number stream unless None
+
+        Raises:
+            IndexError for a row that doesn't exist, and KeyError for a
+            species with a move that isn't in the movelist, like __init__
+        """
+        if events is not None:
+            self.events = events
+        if rng is not None:
+            self.rng = rng
+        species = self.setSpecies(dexno)
+
+        # Stats are not subject to change; not gettable
+        self.EVs = tuple(self.setEVs())
+        self.IVs = tuple(self.setIVs())
+        self.nature_id = self.rng.randint(0,24)
+        (self.maxHP, self.attack, self.defense, self.spatk, self.spdef,
+        self.speed) = calc_stats(species.base_stats, self.EVs, self.IVs,
+        self.nature_id)
+        self.resetBattleState()
+        self.setSpeciesMoves(species)
+
+    @classmethod
+    def from_spread(cls, dexno, EVs, IVs, nature_id, stats=None, events=None,
+    rng=None):
+        """ Builds a Pokemon with a given spread instead of a random one.
+        Used to materialize Pokemon generated in bulk (see BulkPokemon).
+
+        Parameters:
+            dexno (int): the row of the Pokemon, as for __init__
+            EVs (int tuple): the six effort values, in Stats.stat_list order
+            IVs (int tuple): the six individual values
+            nature_id (int): the nature's index in Natures.nature_list
+            stats (int tuple): the six level 100 stats if they are already
+            known; calculated with calc_stats if None
+            events (sink), rng (random number stream): as for __init__
+
+        Returns:
+            A Pokemon
+        """
+        pokemon = object.__new__(cls)
+        pokemon.events = events if events is not None else Events.CONSOLE
+        pokemon.rng = rng if rng is not None else random
+        species = pokemon.setSpecies(dexno)
+        pokemon.EVs = tuple(EVs)
+        pokemon.IVs = tuple(IVs)
+        pokemon.nature_id = nature_id
+        if stats is None:
+            stats = calc_stats(species.base_stats, pokemon.EVs, pokemon.IVs,
+            nature_id)
+        (pokemon.maxHP, pokemon.attack, pokemon.defense, pokemon.spatk,
+        pokemon.spdef, pokemon.speed) = stats
+        pokemon.resetBattleState()
+        pokemon.setSpeciesMoves(species)
+        return pokemon
+
+    def setSpread(self, EVs, IVs, nature_id):
+        """ Replaces this Pokemon's spread and recalculates its stats, which
+        puts its battle state back to how it is at the start of a battle.
+
+        Parameters:
+            EVs, IVs (int tuple), nature_id (int): as for from_spread
+        """
+        self.EVs = tuple(EVs)
+        self.IVs = tuple(IVs)
+        self.nature_id = nature_id
+        (self.maxHP, self.attack, self.defense, self.spatk, self.spdef,
+        self.speed) = calc_stats(SpeciesTable.get(self.dexno).base_stats,
+        self.EVs, self.IVs, nature_id)
+        self.resetBattleState()
+
+    def setSpecies(self, dexno):
+        """ Sets this Pokemon's species attributes from its Species.
+
+        Returns:
+            The Species
+        """
+        species = SpeciesTable.get(dexno)
+        self.dexno = dexno
+        self.name = species.name
+        self.events.emit(Events.PokemonCreated, self)
+        self.types = species.types
+        self.type_ids = species.type_ids
+        return species
+
+    def setSpeciesMoves(self, species):
+        """ Gives this Pokemon its species' moves.
+
+        Raises:
+            KeyError, from setMoves, if one of them isn't in the movelist
+        """
+        if species.moves is not None:
+            self.moves = species.moves
+        else:
+            self.moves = tuple(self.setMoves(species.move_names))
+
+    def resetBattleState(self):
+        """ Puts everything that changes during a battle back to how it is
+        before the battle starts: full HP, no status or stat changes.
+        """
+        self.status_id = Statuses.ids[Statuses.HEALTHY]
         self.inflicted_turns = 0
         self.confused = False
         self.confusedTurns = 0
@@ -66,17 +285,6 @@ class Pokemon:
         self.thrash_turns = 0
         self.thrash_move = None
 
-        # Sets stats with the setStats; not subject to change; not gettable
-        self.EVs = self.setEVs()
-        self.IVs = self.setIVs()
-        self.nature = Natures.nature_list.copy()[random.randint(0,24)]
-        self.maxHP = self.setStats(int(info.values[4]), "HP")
-        self.attack = self.setStats(int(info.values[5]), "Attack")
-        self.defense = self.setStats(int(info.values[6]), "Defense")
-        self.spatk = self.setStats(int(info.values[7]), "SpAtk")
-        self.spdef = self.setStats(int(info.values[8]), "SpDef")
-        self.speed = self.setStats(int(info.values[9]), "Speed")
-
         # This Pokemon's CURRENT stats; subject to change during battle; gettable
         self.currentHP = self.maxHP * 1
         self.currentAttack = self.attack * 1
@@ -96,9 +304,66 @@ class Pokemon:
         self.SPEEDstage = 0
         self.ACCstage = 0
 
-        # A different function will construct each move
-        self.moves = self.setMoves((
-            info.values[10],info.values[11],info.values[12],info.values[13]))
+    def copy(self):
+        """ Returns an independent copy of this Pokemon in its current state.
+        Moves are immutable, so they are shared with the copy.
+        """
+        # assigning every slot explicitly is several times faster than a loop;
+        # keep this in step with __slots__
+        clone = object.__new__(Pokemon)
+        clone.events = self.events
+        clone.rng = self.rng
+        clone.dexno = self.dexno
+        clone.name = self.name
+        clone.types = self.types
+        clone.type_ids = self.type_ids
+        clone.status_id = self.status_id
+        clone.inflicted_turns = self.inflicted_turns
+        clone.confused = self.confused
+        clone.confusedTurns = self.confusedTurns
+        clone.recharging = self.recharging
+        clone.charging = self.charging
+        clone.chargingMove = self.chargingMove
+        clone.thrash_turns = self.thrash_turns
+        clone.thrash_move = self.thrash_move
+        clone.EVs = self.EVs
+        clone.IVs = self.IVs
+        clone.nature_id = self.nature_id
+        clone.maxHP = self.maxHP
+        clone.attack = self.attack
+        clone.defense = self.defense
+        clone.spatk = self.spatk
+        clone.spdef = self.spdef
+        clone.speed = self.speed
+        clone.currentHP = self.currentHP
+        clone.currentAttack = self.currentAttack
+        clone.currentDefense = self.currentDefense
+        clone.currentSpAtk = self.currentSpAtk
+        clone.currentSpDef = self.currentSpDef
+        clone.currentSpeed = self.currentSpeed
+        clone.accuracy = self.accuracy
+        clone.critBoost = self.critBoost
+        clone.flinchedThisTurn = self.flinchedThisTurn
+        clone.ATKstage = self.ATKstage
+        clone.DEFstage = self.DEFstage
+        clone.SPATKstage = self.SPATKstage
+        clone.SPDEFstage = self.SPDEFstage
+        clone.SPEEDstage = self.SPEEDstage
+        clone.ACCstage = self.ACCstage
+        clone.moves = self.moves
+        return clone
+
+    @property
+    def status(self):
+        return Statuses.status_list[self.status_id]
+
+    @status.setter
+    def status(self, newStatus):
+        self.status_id = Statuses.ids[newStatus]
+
+    @property
+    def nature(self):
+        return Natures.nature_list[self.nature_id]
 
     def pokeInfo(self, dexno):
         """ Retrieves all information about the Pokemon from the csv file.
@@ -108,10 +373,10 @@ class Pokemon:
             column of info that this function will isolate and return.
             
         Returns:
-            Dataframe representing a column from the Kanto_Pokemon_100 csv file
+            Tuple representing a row from the Kanto_Pokemon_100 csv file
         """
-        col = Data.pokedex.loc[dexno + 1]
-        return col
+        row = Data.pokedex_rows[dexno + 1]
+        return row
     
     def setEVs(self):
         """ Randomly generates a Pokemon's Effort Values (EVs) according to
@@ -131,7 +396,7 @@ class Pokemon:
             elif remaining == 0:
                 ev = 0
             else:
-                ev = random.randint(0,252)
+                ev = self.rng.randint(0,252)
             ev_list.append(ev)
             remaining -= ev
             count += 1
@@ -147,12 +412,12 @@ class Pokemon:
             iv_list (int List): List of six integers, each of which represent
             one IV and are between 0 and 31.
         """
-        hp = random.randint(0,31)
-        attack = random.randint(0,31)
-        defense = random.randint(0,31)
-        spatk = random.randint(0,31)
-        spdef = random.randint(0,31)
-        speed = random.randint(0,31)
+        hp = self.rng.randint(0,31)
+        attack = self.rng.randint(0,31)
+        defense = self.rng.randint(0,31)
+        spatk = self.rng.randint(0,31)
+        spdef = self.rng.randint(0,31)
+        speed = self.rng.randint(0,31)
         iv_list = [hp, attack, defense, spatk, spdef, speed]
         return iv_list
 
@@ -173,20 +438,14 @@ class Pokemon:
             The calculated stat (int).
         """
         stat_index = Stats.stat_list.index(name)
-        ev = self.EVs.copy()[stat_index]
-        iv = self.IVs.copy()[stat_index]
+        ev = self.EVs[stat_index]
+        iv = self.IVs[stat_index]
         if name == "HP":
             stat = 2 * base_stat + iv + math.floor(ev/4) + 115
         else:
             stat = 2 * base_stat + iv + math.floor(ev/4) + 5
-            if self.nature == [".", ".",".", ".", "."]:
-                pass
-            elif stat_index - 1 == self.nature.index("+"):
-                stat *= 1.1
-                stat = math.floor(stat)
-            elif stat_index - 1 == self.nature.index("-"):
-                stat *= .9
-                stat = math.floor(stat)
+            stat = math.floor(stat *
+            Natures.multipliers[self.nature_id][stat_index - 1])
         return stat
 
     def setMoves(self, moveset):
@@ -208,6 +467,12 @@ class Pokemon:
     def getName(self):
         return self.name
 
+    def setEvents(self, events):
+        self.events = events
+
+    def setRng(self, rng):
+        self.rng = rng
+
     def getTypes(self, index):
         """ Returns one of this Pokemon's two types.
         
@@ -215,10 +480,13 @@ class Pokemon:
             index (int): An integer (0 or 1) which represents which of
             this Pokemon's two types will be returned
         """
-        return self.types.copy()[index]
+        return self.types[index]
     
     def getBothTypes(self):
-        return self.types.copy()
+        return self.types
+
+    def getTypeIds(self):
+        return self.type_ids
 
     def getMaxHP(self):
         return self.maxHP
@@ -248,10 +516,10 @@ class Pokemon:
             index (int): An integer (0 thru 3) which represents which of
             this Pokemon's four moves will be returned
         """
-        return self.moves.copy()[index]
+        return self.moves[index]
 
     def getStatus(self):
-        return self.status
+        return Statuses.status_list[self.status_id]
 
     def setStatus(self, newStatus): 
         """ Sets this Pokemon's status to a different specified status.
@@ -263,30 +531,15 @@ class Pokemon:
         Side Effects:
             - Changes this Pokemon's status
         """
-        # stats can be slightly changed through multiple status changes; will fix later
-        if newStatus == Statuses.BRN:
-            atk_drop = self.currentAttack / 2
-            self.currentAttack = math.ceil(atk_drop) # conflicts with statboosts/drops
-            print(self.name + " was burned!")
-        elif newStatus == Statuses.PRZ:
-            speed_drop = math.ceil(self.currentSpeed / 4)
-            self.currentSpeed = speed_drop
-            print(self.name + " was paralyzed! It might not be able to move!")
-        elif newStatus == Statuses.PSN:
-            print(self.name + " was poisoned!")
-        elif newStatus == Statuses.TOX:
-            print(self.name + " was badly poisoned!")
-        elif newStatus == Statuses.FRZ:
-            print(self.name + " was frozen!")
-        elif newStatus == Statuses.HEALTHY:
-            # as it stands currently, this will never happen; no print statements
-            if self.status == Statuses.BRN:
-                atk_restored = math.floor(self.currentAttack * 2)
-                self.currentAttack = atk_restored
-            if self.status == Statuses.PRZ:
-                speed_restored = math.floor(self.currentSpeed * 4)
-                self.currentSpeed = speed_restored
-        self.status = newStatus 
+        if newStatus != Statuses.HEALTHY:
+            self.events.emit(Events.StatusInflicted, self, newStatus)
+        old_id = self.status_id
+        self.status = newStatus
+        # a burn lowers attack and paralysis lowers speed while they last
+        if BRN_ID in (old_id, self.status_id):
+            self.currentAttack = self.effectiveStat("Attack")
+        if PRZ_ID in (old_id, self.status_id):
+            self.currentSpeed = self.effectiveStat("Speed")
 
     def getInflictedTurns(self):
         return self.inflicted_turns
@@ -318,104 +571,88 @@ class Pokemon:
 
     def setCurrentStat(self, statname, stages):
         """ Boosts or drops a current stat based on the opponent's move. The
-        resulting current stat will be a whole number.
+        stat's stage is kept between -6 and +6 and the current stat is
+        looked up from it (see StatStages), so it only changes when the stage
+        does. The resulting current stat will be a whole number.
         
         Parameters:
             statname (str): the name of the stat being affected
-            stages (float): the # of stages that the specified stat will be
+            stages (int): the # of stages that the specified stat will be
             boosted or dropped by (usually 1 or 2)
 
         Side Effects:
             Alters a current stat accordingly
         """
+        # written out per stat rather than with getattr/setattr because stat
+        # changes are frequent; effectiveStat is the general version. Stats
+        # are positive, so int() floors them.
         if statname == "Attack":
-            new_stage = self.ATKstage + stages
-            if stages > 0:
-                shift = math.floor(self.attack * ((2 + new_stage)/2))
-            elif stages < 0:
-                shift = math.floor(self.attack * (2/(2-new_stage)))
-            self.currentAttack = shift
-            self.ATKstage = new_stage
-            if self.currentAttack > self.attack * 6:
-                self.currentAttack = self.attack * 6
-                self.ATKstage = 6
-            elif self.currentAttack < self.attack / 6:
-                self.currentAttack = self.attack / 6
-                self.ATKstage = -6
-            if self.status == Statuses.BRN:
-                self.currentAttack /= 2
+            stage = self.ATKstage + stages
+            if not STAGE_MIN <= stage <= STAGE_MAX:
+                stage = StatStages.clamp(stage)
+            self.ATKstage = stage
+            self.currentAttack = int(self.attack
+            * STAGE_MULTIPLIERS[stage - STAGE_MIN])
+            if self.status_id == BRN_ID:
+                self.currentAttack = math.ceil(self.currentAttack / 2)
         elif statname == "Defense":
-            new_stage = self.DEFstage + stages
-            if stages > 0:
-                shift = math.floor(self.defense * ((2 + new_stage)/2))
-            elif stages < 0:
-                shift = math.floor(self.defense * (2/(2-new_stage)))
-            self.currentDefense = shift
-            self.DEFstage = new_stage
-            if self.currentDefense > self.defense * 6:
-                self.currentDefense = self.defense * 6
-                self.DEFstage = 6
-            elif self.currentDefense < self.defense / 6:
-                self.currentDefense = self.defense / 6
-                self.DEFstage = -6
+            stage = self.DEFstage + stages
+            if not STAGE_MIN <= stage <= STAGE_MAX:
+                stage = StatStages.clamp(stage)
+            self.DEFstage = stage
+            self.currentDefense = int(self.defense
+            * STAGE_MULTIPLIERS[stage - STAGE_MIN])
         elif statname == "SpAtk":
-            new_stage = self.SPATKstage + stages
-            if stages > 0:
-                shift = math.floor(self.spatk * ((2 + new_stage)/2))
-            elif stages < 0:
-                shift = math.floor(self.spatk * (2/(2-new_stage)))
-            self.currentSpAtk = shift
-            self.SPATKstage = new_stage
-            if self.currentSpAtk > self.spatk * 6:
-                self.currentSpAtk = self.spatk * 6
-                self.SPATKstage = 6
-            elif self.currentSpAtk < self.spatk / 6:
-                self.currentSpAtk = self.spatk / 6
-                self.SPATKstage = -6
+            stage = self.SPATKstage + stages
+            if not STAGE_MIN <= stage <= STAGE_MAX:
+                stage = StatStages.clamp(stage)
+            self.SPATKstage = stage
+            self.currentSpAtk = int(self.spatk
+            * STAGE_MULTIPLIERS[stage - STAGE_MIN])
         elif statname == "SpDef":
-            new_stage = self.SPDEFstage + stages
-            if stages > 0:
-                shift = math.floor(self.spdef * ((2 + new_stage)/2))
-            elif stages < 0:
-                shift = math.floor(self.spdef * (2/(2-new_stage)))
-            self.currentSpDef = shift
-            self.SPDEFstage = new_stage
-            if self.currentSpDef > self.spdef * 6:
-                self.currentSpDef = self.spdef * 6
-                self.SPDEFstage = 6
-            elif self.currentSpDef < self.spdef / 6:
-                self.currentSpDef = self.spdef / 6
-                self.SPDEFstage = -6
+            stage = self.SPDEFstage + stages
+            if not STAGE_MIN <= stage <= STAGE_MAX:
+                stage = StatStages.clamp(stage)
+            self.SPDEFstage = stage
+            self.currentSpDef = int(self.spdef
+            * STAGE_MULTIPLIERS[stage - STAGE_MIN])
         elif statname == "Speed":
-            new_stage = self.SPEEDstage + stages
-            if stages > 0:
-                shift = math.floor(self.speed * ((2 + new_stage)/2))
-            elif stages < 0:
-                shift = math.floor(self.speed * (2/(2-new_stage)))
-            self.currentSpeed = shift
-            self.SPEEDstage = new_stage
-            if self.currentSpeed > self.speed * 6:
-                self.currentSpeed = self.speed * 6
-                self.SPEEDstage = 6
-            elif self.currentSpeed < self.speed / 6:
-                self.currentSpeed = self.speed / 6
-                self.SPEEDstage = -6
-            if self.status == Statuses.PRZ:
-                self.currentSpeed /= 2
+            stage = self.SPEEDstage + stages
+            if not STAGE_MIN <= stage <= STAGE_MAX:
+                stage = StatStages.clamp(stage)
+            self.SPEEDstage = stage
+            self.currentSpeed = int(self.speed
+            * STAGE_MULTIPLIERS[stage - STAGE_MIN])
+            if self.status_id == PRZ_ID:
+                self.currentSpeed = math.ceil(self.currentSpeed / 4)
         elif statname == "Accuracy":
-            new_stage = self.ACCstage + stages
-            if stages > 0:
-                shift = math.floor(100 * ((2 + new_stage)/2))
-            elif stages < 0:
-                shift = math.floor(100 * (2/(2-new_stage)))
-            self.accuracy = shift
-            self.ACCstage = new_stage
-            if self.currentSpeed > 600:
-                self.accuracy = 600
-                self.ACCstage = 6
-            elif self.accuracy < 16:
-                self.accuracy = 16
-                self.ACCstage = -6
+            stage = self.ACCstage + stages
+            if not STAGE_MIN <= stage <= STAGE_MAX:
+                stage = StatStages.clamp(stage)
+            self.ACCstage = stage
+            self.accuracy = int(100
+            * STAGE_MULTIPLIERS[stage - STAGE_MIN])
+
+    def effectiveStat(self, statname):
+        """ Works out a current stat from its stat, its stage and this
+        Pokemon's status: a burn halves attack and paralysis quarters speed,
+        rounding up.
+
+        Parameters:
+            statname (str): a stat with stages, as in StatStages.slots
+
+        Returns:
+            The current stat (int)
+        """
+        stage_slot, stat_slot, _ = StatStages.slots[statname]
+        stat = 100 if stat_slot is None else getattr(self, stat_slot)
+        value = math.floor(stat * StatStages.multiplier(getattr(self,
+        stage_slot)))
+        if statname == "Attack" and self.status_id == BRN_ID:
+            value = math.ceil(value / 2)
+        elif statname == "Speed" and self.status_id == PRZ_ID:
+            value = math.ceil(value / 4)
+        return value
 
     def hasCritBoost(self):
         if self.critBoost:
@@ -440,6 +677,7 @@ class Pokemon:
 
     def set_confusion(self, confusion):
         if confusion:
+            self.events.emit(Events.StatusInflicted, self, Statuses.CON)
             self.confused = True
         else:
             self.confused = False
@@ -496,4 +734,6 @@ class Pokemon:
         self.thrash_move = move
 
     def resetThrashMove(self):
-        self.thrash_move = None
\ No newline at end of file
+        self.thrash_move = None
+
+SpeciesTable.load(Data)
\ No newline at end of file
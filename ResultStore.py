@@ -0,0 +1,275 @@
+""" Columnar files of battle results
+
+    A result file holds one row per battle in fixed columns (see COLUMNS),
+    stored column by column in row groups. The writer buffers one row group
+    in preallocated NumPy arrays and writes it out when it is full, so its
+    memory use depends on the row group size and not on the number of
+    battles. Each row group is a little-endian 4 byte header length, a JSON
+    header (the number of rows, and the dtype, shape, offset and size of
+    every column) and then the raw column data, one column after another.
+
+    There is no footer, so a later run can append row groups to an existing
+    file. A reader finds the row groups by reading only their headers and
+    seeking past their data, and reads just the columns it is asked for. A
+    row group cut short by a crash is ignored by readers and cut off before
+    anything is appended after it.
+"""
+
+import os, json, struct
+import numpy as np
+from VectorBattle import DRAW, ERROR
+
+MAGIC = b"PKMNRES1"
+HEADER_LENGTH = struct.Struct("<I")
+
+ROW_GROUP_SIZE = 65536
+
+# name, dtype and per-row shape of every column. Pairs are (player 1,
+# player 2); stats are in Stats.stat_list order and moves in move slot order.
+# A Pokemon that wasn't built because the battle raised an error first has
+# -1 in its columns.
+COLUMNS = (
+    ("seed", "<u8", ()),
+    ("dexnos", "<i2", (2,)),
+    ("natures", "<i1", (2,)),
+    ("stats", "<i2", (2, 6)),
+    ("moves", "<i2", (2, 4)),
+    ("winner", "<i1", ()), # 1 or 2, DRAW or ERROR
+    ("turns", "<i4", ()),
+    ("remaining_hp", "<f8", (2,)), # confusion damage isn't rounded
+    ("max_hp", "<i2", (2,)),
+    ("move_uses", "<i4", (2, 4))
+)
+COLUMN_NAMES = tuple(name for name, _, _ in COLUMNS)
+
+def result_row(result):
+    """ The column values of a BattleResult.
+
+    Returns:
+        A dict of values by column name
+    """
+    def pair(values, width=None):
+        values = list(values)
+        missing = -1 if width is None else [-1] * width
+        return values + [missing] * (2 - len(values))
+    if result.error is not None:
+        winner = ERROR
+    else:
+        winner = DRAW if result.winner is None else result.winner
+    return {
+        "seed": result.seed,
+        "dexnos": pair(result.dexnos),
+        "natures": pair(result.natures),
+        "stats": pair(result.stats, 6),
+        "moves": pair(result.moves, 4),
+        "winner": winner,
+        "turns": result.turns,
+        "remaining_hp": pair(result.remaining_hp),
+        "max_hp": pair(result.max_hp),
+        "move_uses": pair(result.move_uses, 4)
+    }
+
+def read_header(f):
+    """ Reads the header of the row group starting at the current position.
+
+    Returns:
+        The header dict with the position of its data added as "start", or
+        None at the end of the file or if the row group is incomplete
+    """
+    prefix = f.read(HEADER_LENGTH.size)
+    if len(prefix) < HEADER_LENGTH.size:
+        return None
+    length, = HEADER_LENGTH.unpack(prefix)
+    text = f.read(length)
+    if len(text) < length:
+        return None
+    try:
+        header = json.loads(text.decode())
+    except ValueError:
+        return None
+    header["start"] = f.tell()
+    size = sum(column[3] for column in header["columns"].values())
+    f.seek(0, os.SEEK_END)
+    if f.tell() < header["start"] + size:
+        return None
+    f.seek(header["start"] + size)
+    return header
+
+def scan(f):
+    """ Reads every complete row group header of an open result file.
+
+    Returns:
+        (headers, end): the headers, and the position just after the last
+        complete row group
+
+    Raises:
+        ValueError if the file isn't a result file
+    """
+    f.seek(0)
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError("{} is not a battle result file".format(f.name))
+    headers = []
+    end = f.tell()
+    while True:
+        header = read_header(f)
+        if header is None:
+            return headers, end
+        headers.append(header)
+        end = f.tell()
+
+class ResultWriter:
+    """ Writes battle results to a result file in row groups.
+
+    Attributes:
+        path (str) = the file's path
+        row_group_size (int) = the number of rows in each full row group
+        buffers (dict) = the row group being filled, one array per column
+        rows (int) = the number of rows in the buffers
+        written (int) = the rows written to the file by this writer
+    """
+    def __init__(self, path, row_group_size=ROW_GROUP_SIZE, append=False):
+        """ Parameters:
+            path (str): the file to write
+            row_group_size (int): as above
+            append (bool): whether to add to the file if it already exists
+            instead of replacing it
+        """
+        self.path = path
+        self.row_group_size = row_group_size
+        self.buffers = {name: np.empty((row_group_size,) + shape, dtype=dtype)
+        for name, dtype, shape in COLUMNS}
+        self.rows = 0
+        self.written = 0
+        if append and os.path.exists(path) and os.path.getsize(path) > 0:
+            self.file = open(path, "r+b")
+            headers, end = scan(self.file)
+            if headers and tuple(headers[0]["columns"]) != COLUMN_NAMES:
+                self.file.close()
+                raise ValueError("{} has different columns".format(path))
+            self.file.truncate(end)
+            self.file.seek(end)
+        else:
+            self.file = open(path, "wb")
+            self.file.write(MAGIC)
+
+    def write(self, result):
+        "Adds one BattleResult"
+        row = result_row(result)
+        for name in COLUMN_NAMES:
+            self.buffers[name][self.rows] = row[name]
+        self.rows += 1
+        if self.rows == self.row_group_size:
+            self.flush()
+
+    def write_columns(self, columns):
+        """ Adds many rows at once.
+
+        Parameters:
+            columns (dict): an array for every column, all the same length
+        """
+        n = len(columns[COLUMN_NAMES[0]])
+        done = 0
+        while done < n:
+            take = min(n - done, self.row_group_size - self.rows)
+            for name in COLUMN_NAMES:
+                self.buffers[name][self.rows:self.rows + take] = (
+                    columns[name][done:done + take])
+            self.rows += take
+            done += take
+            if self.rows == self.row_group_size:
+                self.flush()
+
+    def flush(self):
+        "Writes the buffered rows as a row group"
+        if self.rows == 0:
+            return
+        data = [np.ascontiguousarray(self.buffers[name][:self.rows])
+        for name in COLUMN_NAMES]
+        columns = {}
+        offset = 0
+        for (name, dtype, shape), array in zip(COLUMNS, data):
+            columns[name] = [dtype, list(shape), offset, array.nbytes]
+            offset += array.nbytes
+        header = json.dumps({"rows": self.rows, "columns": columns}).encode()
+        self.file.write(HEADER_LENGTH.pack(len(header)))
+        self.file.write(header)
+        for array in data:
+            self.file.write(array.tobytes())
+        self.file.flush()
+        self.written += self.rows
+        self.rows = 0
+
+    def close(self):
+        "Writes any buffered rows and closes the file"
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class ResultReader:
+    """ Reads columns of a result file.
+
+    Attributes:
+        path (str) = the file's path
+        headers (list of dict) = the header of every complete row group
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.headers, _ = scan(f)
+
+    def __len__(self):
+        return sum(header["rows"] for header in self.headers)
+
+    @property
+    def columns(self):
+        if not self.headers:
+            return COLUMN_NAMES
+        return tuple(self.headers[0]["columns"])
+
+    def row_groups(self, columns=None):
+        """ Reads the file one row group at a time.
+
+        Parameters:
+            columns (list of str): the columns to read; every column if None
+
+        Returns:
+            An iterator of dicts of arrays by column name
+        """
+        if columns is None:
+            columns = self.columns
+        with open(self.path, "rb") as f:
+            for header in self.headers:
+                group = {}
+                for name in columns:
+                    if name not in header["columns"]:
+                        raise KeyError("No column named {}".format(name))
+                    dtype, shape, offset, size = header["columns"][name]
+                    f.seek(header["start"] + offset)
+                    group[name] = np.frombuffer(f.read(size),
+                    dtype=dtype).reshape([header["rows"]] + shape)
+                yield group
+
+    def read(self, columns=None):
+        """ Reads whole columns.
+
+        Parameters:
+            columns (list of str): the columns to read; every column if None
+
+        Returns:
+            A dict of arrays by column name, with a row for every battle
+        """
+        if columns is None:
+            columns = self.columns
+        groups = list(self.row_groups(columns))
+        if not groups:
+            return {name: np.empty((0,) + shape, dtype=dtype)
+            for name, dtype, shape in COLUMNS if name in columns}
+        return {name: np.concatenate([group[name] for group in groups])
+        for name in columns}
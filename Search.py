@@ -0,0 +1,641 @@
+""" Expectiminimax search for choosing moves
+
+    SearchPlayer looks a few turns ahead before picking a move. Each turn of
+    the search tree is a max node (this player's move), a min node (the
+    opponent's reply) and a chance node over every way the turn can play
+    out: whether each Pokemon can act (paralysis, sleep, freeze, confusion,
+    recharging), accuracy, critical hits and damage rolls, flinching and the
+    secondary effects' procs. Chance nodes are pruned with Ballard's Star1
+    bounds, and positions that were already searched are looked up in a
+    transposition table keyed on both Pokemon's battle state.
+
+    The model of a turn follows Battle.start, Battle.is_mobile and
+    Player.damageCalc on copies of the real Pokemon, with these
+    simplifications:
+        - the 16 damage rolls (and critical hits) are grouped into a few
+        equally likely buckets, each represented by its mean damage
+        - on a speed tie the opponent is assumed to move first
+        - burn and poison damage is applied at the end of every turn
+    Each decision stops at a node budget and an optional time budget and
+    returns the best move of the deepest search that finished. With no time
+    budget the choice depends on the position alone, so seeded battles stay
+    reproducible.
+"""
+
+import time, math
+from Constants import Statuses, Type, DamageFormula
+from Moves import Effect
+from Players import ComputerPlayer, STATUS_IMMUNITIES
+import Events
+
+WIN = 1.0
+LOSS = -1.0
+
+HEALTHY_ID = Statuses.ids[Statuses.HEALTHY]
+
+# transposition table entry flags
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+class BudgetExceeded(Exception):
+    "Raised inside a search when it runs out of nodes or time"
+
+def state_key(pokemon):
+    "The parts of a Pokemon's state that can change during a battle"
+    return (pokemon.currentHP, pokemon.status_id, pokemon.inflicted_turns,
+    pokemon.confused, pokemon.confusedTurns, pokemon.currentAttack,
+    pokemon.currentDefense, pokemon.currentSpAtk, pokemon.currentSpDef,
+    pokemon.currentSpeed, pokemon.ATKstage, pokemon.DEFstage,
+    pokemon.SPATKstage, pokemon.SPDEFstage, pokemon.SPEEDstage,
+    pokemon.critBoost, pokemon.recharging, pokemon.charging,
+    pokemon.chargingMove, pokemon.thrash_turns)
+
+def evaluate(me, opp):
+    """ Scores a position that isn't over from me's point of view. Scores
+    are strictly between LOSS and WIN.
+    """
+    score = 0.6 * (me.currentHP / me.maxHP - opp.currentHP / opp.maxHP)
+    if opp.status_id != HEALTHY_ID:
+        score += 0.1
+    if me.status_id != HEALTHY_ID:
+        score -= 0.1
+    if opp.confused:
+        score += 0.05
+    if me.confused:
+        score -= 0.05
+    return score
+
+class Expectiminimax:
+    """ A depth-limited expectiminimax search over one-on-one battles.
+
+    Attributes:
+        max_depth (int) = the most turns to look ahead
+        max_nodes (int) = the most positions to visit per decision
+        max_time (float) = the most seconds to spend per decision; None for
+        no time limit
+        buckets (int) = the number of groups damage rolls are merged into
+        table_size (int) = the most transposition table entries to keep
+        table (dict) = the transposition table; kept across decisions
+        turn_cache (dict) = the outcomes of a turn by both Pokemon's states
+        and moves; kept across decisions
+        damage_cache (dict) = damage outcomes by attacker, move and defender
+        nodes (int) = the positions and turns searched by the last decision
+        depth (int) = the depth of the deepest finished search of the last
+        decision
+        table_hits (int) = transposition table cutoffs in the last decision
+        elapsed (float) = seconds spent on the last decision
+    """
+    def __init__(self, max_depth=3, max_nodes=2000, max_time=None,
+    buckets=3, table_size=200000):
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.max_time = max_time
+        self.buckets = buckets
+        self.table_size = table_size
+        self.table = {}
+        self.turn_cache = {}
+        self.damage_cache = {}
+        self.nodes = 0
+        self.depth = 0
+        self.table_hits = 0
+        self.elapsed = 0.0
+        self.deadline = None
+        self.root_best = None
+
+    def best_move(self, me, opp):
+        """ Searches for the best move for me against opp.
+
+        Parameters:
+            me (Pokemon): the searching player's Pokemon
+            opp (Pokemon): the opposing Pokemon
+
+        Returns:
+            The index of the chosen move in me's moves
+        """
+        start = time.perf_counter()
+        self.nodes = 0
+        self.table_hits = 0
+        self.depth = 0
+        self.deadline = (start + self.max_time if self.max_time is not None
+        else None)
+        if len(self.table) > self.table_size:
+            self.table.clear()
+        if len(self.turn_cache) > self.table_size // 4:
+            self.turn_cache.clear()
+        me = me.copy()
+        me.setEvents(Events.NULL)
+        opp = opp.copy()
+        opp.setEvents(Events.NULL)
+        moves = self.ordered(me, self.actions(me), opp)
+        best = moves[0]
+        for depth in range(1, self.max_depth + 1):
+            self.root_best = None
+            try:
+                best = self.root(me, opp, depth, moves)
+                self.depth = depth
+            except BudgetExceeded:
+                # a move that finished searching at this depth beat every
+                # move searched before it, the previous best included
+                if self.root_best is not None:
+                    best = self.root_best
+                break
+            moves = [best] + [move for move in moves if move is not best]
+        self.elapsed = time.perf_counter() - start
+        return me.moves.index(best)
+
+    def root(self, me, opp, depth, moves):
+        "The best of moves, searched depth turns deep"
+        alpha = LOSS
+        best = moves[0]
+        for move in moves:
+            value = self.min_node(me, opp, move, depth, alpha, WIN)
+            if value > alpha or move is moves[0]:
+                alpha = value
+                best = move
+                self.root_best = best
+        return best
+
+    def count(self):
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            raise BudgetExceeded()
+        if (self.deadline is not None and self.nodes % 64 == 0 and
+        time.perf_counter() > self.deadline):
+            raise BudgetExceeded()
+
+    def max_node(self, me, opp, depth, alpha, beta):
+        "The value of a position where me picks a move"
+        if opp.currentHP <= 0:
+            return WIN
+        if me.currentHP <= 0:
+            return LOSS
+        if depth == 0:
+            return evaluate(me, opp)
+        self.count()
+        key = (state_key(me), state_key(opp), depth)
+        entry = self.table.get(key)
+        moves = self.actions(me)
+        if entry is not None:
+            value, flag, best = entry
+            if (flag == EXACT or (flag == LOWER and value >= beta) or
+            (flag == UPPER and value <= alpha)):
+                self.table_hits += 1
+                return value
+            moves = [best] + [move for move in moves if move is not best]
+        original_alpha = alpha
+        value = LOSS
+        best = moves[0]
+        for move in moves:
+            child = self.min_node(me, opp, move, depth, alpha, beta)
+            if child > value:
+                value = child
+                best = move
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                break
+        if value <= original_alpha:
+            flag = UPPER
+        elif value >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table[key] = (value, flag, best)
+        return value
+
+    def min_node(self, me, opp, my_move, depth, alpha, beta):
+        "The value of me using my_move when opp picks the worst reply for me"
+        value = WIN
+        for opp_move in self.ordered(opp, self.actions(opp), me):
+            child = self.chance_node(me, opp, my_move, opp_move, depth, alpha,
+            beta)
+            if child < value:
+                value = child
+            if value < beta:
+                beta = value
+            if alpha >= beta:
+                break
+        return value
+
+    def chance_node(self, me, opp, my_move, opp_move, depth, alpha, beta):
+        """ The expected value of a turn, pruned with Star1: stops as soon as
+        the outcomes searched so far prove the value is outside (alpha, beta)
+        """
+        self.count()
+        key = (state_key(me), state_key(opp), my_move, opp_move)
+        outcomes = self.turn_cache.get(key)
+        if outcomes is None:
+            outcomes = self.resolve(me, opp, my_move, opp_move)
+            self.turn_cache[key] = outcomes
+        explored = 0.0
+        remaining = 1.0
+        for p, next_me, next_opp in outcomes:
+            remaining -= p
+            child_alpha = (alpha - explored - remaining * WIN) / p
+            child_beta = (beta - explored - remaining * LOSS) / p
+            value = self.max_node(next_me, next_opp, depth - 1,
+            max(child_alpha, LOSS), min(child_beta, WIN))
+            if value <= child_alpha:
+                return explored + p * value + remaining * WIN
+            if value >= child_beta:
+                return explored + p * value + remaining * LOSS
+            explored += p * value
+        return explored
+
+    def actions(self, pokemon):
+        """ The distinct moves a Pokemon can pick; a charging or thrashing
+        Pokemon has to use the move it started.
+        """
+        if pokemon.charging:
+            return [pokemon.chargingMove]
+        if pokemon.thrash_turns > 0:
+            return [pokemon.thrash_move]
+        moves = []
+        for move in pokemon.moves:
+            if move not in moves:
+                moves.append(move)
+        return moves
+
+    def ordered(self, user, moves, target):
+        "moves sorted by their expected damage, most damaging first"
+        if len(moves) == 1:
+            return moves
+        def expected(move):
+            if move.category == "Status":
+                return 0.0
+            return sum(p * damage for p, damage in
+            self.damage_outcomes(user, move, target))
+        return sorted(moves, key=expected, reverse=True)
+
+    def damage_outcomes(self, attacker, move, defender):
+        """ The damage one hit of a move can do, as in Player.damageCalc,
+        grouped into equally likely buckets.
+
+        Returns:
+            A tuple of (probability, damage) pairs
+        """
+        if move.category == "Physical":
+            attack, defense = attacker.getAttack(), defender.getDefense()
+        else:
+            attack, defense = attacker.getSpAtk(), defender.getSpdef()
+        key = (move, attack, defense, attacker.critBoost, attacker.types,
+        defender.type_ids)
+        outcomes = self.damage_cache.get(key)
+        if outcomes is not None:
+            return outcomes
+        if move.power == "None":
+            # Player.damageCalc can't handle these yet
+            outcomes = ((1.0, 0),)
+        else:
+            base = ((DamageFormula.LEVEL_FACTOR * move.power * (attack
+            / defense)) / DamageFormula.DIVISOR) + DamageFormula.BASE
+            base = base * move.effectiveness(defender.type_ids)
+            high_crit = move.descriptor.code == Effect.HIGH_CRIT
+            if attacker.critBoost:
+                p_crit = 1.0 if high_crit else 1 / DamageFormula.BOOSTED_CRIT_ROLL
+            else:
+                p_crit = 1 / (DamageFormula.HIGH_CRIT_ROLL if high_crit
+                else DamageFormula.CRIT_ROLL)
+            stab = move.type in attacker.types
+            rolls = range(DamageFormula.RANDOM_MIN, DamageFormula.RANDOM_MAX + 1)
+            hits = []
+            for crit, p in ((False, 1 - p_crit), (True, p_crit)):
+                if p == 0:
+                    continue
+                for roll in rolls:
+                    damage = base
+                    if crit:
+                        damage *= DamageFormula.CRIT_MULTIPLIER
+                    if stab:
+                        damage *= DamageFormula.STAB
+                    damage *= roll / 100
+                    hits.append((math.floor(damage), p / len(rolls)))
+            outcomes = self.bucket(hits)
+        if len(self.damage_cache) > self.table_size:
+            self.damage_cache.clear()
+        self.damage_cache[key] = outcomes
+        return outcomes
+
+    def bucket(self, hits):
+        "Merges (damage, probability) pairs into about self.buckets groups"
+        hits.sort()
+        outcomes = {}
+        size = 1 / self.buckets
+        mass = total = 0.0
+        filled = 0
+        for damage, p in hits:
+            mass += p
+            total += p * damage
+            if mass >= size * (filled + 1) - 1e-9 or damage == hits[-1][0]:
+                filled += 1
+                if mass > 0:
+                    value = round(total / mass)
+                    outcomes[value] = outcomes.get(value, 0) + mass
+                mass = total = 0.0
+        if mass > 0:
+            value = round(total / mass)
+            outcomes[value] = outcomes.get(value, 0) + mass
+        return tuple((p, damage) for damage, p in outcomes.items())
+
+    def resolve(self, me, opp, my_move, opp_move):
+        """ Every way one turn can play out.
+
+        Returns:
+            A list of (probability, me, opp) outcomes, most likely first
+        """
+        me_first = me.currentSpeed > opp.currentSpeed
+        if me_first:
+            order = ((True, my_move), (False, opp_move))
+        else:
+            order = ((False, opp_move), (True, my_move))
+        branches = [(1.0, me, opp, False)]
+        for mine, move in order:
+            next_branches = []
+            for p, m, o, flinched in branches:
+                if m.currentHP <= 0 or o.currentHP <= 0:
+                    next_branches.append((p, m, o, False))
+                    continue
+                user, target = (m, o) if mine else (o, m)
+                for q, u, t, flinch in self.act(user, target, move, flinched):
+                    if mine:
+                        next_branches.append((p * q, u, t, flinch))
+                    else:
+                        next_branches.append((p * q, t, u, flinch))
+            branches = next_branches
+        merged = {}
+        for p, m, o, _ in branches:
+            if m.currentHP > 0 and o.currentHP > 0:
+                m = self.chip_damage(m)
+                o = self.chip_damage(o)
+            key = (state_key(m), state_key(o))
+            if key in merged:
+                merged[key][0] += p
+            else:
+                merged[key] = [p, m, o]
+        outcomes = [tuple(outcome) for outcome in merged.values()]
+        outcomes.sort(key=lambda outcome: -outcome[0])
+        return outcomes
+
+    def act(self, user, target, move, flinched):
+        """ The outcomes of one Pokemon's action. Neither Pokemon is changed;
+        outcomes that change one hold a copy of it. A flinched Pokemon still
+        rolls for its status before it loses its turn.
+
+        Returns:
+            A list of (probability, user, target, whether target flinched)
+        """
+        outcomes = []
+        for p, u, mobile in self.mobility(user):
+            if not mobile or flinched:
+                outcomes.append((p, u, target, False))
+                continue
+            for q, u2, t, flinch in self.use(u, target, move):
+                outcomes.append((p * q, u2, t, flinch))
+        return outcomes
+
+    def mobility(self, pokemon):
+        """ Whether a Pokemon can move this turn, as in Battle.is_mobile.
+
+        Returns:
+            A list of (probability, pokemon, whether it can move)
+        """
+        if pokemon.recharging and pokemon.status_id != Statuses.ids[Statuses.SLP]:
+            rested = pokemon.copy()
+            rested.recharging = False
+            return [(1.0, rested, False)]
+        status = pokemon.getStatus()
+        checks = [(1.0, pokemon)]
+        stuck = []
+        if status == Statuses.PRZ:
+            stuck.append((0.25, pokemon))
+            checks = [(0.75, pokemon)]
+        elif status == Statuses.SLP:
+            turns = pokemon.inflicted_turns
+            asleep = pokemon.copy()
+            asleep.incrementInflictedTurns()
+            awake = pokemon.copy()
+            awake.setStatus(Statuses.HEALTHY)
+            awake.resetInflictedTurns()
+            if turns == 0:
+                return [(1.0, asleep, False)]
+            elif turns < 3:
+                stuck.append((2 / 3, asleep))
+                checks = [(1 / 3, awake)]
+            else:
+                checks = [(1.0, awake)]
+        elif status == Statuses.FRZ:
+            thawed = pokemon.copy()
+            thawed.setStatus(Statuses.HEALTHY)
+            stuck.append((0.8, pokemon))
+            checks = [(0.2, thawed)]
+        elif status in Statuses.CHIP_DAMAGE:
+            return [(1.0, pokemon, True)]
+        outcomes = [(p, stuck_pokemon, False) for p, stuck_pokemon in stuck]
+        for p, checked in checks:
+            if not checked.confused:
+                outcomes.append((p, checked, True))
+            elif checked.confusedTurns >= 2:
+                snap = 1 / (7 - checked.confusedTurns)
+                cured = checked.copy()
+                cured.setStatus(Statuses.HEALTHY)
+                cured.resetConfusedTurns()
+                outcomes.append((p * snap, cured, True))
+                outcomes.append((p * (1 - snap), checked, True))
+            else:
+                hurt = checked.copy()
+                damage = ((DamageFormula.LEVEL_FACTOR
+                * DamageFormula.CONFUSION_POWER * (hurt.getAttack()
+                / hurt.getDefense())) / DamageFormula.DIVISOR
+                ) + DamageFormula.BASE
+                hurt.setCurrentHP(damage)
+                hurt.incrementConfusedTurns()
+                steady = checked.copy()
+                steady.incrementConfusedTurns()
+                outcomes.append((p / 2, hurt, False))
+                outcomes.append((p / 2, steady, True))
+        return outcomes
+
+    def use(self, user, target, move):
+        """ The outcomes of a Pokemon that can move using a move, as in
+        ComputerPlayer.take_turn.
+
+        Returns:
+            A list of (probability, user, target, whether target flinched)
+        """
+        if user.charging:
+            # the charged move is released without an accuracy check or
+            # secondary effect
+            released = user.copy()
+            released.resetChargingMove()
+            released.set_charging(False)
+            return self.hit(released, target, move, False)
+        if user.thrash_turns > 0:
+            outcomes = []
+            for p, u, t, flinch in self.hit(user, target, move, False):
+                if u.thrash_turns > 3:
+                    outcomes.append((p, self.fatigue(u), t, flinch))
+                elif u.thrash_turns == 2:
+                    outcomes.append((p / 2, self.fatigue(u), t, flinch))
+                    outcomes.append((p / 2, u, t, flinch))
+                else:
+                    outcomes.append((p, u, t, flinch))
+            return outcomes
+        code = move.descriptor.code
+        if code == Effect.TWO_TURN:
+            charging = user.copy()
+            charging.set_charging(True)
+            charging.setChargingMove(move)
+            return [(1.0, charging, target, False)]
+        if move.accuracy == "None":
+            p_hit = 1.0
+        else:
+            p_hit = min(move.accuracy, 100) / 100
+        outcomes = []
+        if p_hit < 1:
+            outcomes.append((1 - p_hit, user, target, False))
+        if move.category == "Status":
+            u, t = self.status_move(user, target, move)
+            outcomes.append((p_hit, u, t, False))
+        else:
+            for p, u, t, flinch in self.hit(user, target, move, True):
+                outcomes.append((p * p_hit, u, t, flinch))
+        return outcomes
+
+    def fatigue(self, pokemon):
+        "A Pokemon that has stopped thrashing and become confused"
+        pokemon = pokemon.copy()
+        pokemon.resetThrashMove()
+        pokemon.resetThrashTurns()
+        pokemon.set_confusion(True)
+        return pokemon
+
+    def hit(self, user, target, move, secondary):
+        """ The outcomes of a damaging move that hits, and of its secondary
+        effect if secondary is True.
+
+        Returns:
+            A list of (probability, user, target, whether target flinched)
+        """
+        effect = move.descriptor
+        code = effect.code
+        if code == Effect.THRASH:
+            user = user.copy()
+            user.incrementThrashTurns()
+            user.setThrashMove(move)
+        outcomes = []
+        for p, damage in self.damage_outcomes(user, move, target):
+            hurt = target.copy()
+            hurt.setCurrentHP(damage)
+            if hurt.currentHP <= 0:
+                outcomes.append((p, user, hurt, False))
+                continue
+            branches = [(p, user, hurt, False)]
+            if (code == Effect.FLINCH and
+            user.currentSpeed >= target.currentSpeed):
+                chance = (effect.chance // 10) / 10
+                branches = [(p * chance, user, hurt, True),
+                (p * (1 - chance), user, hurt, False)]
+            if secondary:
+                branches = [outcome for branch in branches
+                for outcome in self.secondary(branch, move, damage)]
+            outcomes.extend(branches)
+        return outcomes
+
+    def secondary(self, branch, move, damage):
+        "Splits one hit's outcome by its move's secondary effect"
+        p, user, target, flinch = branch
+        effect = move.descriptor
+        code = effect.code
+        if code == Effect.RECOIL or code == Effect.ABSORB:
+            recoiled = user.copy()
+            recoiled.setCurrentHP(math.floor(damage / effect.divisor))
+            return [(p, recoiled, target, flinch)]
+        if code == Effect.RECHARGE:
+            tired = user.copy()
+            tired.setRecharging(True)
+            return [(p, tired, target, flinch)]
+        if code == Effect.STAT_DROP_CHANCE:
+            dropped = target.copy()
+            for stat, stages in effect.stats:
+                dropped.setCurrentStat(stat, stages)
+        elif code == Effect.STATUS_CHANCE:
+            dropped = None
+            for status in effect.statuses:
+                if status == Statuses.CON:
+                    dropped = target.copy()
+                    dropped.set_confusion(True)
+                    break
+                if (target.status_id == HEALTHY_ID and
+                STATUS_IMMUNITIES.get(status) not in target.types):
+                    dropped = target.copy()
+                    dropped.setStatus(status)
+                    break
+            if dropped is None:
+                return [branch]
+        else:
+            return [branch]
+        chance = (effect.chance // 10) / 10
+        return [(p * chance, user, dropped, flinch),
+        (p * (1 - chance), user, target, flinch)]
+
+    def status_move(self, user, target, move):
+        """ The result of a status move that hits, as in Player.executeStatus
+
+        Returns:
+            (user, target), copied if changed
+        """
+        effect = move.descriptor
+        if effect.code == Effect.INFLICT:
+            if target.status_id != HEALTHY_ID or (move.name == "Thunder Wave"
+            and Type.GROUND in target.types):
+                return user, target
+            target = target.copy()
+            target.setStatus(effect.statuses[0])
+        elif effect.code == Effect.STAT_CHANGE:
+            user = user.copy()
+            target = target.copy()
+            for stat, stages in effect.stats:
+                (user if stages > 0 else target).setCurrentStat(stat, stages)
+        elif not user.critBoost:
+            user = user.copy()
+            user.setCritBoost()
+        return user, target
+
+    def chip_damage(self, pokemon):
+        "A Pokemon after end of turn status damage, as in Battle.chip_damage"
+        status = pokemon.getStatus()
+        if status not in Statuses.CHIP_DAMAGE:
+            return pokemon
+        pokemon = pokemon.copy()
+        if status == Statuses.TOX:
+            damage = pokemon.maxHP * math.floor(0.0625 *
+            (pokemon.inflicted_turns + 1))
+        else:
+            damage = math.floor(pokemon.maxHP * 0.125)
+        pokemon.setCurrentHP(damage)
+        pokemon.incrementInflictedTurns()
+        return pokemon
+
+class SearchPlayer(ComputerPlayer):
+    """ A computer player that picks its moves with an expectiminimax search.
+    Charging and thrashing are handled by ComputerPlayer.take_turn as usual.
+
+    Attributes:
+        search (Expectiminimax) = the search; its transposition table is kept
+        from one decision to the next
+    """
+    def __init__(self, name, dexno=None, events=None, rng=None, max_depth=3,
+    max_nodes=2000, max_time=None):
+        """ Parameters:
+            name, dexno, events, rng: as for Player
+            max_depth (int): the most turns to look ahead
+            max_nodes (int): the most positions to visit per decision
+            max_time (float): the most seconds to spend per decision; None
+            for no limit, which keeps seeded battles reproducible
+        """
+        super().__init__(name, dexno, events, rng)
+        self.search = Expectiminimax(max_depth, max_nodes, max_time)
+
+    def chooseMove(self, other_pkmn):
+        return self.search.best_move(self.pokemon, other_pkmn)
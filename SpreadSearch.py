@@ -0,0 +1,366 @@
+""" EV, IV and nature spread search for one species by a genetic algorithm
+
+    Pokemon roll their spreads at random. A spread search evolves a
+    population of spreads for one species instead, keeping those that win
+    most often against a pool of opponents. An individual is a spread:
+    six EVs, six IVs and a nature. EVs are kept in steps of 4, since the
+    stat formula only counts EV // 4, and always add up to the full 508
+    with no stat above 252, as setEVs hands them out; spending fewer
+    never raises a stat.
+
+    Fitness is the win rate over a fixed set of battles: battle k has the
+    same opponent, seat and seed for every spread, so fitness depends on
+    the spread alone. That makes it safe to cache by spread, so elites and
+    repeated children are never simulated twice. Each generation's new
+    spreads are split into batches and evaluated on a process pool.
+
+    After every generation the search can write a JSON checkpoint with the
+    population, the fitness cache and the history. Every generation's
+    random numbers come from the master seed and its number, so a search
+    resumed from a checkpoint carries on exactly as if it hadn't stopped.
+"""
+
+import os, json, time, random
+from concurrent.futures import ProcessPoolExecutor
+from PokemonGenerator import SpeciesTable, calc_stats
+from batch import MAX_TURNS
+from tournament import ROSTER_SIZE
+from MovesetSearch import schedule, play_battles
+from Rng import make_rng
+
+# EVs are handed out in units of EV_STEP, up to these totals
+EV_STEP = 4
+EV_TOTAL = 508
+EV_MAX = 252
+IV_MAX = 31
+NATURES = 25
+
+# Natures.nature_list order
+NATURE_NAMES = ("Hardy", "Lonely", "Adamant", "Naughty", "Brave", "Bold",
+"Docile", "Impish", "Lax", "Relaxed", "Modest", "Mild", "Bashful", "Rash",
+"Quiet", "Calm", "Gentle", "Careful", "Quirky", "Sassy", "Timid", "Hasty",
+"Jolly", "Naive", "Serious")
+
+CHECKPOINT_VERSION = 1
+
+def repair(units, rng):
+    """ Makes EV units valid: each stat from 0 to EV_MAX // EV_STEP, adding
+    up to EV_TOTAL // EV_STEP, by moving single units between random stats.
+
+    Returns:
+        A list of six unit counts
+    """
+    cap, total = EV_MAX // EV_STEP, EV_TOTAL // EV_STEP
+    units = [min(max(unit, 0), cap) for unit in units]
+    excess = sum(units) - total
+    while excess > 0:
+        stat = rng.choice([i for i in range(6) if units[i] > 0])
+        units[stat] -= 1
+        excess -= 1
+    while excess < 0:
+        stat = rng.choice([i for i in range(6) if units[i] < cap])
+        units[stat] += 1
+        excess += 1
+    return units
+
+def make_spread(units, IVs, nature_id):
+    "A spread tuple from EV units, IVs and a nature"
+    return (tuple(unit * EV_STEP for unit in units), tuple(IVs), nature_id)
+
+def random_spread(rng):
+    "A valid spread with every part drawn at random"
+    units = repair([rng.randint(0, EV_MAX // EV_STEP) for _ in range(6)], rng)
+    return make_spread(units, [rng.randint(0, IV_MAX) for _ in range(6)],
+    rng.randrange(NATURES))
+
+def crossover(a, b, rng):
+    "A child that takes each EV, each IV and the nature from either parent"
+    units = repair([(a[0] if rng.random() < 0.5 else b[0])[i] // EV_STEP
+    for i in range(6)], rng)
+    IVs = [(a[1] if rng.random() < 0.5 else b[1])[i] for i in range(6)]
+    return make_spread(units, IVs, a[2] if rng.random() < 0.5 else b[2])
+
+def mutate(spread, rng, rate):
+    """ A copy of spread in which, each with chance rate, some EV units move
+    from one stat to another, one IV is redrawn and the nature is redrawn
+    """
+    units = [ev // EV_STEP for ev in spread[0]]
+    IVs = list(spread[1])
+    nature_id = spread[2]
+    if rng.random() < rate:
+        moved = rng.randint(1, 16)
+        source = rng.randrange(6)
+        units[source] -= moved
+        units[rng.randrange(6)] += moved
+        units = repair(units, rng)
+    if rng.random() < rate:
+        IVs[rng.randrange(6)] = rng.randint(0, IV_MAX)
+    if rng.random() < rate:
+        nature_id = rng.randrange(NATURES)
+    return make_spread(units, IVs, nature_id)
+
+def evaluate_spreads(dexno, spreads, battles, roster, master_seed,
+max_turns=MAX_TURNS, backend="python", ai="random"):
+    """ Plays the fitness battles of a batch of spreads.
+
+    Parameters:
+        dexno (int): the species
+        spreads (list): the spreads, as (EVs, IVs, nature id) tuples
+        battles (int): the number of battles per spread
+        roster (list of int): the opponents' rows
+        master_seed (int): the search's master seed
+        max_turns (int), backend (str), ai (str): as for
+        MovesetSearch.play_battles
+
+    Returns:
+        The number of battles each spread won, in order; draws and errors
+        are not wins
+    """
+    pairings = schedule(roster, master_seed)
+    rng = make_rng(None, backend)
+    spares = {}
+    return [play_battles(dexno, 0, battles, pairings, master_seed, max_turns,
+    backend, ai, rng, spares, spread=spread)[0] for spread in spreads]
+
+def spread_dict(dexno, spread):
+    "A spread with its stats, for reports"
+    EVs, IVs, nature_id = spread
+    return {
+        "EVs": list(EVs),
+        "IVs": list(IVs),
+        "nature": NATURE_NAMES[nature_id],
+        "nature_id": nature_id,
+        "stats": list(calc_stats(SpeciesTable.get(dexno).base_stats, EVs, IVs,
+        nature_id))
+    }
+
+class SpreadSearch:
+    """ A genetic algorithm over one species' spreads.
+
+    Attributes:
+        dexno (int) = the species
+        population (int) = the number of spreads per generation
+        battles (int) = the battles that make up a spread's fitness
+        seed (int) = the master seed
+        roster (list of int) = the opponents' rows
+        max_turns (int), backend (str), ai (str) = as for evaluate_spreads
+        elite (int) = the best spreads kept unchanged in each generation
+        tournament (int) = the number of spreads that compete to be a parent
+        crossover_rate (float) = the chance that a child has two parents
+        mutation_rate (float) = the chance of each kind of mutation
+        workers (int) = worker processes; 1 evaluates in this process
+        batch_size (int) = spreads per unit of work
+        checkpoint (str) = the file to write after every generation, or None
+        generation (int) = the number of the current generation
+        current (list) = the current generation's spreads
+        cache (dict) = wins by spread, for every spread evaluated so far
+        history (list of dict) = a summary of every generation so far
+        simulated (int) = battles played, not counting cache hits
+        elapsed (float) = seconds spent evolving, over every run
+    """
+    def __init__(self, dexno, population=32, battles=200, seed=0, roster=None,
+    max_turns=MAX_TURNS, backend="python", ai="random", elite=2, tournament=3,
+    crossover_rate=0.7, mutation_rate=0.3, workers=None, batch_size=4,
+    checkpoint=None):
+        if population < 2 or not 0 <= elite < population:
+            raise ValueError("Need at least 2 spreads and fewer elites")
+        self.dexno = dexno
+        self.population = population
+        self.battles = battles
+        self.seed = seed
+        self.roster = list(range(ROSTER_SIZE)) if roster is None else list(roster)
+        self.max_turns = max_turns
+        self.backend = backend
+        self.ai = ai
+        self.elite = elite
+        self.tournament = tournament
+        self.crossover_rate = crossover_rate
+        self.mutation_rate = mutation_rate
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.checkpoint = checkpoint
+        self.generation = -1
+        self.current = []
+        self.cache = {}
+        self.history = []
+        self.simulated = 0
+        self.elapsed = 0.0
+
+    def settings(self):
+        """ What a spread's fitness depends on; a checkpoint can only
+        resume a search with the same settings
+        """
+        return {
+            "dexno": self.dexno,
+            "battles": self.battles,
+            "seed": self.seed,
+            "roster": self.roster,
+            "max_turns": self.max_turns,
+            "backend": self.backend,
+            "ai": self.ai
+        }
+
+    def rng(self, generation):
+        "The random numbers of one generation's breeding"
+        return random.Random("{}:{}:spread:{}".format(self.seed, self.dexno,
+        generation))
+
+    def fitness(self, spread):
+        return self.cache[spread] / self.battles
+
+    def evaluate(self, spreads, executor=None):
+        """ Fills in the cache for spreads that aren't in it yet.
+
+        Returns:
+            The number of spreads that had to be simulated
+        """
+        new = []
+        for spread in spreads:
+            if spread not in self.cache and spread not in new:
+                new.append(spread)
+        batches = [new[i:i + self.batch_size]
+        for i in range(0, len(new), self.batch_size)]
+        args = (self.battles, self.roster, self.seed, self.max_turns,
+        self.backend, self.ai)
+        if executor is None:
+            results = [evaluate_spreads(self.dexno, batch, *args)
+            for batch in batches]
+        else:
+            futures = [executor.submit(evaluate_spreads, self.dexno, batch,
+            *args) for batch in batches]
+            results = [future.result() for future in futures]
+        for batch, wins in zip(batches, results):
+            self.cache.update(zip(batch, wins))
+        self.simulated += len(new) * self.battles
+        return len(new)
+
+    def pick(self, rng):
+        "A parent, by tournament selection"
+        entrants = [rng.choice(self.current) for _ in range(self.tournament)]
+        return max(entrants, key=self.fitness)
+
+    def breed(self, rng):
+        "The next generation: the elites and children of the current one"
+        ranked = sorted(self.current, key=self.fitness, reverse=True)
+        children = ranked[:self.elite]
+        while len(children) < self.population:
+            child = self.pick(rng)
+            if rng.random() < self.crossover_rate:
+                child = crossover(child, self.pick(rng), rng)
+            children.append(mutate(child, rng, self.mutation_rate))
+        return children
+
+    def best(self):
+        "The fittest spread seen so far"
+        return max(self.cache, key=lambda spread: (self.cache[spread],
+        spread))
+
+    def step(self, executor=None):
+        """ Makes and evaluates the next generation, records it and writes
+        the checkpoint.
+        """
+        start = time.perf_counter()
+        rng = self.rng(self.generation + 1)
+        if self.generation < 0:
+            spreads = [random_spread(rng) for _ in range(self.population)]
+        else:
+            spreads = self.breed(rng)
+        self.generation += 1
+        self.current = spreads
+        simulated = self.evaluate(spreads, executor)
+        scores = [self.fitness(spread) for spread in spreads]
+        self.elapsed += time.perf_counter() - start
+        self.history.append({
+            "generation": self.generation,
+            "best": max(scores),
+            "mean": sum(scores) / len(scores),
+            "best_so_far": self.fitness(self.best()),
+            "simulated": simulated,
+            "cached": len(spreads) - simulated
+        })
+        if self.checkpoint is not None:
+            self.save(self.checkpoint)
+
+    def run(self, generations):
+        """ Evolves the population until generations generations have been
+        evaluated, counting any done before a resume.
+
+        Returns:
+            The best spread
+        """
+        executor = None
+        if self.workers > 1:
+            executor = ProcessPoolExecutor(self.workers)
+        try:
+            while self.generation + 1 < generations:
+                self.step(executor)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return self.best()
+
+    def save(self, path):
+        """ Writes a checkpoint. It is written to a temporary file first and
+        moved into place, so an interrupted write leaves the last one.
+        """
+        state = {
+            "version": CHECKPOINT_VERSION,
+            "settings": self.settings(),
+            "generation": self.generation,
+            "population": [list(spread) for spread in self.current],
+            "cache": [[list(spread), wins] for spread, wins
+            in self.cache.items()],
+            "history": self.history,
+            "simulated": self.simulated,
+            "elapsed": self.elapsed
+        }
+        temp = path + ".tmp"
+        with open(temp, "w") as f:
+            json.dump(state, f)
+        os.replace(temp, path)
+
+    def load(self, path):
+        """ Resumes from a checkpoint.
+
+        Raises:
+            ValueError if it was written by a search with other settings,
+            whose cached fitness wouldn't apply
+        """
+        with open(path) as f:
+            state = json.load(f)
+        if state.get("version") != CHECKPOINT_VERSION:
+            raise ValueError("Unknown checkpoint version")
+        settings = self.settings()
+        differ = [name for name in settings
+        if state["settings"].get(name) != settings[name]]
+        if differ:
+            raise ValueError("The checkpoint is from a search with other "
+            "settings: {}".format(", ".join(differ)))
+        def spread(entry):
+            return (tuple(entry[0]), tuple(entry[1]), entry[2])
+        self.generation = state["generation"]
+        self.current = [spread(entry) for entry in state["population"]]
+        self.cache = dict((spread(entry), wins)
+        for entry, wins in state["cache"])
+        self.history = state["history"]
+        self.simulated = state["simulated"]
+        self.elapsed = state["elapsed"]
+
+    def as_dict(self, top=10):
+        ranked = sorted(self.cache, key=lambda spread: (self.cache[spread],
+        spread), reverse=True)
+        return {
+            "species": SpeciesTable.get(self.dexno).name,
+            "settings": self.settings(),
+            "generations": self.generation + 1,
+            "spreads_evaluated": len(self.cache),
+            "battles_simulated": self.simulated,
+            "elapsed_seconds": self.elapsed,
+            "best": [dict(spread_dict(self.dexno, spread),
+            win_rate=self.fitness(spread)) for spread in ranked[:top]],
+            "history": self.history
+        }
+
+    def write_json(self, path, top=10):
+        with open(path, "w") as f:
+            json.dump(self.as_dict(top), f, indent=2)
@@ -0,0 +1,673 @@
+""" Lockstep vectorized battles
+
+    Battle plays one battle at a time with Player and Pokemon objects. This
+    engine holds K 1v1 battles between random computer players as NumPy
+    arrays instead, with one row per battle and one column per side (HP,
+    stats, stat stages, status, the counters for sleep, confusion, thrashing,
+    charging and recharging, flags, and move ids), and plays one turn of
+    every battle that is still going per step. Each part of a turn (the
+    mobility checks, accuracy, critical hits, damage, secondary effects,
+    status moves, chip damage and fainting) is a masked operation over the
+    battles it applies to.
+
+    The rules are the ones of Battle.start, Battle.is_mobile and
+    ComputerPlayer.take_turn, including their quirks, and every number comes
+    from the same tables: the moves and their descriptors from MoveTable,
+    the type chart, DamageFormula and StatStages from Constants, and the
+    Pokemon from BulkPokemon, which rolls them like Pokemon does.
+
+    The random numbers are drawn from NumPy in a different order than the
+    object engine draws them, so a battle can't be replayed from its seed in
+    the other engine; the two agree in distribution, which cross_validate
+    checks. Battles the object engine would stop with an error (damaging
+    moves without a power, and Crash moves that miss) are stopped and
+    counted as errors here too.
+"""
+
+import time, math
+import numpy as np
+from Constants import Type, Statuses, DamageFormula, StatStages, Stats
+from Moves import MoveTable, Effect
+from BulkPokemon import PokemonSpreads
+
+# the winner of a battle that was called a draw, or that raised an error
+DRAW = 0
+ERROR = -1
+
+MAX_TURNS = 500
+
+# the columns of the stat arrays, in Stats.stat_list order without HP
+STAT_NAMES = Stats.stat_list[1:]
+ATK, DEF, SPA, SPD, SPE = range(len(STAT_NAMES))
+
+PHYSICAL, SPECIAL, STATUS = range(3)
+CATEGORIES = {"Physical": PHYSICAL, "Special": SPECIAL, "Status": STATUS}
+
+HEALTHY = Statuses.ids[Statuses.HEALTHY]
+PRZ = Statuses.ids[Statuses.PRZ]
+PSN = Statuses.ids[Statuses.PSN]
+TOX = Statuses.ids[Statuses.TOX]
+BRN = Statuses.ids[Statuses.BRN]
+SLP = Statuses.ids[Statuses.SLP]
+FRZ = Statuses.ids[Statuses.FRZ]
+CON = Statuses.ids[Statuses.CON]
+
+# the type that can't be given each status by a secondary effect, by status
+# id; -1 where no type is immune (see Players.STATUS_IMMUNITIES)
+IMMUNITIES = np.full(len(Statuses.status_list), -1, dtype=np.int64)
+IMMUNITIES[BRN] = Type.ids[Type.FIRE]
+IMMUNITIES[FRZ] = Type.ids[Type.ICE]
+IMMUNITIES[PSN] = Type.ids[Type.POISON]
+
+GROUND = Type.ids[Type.GROUND]
+
+STAGE_MULTIPLIERS = np.array(StatStages.multipliers)
+TYPE_CHART = np.array(Type.chart)
+
+class MoveArrays:
+    """ Every move in the MoveTable as columns indexed by move id.
+
+    Attributes:
+        power (float array) = the power; NaN for "None"
+        accuracy (int array) = the accuracy; -1 for moves that can't miss
+        category (int array) = PHYSICAL, SPECIAL or STATUS
+        type_id (int array) = the id of the type in the type chart
+        stab_type (int array) = the id of the type for STAB, which compares
+        type names; -2 for types the chart doesn't know
+        code (int array) = the descriptor's effect code
+        chance (int array) = the descriptor's chance, in tens of percent
+        divisor (float array) = the descriptor's recoil or drain divisor
+        statuses (int array) = (m, 3) the descriptor's status ids, padded
+        with -1
+        stats (int array) = (m, 2) the stat columns the descriptor changes,
+        padded with -1
+        stages (int array) = (m, 2) the stages each of those changes by
+        thunder_wave (bool array) = whether the move is Thunder Wave, which
+        doesn't affect Ground types
+    """
+    def __init__(self, moves):
+        m = len(moves)
+        self.power = np.full(m, np.nan)
+        self.accuracy = np.full(m, -1, dtype=np.int64)
+        self.category = np.empty(m, dtype=np.int64)
+        self.type_id = np.empty(m, dtype=np.int64)
+        self.stab_type = np.empty(m, dtype=np.int64)
+        self.code = np.empty(m, dtype=np.int64)
+        self.chance = np.empty(m, dtype=np.int64)
+        self.divisor = np.ones(m)
+        self.statuses = np.full((m, 3), -1, dtype=np.int64)
+        self.stats = np.full((m, 2), -1, dtype=np.int64)
+        self.stages = np.zeros((m, 2), dtype=np.int64)
+        self.thunder_wave = np.zeros(m, dtype=bool)
+        for i, move in enumerate(moves):
+            effect = move.descriptor
+            if move.power != "None":
+                self.power[i] = move.power
+            if move.accuracy != "None":
+                self.accuracy[i] = move.accuracy
+            self.category[i] = CATEGORIES[move.category]
+            self.type_id[i] = move.type_id
+            self.stab_type[i] = Type.ids.get(move.type, -2)
+            self.code[i] = effect.code
+            self.chance[i] = effect.chance // 10
+            if effect.divisor is not None:
+                self.divisor[i] = effect.divisor
+            for j, status in enumerate(effect.statuses):
+                self.statuses[i, j] = Statuses.ids[status]
+            for j, (stat, stages) in enumerate(effect.stats):
+                self.stats[i, j] = STAT_NAMES.index(stat)
+                self.stages[i, j] = stages
+            self.thunder_wave[i] = move.name == "Thunder Wave"
+
+class SpeciesArrays:
+    """ The types and moves of every row of the pokedex.
+
+    Attributes:
+        types (int array) = (n, 2) type ids, as in Pokemon.type_ids
+        stab_types (int array) = (n, 2) type ids for STAB, -3 for types the
+        chart doesn't know
+        moves (int array) = (n, 4) move ids; -1 for moves that aren't in
+        the movelist
+        valid (bool array) = whether all four moves are in the movelist;
+        Pokemon() raises an error for the others
+    """
+    def __init__(self, rows):
+        n = len(rows)
+        self.types = np.empty((n, 2), dtype=np.int64)
+        self.stab_types = np.empty((n, 2), dtype=np.int64)
+        self.moves = np.full((n, 4), -1, dtype=np.int64)
+        self.valid = np.ones(n, dtype=bool)
+        for i, row in enumerate(rows):
+            for j, name in enumerate(row[2:4]):
+                self.types[i, j] = Type.get_id(name)
+                self.stab_types[i, j] = Type.ids.get(name, -3)
+            for j, name in enumerate(row[10:14]):
+                try:
+                    self.moves[i, j] = MoveTable.get(name).id
+                except (KeyError, IndexError):
+                    self.valid[i] = False
+
+_tables = None
+
+def tables():
+    "The MoveArrays and SpeciesArrays, built the first time they're needed"
+    global _tables
+    if _tables is None:
+        from Constants import Data
+        _tables = (MoveArrays(MoveTable.by_id),
+        SpeciesArrays(Data.pokedex_rows[1:]))
+    return _tables
+
+class LockstepBattles:
+    """ K battles between random computer players, advanced one turn at a
+    time together. Side 0 is player 1 and side 1 is player 2.
+
+    Attributes:
+        rng (numpy Generator) = where every battle's random numbers come from
+        max_turns (int) = the number of turns after which a battle is a draw;
+        None for no limit
+        dexnos (int array) = (K, 2) the row of each Pokemon's species
+        hp (float array) = (K, 2) current HP; floats because confusion
+        damage isn't rounded
+        max_hp (int array) = (K, 2)
+        stats (int array) = (K, 2, 5) level 100 stats, without HP
+        current (int array) = (K, 2, 5) the stats after stages, burns and
+        paralysis
+        stages (int array) = (K, 2, 5) stat stages
+        status (int array) = (K, 2) status ids
+        inflicted (int array) = (K, 2) Pokemon.inflicted_turns
+        confused (bool array), confused_turns (int array) = (K, 2)
+        recharging, charging (bool arrays) = (K, 2)
+        charge_move (int array) = (K, 2) the id of the move being charged
+        thrash_turns (int array), thrash_move (int array) = (K, 2)
+        crit_boost, flinched (bool arrays) = (K, 2)
+        moves (int array) = (K, 2, 4) move ids
+        types, stab_types (int arrays) = (K, 2, 2) type ids
+        turns (int array) = (K,) turns started
+        done (bool array) = (K,) whether each battle is over
+        winner (int array) = (K,) 1 or 2, DRAW or ERROR once done
+    """
+    def __init__(self, spreads1, spreads2, seed=None, max_turns=MAX_TURNS):
+        """ Parameters:
+            spreads1, spreads2 (PokemonSpreads): player 1's and player 2's
+            Pokemon, one row per battle
+            seed (int): seed for NumPy's random generator
+            max_turns (int): as above
+        """
+        self.M, species = tables()
+        self.rng = np.random.default_rng(seed)
+        self.max_turns = max_turns
+        k = len(spreads1)
+        self.dexnos = np.stack([spreads1.dexnos, spreads2.dexnos], axis=1)
+        full = np.stack([spreads1.stats, spreads2.stats], axis=1)
+        self.max_hp = full[:, :, 0].copy()
+        self.hp = self.max_hp.astype(np.float64)
+        self.stats = full[:, :, 1:].copy()
+        self.current = self.stats.copy()
+        self.stages = np.zeros((k, 2, 5), dtype=np.int64)
+        self.status = np.full((k, 2), HEALTHY, dtype=np.int64)
+        self.inflicted = np.zeros((k, 2), dtype=np.int64)
+        self.confused = np.zeros((k, 2), dtype=bool)
+        self.confused_turns = np.zeros((k, 2), dtype=np.int64)
+        self.recharging = np.zeros((k, 2), dtype=bool)
+        self.charging = np.zeros((k, 2), dtype=bool)
+        self.charge_move = np.full((k, 2), -1, dtype=np.int64)
+        self.thrash_turns = np.zeros((k, 2), dtype=np.int64)
+        self.thrash_move = np.full((k, 2), -1, dtype=np.int64)
+        self.crit_boost = np.zeros((k, 2), dtype=bool)
+        self.flinched = np.zeros((k, 2), dtype=bool)
+        self.moves = species.moves[self.dexnos]
+        self.types = species.types[self.dexnos]
+        self.stab_types = species.stab_types[self.dexnos]
+        self.turns = np.zeros(k, dtype=np.int64)
+        self.done = np.zeros(k, dtype=bool)
+        self.winner = np.full(k, DRAW, dtype=np.int64)
+        # Pokemon() raises an error for species with unknown moves
+        self.fail(np.flatnonzero(~species.valid[self.dexnos].all(axis=1)))
+
+    def __len__(self):
+        return len(self.done)
+
+    def fail(self, b):
+        "Stops battles b with an error"
+        self.done[b] = True
+        self.winner[b] = ERROR
+
+    def finish(self, b):
+        "Ends battles b; player 2 wins those where player 1 has no HP left"
+        self.done[b] = True
+        self.winner[b] = np.where(self.hp[b, 0] == 0, 2, 1)
+
+    def damage_hp(self, b, s, damage):
+        "Pokemon.setCurrentHP for sides s of battles b"
+        self.hp[b, s] = np.clip(self.hp[b, s] - damage, 0, self.max_hp[b, s])
+
+    def refresh(self, b, s, stat):
+        "Works out current stat column stat from its stage and the status"
+        stage = self.stages[b, s, stat]
+        value = np.floor(self.stats[b, s, stat]
+        * STAGE_MULTIPLIERS[stage - StatStages.MIN]).astype(np.int64)
+        if stat == ATK:
+            value = np.where(self.status[b, s] == BRN, -(-value // 2), value)
+        elif stat == SPE:
+            value = np.where(self.status[b, s] == PRZ, -(-value // 4), value)
+        self.current[b, s, stat] = value
+
+    def set_status(self, b, s, status):
+        "Pokemon.setStatus for sides s of battles b"
+        self.status[b, s] = status
+        self.refresh(b, s, ATK)
+        self.refresh(b, s, SPE)
+
+    def change_stats(self, b, s, move, targets=None):
+        """ Applies the stat changes of moves to sides s, or to the user or
+        the defender by the sign of each change if targets is the user's
+        side
+        """
+        M = self.M
+        for j in range(M.stats.shape[1]):
+            stat = M.stats[move, j]
+            stages = M.stages[move, j]
+            for column in range(len(STAT_NAMES)):
+                hit = stat == column
+                if not hit.any():
+                    continue
+                cb = b[hit]
+                if targets is None:
+                    cs = s[hit]
+                else:
+                    cs = np.where(stages[hit] > 0, targets[hit], 1 - targets[hit])
+                self.stages[cb, cs, column] = np.clip(self.stages[cb, cs, column]
+                + stages[hit], StatStages.MIN, StatStages.MAX)
+                self.refresh(cb, cs, column)
+
+    def is_mobile(self, b, s):
+        """ Battle.is_mobile for sides s of battles b.
+
+        Returns:
+            A bool array, True where the Pokemon can move this turn
+        """
+        rng = self.rng
+        n = len(b)
+        mobile = np.ones(n, dtype=bool)
+        decided = np.zeros(n, dtype=bool)
+        status = self.status[b, s]
+        # recharging, unless asleep
+        recharge = self.recharging[b, s] & (status != SLP)
+        self.recharging[b[recharge], s[recharge]] = False
+        mobile[recharge] = False
+        decided |= recharge
+        # paralysis
+        prz = ~decided & (status == PRZ)
+        stuck = prz & (rng.integers(0, 4, n) == 0)
+        mobile[stuck] = False
+        decided |= stuck
+        # sleep
+        slp = ~decided & (status == SLP)
+        turns = self.inflicted[b, s]
+        roll = rng.integers(0, 3, n)
+        wake = slp & ((turns >= 3) | ((turns >= 1) & (roll == 0)))
+        asleep = slp & ~wake
+        self.inflicted[b[asleep], s[asleep]] += 1
+        self.set_status(b[wake], s[wake], HEALTHY)
+        self.inflicted[b[wake], s[wake]] = 0
+        mobile[asleep] = False
+        decided |= asleep
+        # freeze
+        frz = ~decided & (status == FRZ)
+        frozen = frz & (rng.integers(0, 5, n) != 0)
+        self.set_status(b[frz & ~frozen], s[frz & ~frozen], HEALTHY)
+        mobile[frozen] = False
+        decided |= frozen
+        # chip damage statuses skip the confusion check
+        decided |= (status == PSN) | (status == BRN) | (status == TOX)
+        # confusion
+        confused = ~decided & self.confused[b, s]
+        turns = self.confused_turns[b, s]
+        late = confused & (turns >= 2)
+        snap = late & (rng.integers(turns, 7) == turns)
+        self.set_status(b[snap], s[snap], HEALTHY)
+        self.confused_turns[b[snap], s[snap]] = 0
+        early = confused & (turns < 2)
+        self_hit = early & (rng.integers(0, 2, n) == 0)
+        hb, hs = b[self_hit], s[self_hit]
+        ad_ratio = self.current[hb, hs, ATK] / self.current[hb, hs, DEF]
+        self.damage_hp(hb, hs, ((DamageFormula.LEVEL_FACTOR
+        * DamageFormula.CONFUSION_POWER * ad_ratio) / DamageFormula.DIVISOR)
+        + DamageFormula.BASE)
+        self.confused_turns[b[early], s[early]] += 1
+        mobile[self_hit] = False
+        return mobile
+
+    def damage(self, b, a, move):
+        """ Player.damageCalc for the attackers on sides a of battles b.
+        Only the last hit of a multi-hit move counts, as in damageCalc, so
+        every move is rolled as one hit.
+
+        Returns:
+            (damage, errors): the damage as an int array, and a bool array
+            that is True where the move has no power, which raises an error
+            in damageCalc before anything happens
+        """
+        M = self.M
+        rng = self.rng
+        n = len(b)
+        d = 1 - a
+        errors = np.isnan(M.power[move])
+        power = np.where(errors, 0.0, M.power[move])
+        physical = M.category[move] == PHYSICAL
+        attack = np.where(physical, self.current[b, a, ATK],
+        self.current[b, a, SPA])
+        defense = np.where(physical, self.current[b, d, DEF],
+        self.current[b, d, SPD])
+        ad_ratio = attack / defense
+        damage = ((DamageFormula.LEVEL_FACTOR * power * ad_ratio)
+        / DamageFormula.DIVISOR) + DamageFormula.BASE
+        damage = damage * TYPE_CHART[(M.type_id[move] * Type.COUNT
+        + self.types[b, d, 0]) * Type.COUNT + self.types[b, d, 1]]
+        code = M.code[move]
+        high_crit = code == Effect.HIGH_CRIT
+        boosted = self.crit_boost[b, a]
+        odds = np.where(boosted, DamageFormula.BOOSTED_CRIT_ROLL,
+        np.where(high_crit, DamageFormula.HIGH_CRIT_ROLL,
+        DamageFormula.CRIT_ROLL))
+        crit = (boosted & high_crit) | (rng.integers(0, odds) == 0)
+        damage = np.where(crit, damage * DamageFormula.CRIT_MULTIPLIER, damage)
+        stab = ((M.stab_type[move] == self.stab_types[b, a, 0])
+        | (M.stab_type[move] == self.stab_types[b, a, 1]))
+        damage = np.where(stab, damage * DamageFormula.STAB, damage)
+        damage = damage * (rng.integers(DamageFormula.RANDOM_MIN,
+        DamageFormula.RANDOM_MAX + 1, n) / 100)
+        damage = np.floor(damage).astype(np.int64)
+        flinch = (~errors & (code == Effect.FLINCH)
+        & (self.current[b, a, SPE] >= self.current[b, d, SPE])
+        & (rng.integers(1, 11, n) <= M.chance[move]))
+        self.flinched[b[flinch], d[flinch]] = True
+        thrash = ~errors & (code == Effect.THRASH)
+        self.thrash_turns[b[thrash], a[thrash]] += 1
+        self.thrash_move[b[thrash], a[thrash]] = move[thrash]
+        return damage, errors
+
+    def secondary(self, b, a, move, damage):
+        "Player.secondaryEffectHandler for the attackers on sides a of battles b"
+        M = self.M
+        rng = self.rng
+        n = len(b)
+        d = 1 - a
+        code = M.code[move]
+        # recoil, or drained HP for a negative divisor
+        recoil = (code == Effect.RECOIL) | (code == Effect.ABSORB)
+        self.damage_hp(b[recoil], a[recoil],
+        np.floor(damage[recoil] / M.divisor[move[recoil]]))
+        rolled = rng.integers(1, 11, n) <= M.chance[move]
+        drop = (code == Effect.STAT_DROP_CHANCE) & rolled
+        self.change_stats(b[drop], d[drop], move[drop])
+        # the first status in the descriptor that takes
+        pending = (code == Effect.STATUS_CHANCE) & rolled
+        types = self.types[b, d]
+        for j in range(M.statuses.shape[1]):
+            status = M.statuses[move, j]
+            confuse = pending & (status == CON)
+            self.confused[b[confuse], d[confuse]] = True
+            immune = ((types[:, 0] == IMMUNITIES[status])
+            | (types[:, 1] == IMMUNITIES[status])) & (IMMUNITIES[status] >= 0)
+            takes = (pending & (status >= 0) & (status != CON)
+            & (self.status[b, d] == HEALTHY) & ~immune)
+            self.set_status(b[takes], d[takes], status[takes])
+            pending &= ~(confuse | takes)
+        recharge = code == Effect.RECHARGE
+        self.recharging[b[recharge], a[recharge]] = True
+
+    def execute_status(self, b, a, move):
+        "Player.executeStatus for the attackers on sides a of battles b"
+        M = self.M
+        d = 1 - a
+        code = M.code[move]
+        inflict = code == Effect.INFLICT
+        ground = (self.types[b, d] == GROUND).any(axis=1)
+        takes = (inflict & (self.status[b, d] == HEALTHY)
+        & ~(M.thunder_wave[move] & ground))
+        self.set_status(b[takes], d[takes], M.statuses[move[takes], 0])
+        change = code == Effect.STAT_CHANGE
+        self.change_stats(b[change], None, move[change], a[change])
+        # Focus Energy, and every status move without a handler
+        boost = ~inflict & ~change
+        self.crit_boost[b[boost], a[boost]] = True
+
+    def take_turn(self, b, a):
+        "ComputerPlayer.take_turn for the players on sides a of battles b"
+        M = self.M
+        rng = self.rng
+        # releasing a charged move: no accuracy check or secondary effect
+        charging = self.charging[b, a]
+        cb, ca = b[charging], a[charging]
+        damage, errors = self.damage(cb, ca, self.charge_move[cb, ca])
+        self.fail(cb[errors])
+        cb, ca, damage = cb[~errors], ca[~errors], damage[~errors]
+        self.damage_hp(cb, 1 - ca, damage)
+        self.charging[cb, ca] = False
+        self.charge_move[cb, ca] = -1
+        # thrashing: the damage is worked out but not dealt
+        thrashing = ~charging & (self.thrash_turns[b, a] > 0)
+        tb, ta = b[thrashing], a[thrashing]
+        _, errors = self.damage(tb, ta, self.thrash_move[tb, ta])
+        self.fail(tb[errors])
+        tb, ta = tb[~errors], ta[~errors]
+        roll = rng.integers(2, 4, len(tb))
+        turns = self.thrash_turns[tb, ta]
+        tired = (turns > 3) | ((turns == 2) & (roll == 2))
+        tb, ta = tb[tired], ta[tired]
+        self.thrash_turns[tb, ta] = 0
+        self.thrash_move[tb, ta] = -1
+        self.confused[tb, ta] = True
+        # a random move
+        choosing = ~charging & ~thrashing
+        b, a = b[choosing], a[choosing]
+        n = len(b)
+        move = self.moves[b, a, rng.integers(0, 4, n)]
+        code = M.code[move]
+        two_turn = code == Effect.TWO_TURN
+        self.charging[b[two_turn], a[two_turn]] = True
+        self.charge_move[b[two_turn], a[two_turn]] = move[two_turn]
+        accuracy = M.accuracy[move]
+        hit = (accuracy < 0) | (accuracy > rng.integers(0, 100, n))
+        # a Crash move that misses raises an error in take_turn
+        self.fail(b[~two_turn & ~hit & (code == Effect.CRASH)])
+        used = ~two_turn & hit
+        status = used & (M.category[move] == STATUS)
+        self.execute_status(b[status], a[status], move[status])
+        attack = used & ~status
+        b, a, move = b[attack], a[attack], move[attack]
+        damage, errors = self.damage(b, a, move)
+        self.fail(b[errors])
+        b, a, move, damage = (b[~errors], a[~errors], move[~errors],
+        damage[~errors])
+        self.damage_hp(b, 1 - a, damage)
+        self.secondary(b, a, move, damage)
+
+    def act(self, b, a, flinch):
+        """ Lets the Pokemon on sides a of battles b move if they can, and
+        ends the battles where the defender faints. A flinched Pokemon skips
+        its move if flinch is True, which clears the flag.
+        """
+        mobile = self.is_mobile(b, a)
+        b, a = b[mobile], a[mobile]
+        if flinch:
+            flinched = self.flinched[b, a]
+            self.flinched[b[flinched], a[flinched]] = False
+            b, a = b[~flinched], a[~flinched]
+        self.take_turn(b, a)
+        fainted = ~self.done[b] & (self.hp[b, 1 - a] <= 0)
+        self.finish(b[fainted])
+
+    def chip_damage(self, b, s):
+        "Battle.chip_damage for the sides s of battles b that are poisoned or burned"
+        status = self.status[b, s]
+        chip = (status == BRN) | (status == PSN) | (status == TOX)
+        b = b[chip]
+        status = status[chip]
+        max_hp = self.max_hp[b, s]
+        turns = self.inflicted[b, s]
+        damage = np.where(status == TOX,
+        max_hp * np.floor(0.0625 * (turns + 1)), np.floor(max_hp * 0.125))
+        self.damage_hp(b, s, damage)
+        self.inflicted[b, s] += 1
+        fainted = self.hp[b, s] <= 0
+        self.finish(b[fainted])
+
+    def step(self):
+        """ Plays one turn of every battle that isn't over, like one pass
+        through the loop in Battle.start.
+
+        Returns:
+            The number of battles still going
+        """
+        b = np.flatnonzero(~self.done)
+        if self.max_turns is not None:
+            over = self.turns[b] >= self.max_turns
+            self.done[b[over]] = True
+            b = b[~over]
+        self.turns[b] += 1
+        speed = self.current[b, :, SPE]
+        first = np.where(speed[:, 0] >= speed[:, 1], 0, 1)
+        self.act(b, first, False)
+        going = ~self.done[b]
+        b, first = b[going], first[going]
+        self.act(b, 1 - first, True)
+        # chip damage only when player 2 moved first
+        b = b[(first == 1) & ~self.done[b]]
+        for side in (0, 1):
+            self.chip_damage(b, side)
+            b = b[~self.done[b]]
+        return int((~self.done).sum())
+
+    def run(self):
+        "Plays every battle to the end"
+        while self.step():
+            pass
+
+class VectorReport:
+    """ The results of a batch of lockstep battles
+
+    Attributes:
+        winner (int array) = 1 or 2, DRAW or ERROR for each battle
+        turns (int array) = the number of turns each battle lasted
+        dexnos (int array) = (n, 2) the rows of each battle's Pokemon
+        remaining_hp (float array) = (n, 2) each Pokemon's HP at the end
+        max_hp (int array) = (n, 2)
+        elapsed (float) = wall-clock seconds spent simulating
+    """
+    def __init__(self, winner, turns, dexnos, remaining_hp, max_hp, elapsed):
+        self.winner = winner
+        self.turns = turns
+        self.dexnos = dexnos
+        self.remaining_hp = remaining_hp
+        self.max_hp = max_hp
+        self.elapsed = elapsed
+
+    def __len__(self):
+        return len(self.winner)
+
+    def battles_per_second(self):
+        if self.elapsed <= 0:
+            return float("inf")
+        return len(self) / self.elapsed
+
+    def count(self, winner):
+        "Counts the battles won by player 1 or 2, or drawn if winner is None"
+        return int((self.winner == (DRAW if winner is None else winner)).sum())
+
+    def errors(self):
+        return int((self.winner == ERROR).sum())
+
+    def __str__(self):
+        return ("{} battles in {:.2f}s ({:.1f} battles/sec)\n"
+        "Player 1 wins: {}  Player 2 wins: {}  Draws: {}  Errors: {}").format(
+            len(self), self.elapsed, self.battles_per_second(),
+            self.count(1), self.count(2), self.count(None), self.errors())
+
+def run_vector_batch(n, seed=None, dexno1=None, dexno2=None,
+max_turns=MAX_TURNS, block_size=100000):
+    """ Runs n battles between random computer players in lockstep.
+
+    Parameters:
+        n (int): the number of battles
+        seed (int): master seed; the same seed always gives the same results
+        dexno1 (int): row of player 1's Pokemon; random per battle if None
+        dexno2 (int): row of player 2's Pokemon; random per battle if None
+        max_turns (int): the number of turns after which a battle is a draw
+        block_size (int): the most battles held in arrays at once
+
+    Returns:
+        A VectorReport
+    """
+    seeds = np.random.SeedSequence(seed).spawn(math.ceil(n / block_size) or 1)
+    reports = []
+    start = time.perf_counter()
+    for i, block_seed in enumerate(seeds):
+        k = min(block_size, n - i * block_size)
+        pokemon_seed, battle_seed = block_seed.spawn(2)
+        rng = np.random.default_rng(pokemon_seed)
+        spreads = [PokemonSpreads.generate(k, dexno,
+        rng.integers(0, 2 ** 32)) for dexno in (dexno1, dexno2)]
+        battles = LockstepBattles(spreads[0], spreads[1], battle_seed,
+        max_turns)
+        battles.run()
+        reports.append(battles)
+    elapsed = time.perf_counter() - start
+    return VectorReport(
+        np.concatenate([r.winner for r in reports]),
+        np.concatenate([r.turns for r in reports]),
+        np.concatenate([r.dexnos for r in reports]),
+        np.concatenate([r.hp for r in reports]),
+        np.concatenate([r.max_hp for r in reports]),
+        elapsed
+    )
+
+def summary(winners, turns):
+    """ The rates and mean turns that cross_validate compares.
+
+    Parameters:
+        winners (int array): 1, 2, DRAW or ERROR for each battle
+        turns (int array): the turns of each battle
+
+    Returns:
+        A dict of (value, standard error) by statistic name. Mean turns
+        leave out draws and errors.
+    """
+    n = len(winners)
+    stats = {}
+    for name, code in (("p1_win_rate", 1), ("p2_win_rate", 2),
+    ("draw_rate", DRAW), ("error_rate", ERROR)):
+        p = (winners == code).mean()
+        stats[name] = (p, math.sqrt(p * (1 - p) / n))
+    finished = turns[(winners == 1) | (winners == 2)]
+    stats["mean_turns"] = (finished.mean(),
+    finished.std(ddof=1) / math.sqrt(len(finished)))
+    return stats
+
+def cross_validate(n, seed=None, dexno1=None, dexno2=None,
+max_turns=MAX_TURNS):
+    """ Plays n battles in each engine and compares their outcomes.
+
+    Returns:
+        A list of (statistic, object engine value, lockstep value, z score)
+        for each statistic of summary; |z| above about 3 is a sign that the
+        engines disagree
+    """
+    # imported here because batch imports this module
+    from batch import run_batch
+    report = run_batch(n, seed, dexno1, dexno2, max_turns)
+    winners = np.array([ERROR if r.error is not None else
+    (DRAW if r.winner is None else r.winner) for r in report.results])
+    turns = np.array([r.turns for r in report.results])
+    objects = summary(winners, turns)
+    vector = run_vector_batch(n, seed, dexno1, dexno2, max_turns)
+    lockstep = summary(vector.winner, vector.turns)
+    rows = []
+    for name, (value, error) in objects.items():
+        other, other_error = lockstep[name]
+        spread = math.hypot(error, other_error)
+        rows.append((name, value, other,
+        (other - value) / spread if spread > 0 else 0.0))
+    return rows
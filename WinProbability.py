@@ -0,0 +1,872 @@
+""" Exact win probabilities of one-on-one battles
+
+    A WinProbabilitySolver works out the chance that each side wins a battle
+    between two given Pokemon whose players pick their moves by fixed
+    policies, such as picking at random like ComputerPlayer. Instead of
+    playing battles it follows every way a turn can go, with its
+    probability: each move choice, the mobility checks of paralysis, sleep,
+    freeze, confusion and recharging, accuracy, the number of hits, critical
+    hits and all 16 damage rolls, flinching and the secondary effects' procs.
+    The rules are those of Battle.play_turn, Battle.is_mobile and
+    ComputerPlayer.take_turn, quirks included, applied to copies of the
+    Pokemon with their own methods, so the numbers come out exactly as in a
+    live battle.
+
+    Turns lead from one battle state (both Pokemon's HP, status, sleep,
+    toxic and confusion counters, stat stages, and the charging, thrashing,
+    recharging, flinch and critical hit flags) to the next. Each turn is
+    split in two at the point between the two Pokemon's moves, which is a
+    state of its own, so a state leads to the tens of ways one Pokemon's
+    move can go rather than to every combination of both. The states form
+    a graph that is searched depth first, and each state's probabilities
+    are memoized by its key. A battle can come back to a state it has been
+    in, for example when both Pokemon miss or a drained Pokemon heals, so
+    the states are solved a strongly connected component at a time: a state
+    that only leads on to solved states is a weighted sum of them, one that
+    can repeat itself divides by the chance that it doesn't, and a larger
+    cycle is solved as a linear system.
+
+    A battle that can never end (neither Pokemon can hurt the other) counts
+    as a draw. Battles the object engine would stop with an error count as
+    errors. There is no turn limit, so the answer is the limit of battles
+    played with max_turns=None; a search that visits more than max_states
+    states, or makes the process use more than max_memory megabytes, stops
+    with SolverLimitExceeded.
+"""
+
+import sys, math, time
+import numpy as np
+from Constants import Statuses, Type, DamageFormula
+from Moves import Effect
+from Players import ComputerPlayer, STATUS_IMMUNITIES
+from battle import Battle
+from Rng import make_rng
+import Events
+
+# the outcomes a battle can end in, as indexes of Solution.probabilities
+P1_WINS, P2_WINS, ERROR = range(3)
+
+MAX_STATES = 1000000
+
+# Monte Carlo battles are called draws after this many turns, since some
+# never end
+MAX_TURNS = 500
+
+# megabytes
+MAX_MEMORY = 4096
+
+# cycles of more states than this are solved by iterating instead of with
+# a dense linear system
+DENSE_LIMIT = 2000
+
+# a sleep of this many turns or more always ends, and a toxic counter this
+# high makes the next chip damage knock out, so larger counters are the same
+INFLICTED_CAP = 15
+
+HEALTHY_ID = Statuses.ids[Statuses.HEALTHY]
+SLP_ID = Statuses.ids[Statuses.SLP]
+PRZ_ID = Statuses.ids[Statuses.PRZ]
+FRZ_ID = Statuses.ids[Statuses.FRZ]
+CHIP_IDS = tuple(Statuses.ids[status] for status in Statuses.CHIP_DAMAGE)
+
+ROLLS = range(DamageFormula.RANDOM_MIN, DamageFormula.RANDOM_MAX + 1)
+
+# continuing outcomes of an action
+IDLE = 0
+ACTED = 1
+
+# where in a turn a state is: its start, or after the faster Pokemon's
+# move with player 2's or player 1's move to come
+TURN_START = 0
+P2_TO_MOVE = 1
+P1_TO_MOVE = 2
+
+class SolverLimitExceeded(Exception):
+    "Raised when a solve visits too many states or uses too much memory"
+
+def random_policy(user, target):
+    """ Picks one of the user's four move slots at random, as
+    ComputerPlayer.chooseMove does.
+
+    A policy is any function of the user's and target's Pokemon that
+    returns (probability, move slot) pairs; it must depend only on their
+    battle state.
+    """
+    return ((0.25, 0), (0.25, 1), (0.25, 2), (0.25, 3))
+
+def state_key(pokemon):
+    """ Everything about a Pokemon that can change during a battle and
+    matters to how it goes on. The current stats follow from the stages
+    and the status, so they are left out.
+    """
+    chargingMove = pokemon.chargingMove
+    thrash_move = pokemon.thrash_move
+    return (pokemon.currentHP, pokemon.status_id,
+    min(pokemon.inflicted_turns, INFLICTED_CAP), pokemon.confused,
+    pokemon.confusedTurns, pokemon.ATKstage, pokemon.DEFstage,
+    pokemon.SPATKstage, pokemon.SPDEFstage, pokemon.SPEEDstage,
+    pokemon.critBoost, pokemon.recharging, pokemon.charging,
+    None if chargingMove is None else chargingMove.id, pokemon.thrash_turns,
+    None if thrash_move is None else thrash_move.id, pokemon.flinchedThisTurn)
+
+def peak_memory():
+    "The most memory this process has used so far, in megabytes"
+    try:
+        import resource
+    except ImportError:
+        return 0.0 # not available on Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes, except on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+class Solution:
+    """ The exact outcome probabilities of a battle.
+
+    Attributes:
+        probabilities (tuple of float) = the chance that player 1 wins,
+        that player 2 wins, and that the battle raises an error, indexed by
+        P1_WINS, P2_WINS and ERROR
+        draw (float) = the chance that the battle never ends
+        states (int) = the number of battle states solved, counting the
+        states between the two moves of a turn
+        largest_cycle (int) = the number of states in the largest set of
+        states that can all come back to each other
+        elapsed (float) = seconds spent solving
+    """
+    def __init__(self, probabilities, states, largest_cycle, elapsed):
+        self.probabilities = tuple(probabilities)
+        self.draw = max(0.0, 1.0 - sum(self.probabilities))
+        self.states = states
+        self.largest_cycle = largest_cycle
+        self.elapsed = elapsed
+
+    @property
+    def p1_wins(self):
+        return self.probabilities[P1_WINS]
+
+    @property
+    def p2_wins(self):
+        return self.probabilities[P2_WINS]
+
+    @property
+    def errors(self):
+        return self.probabilities[ERROR]
+
+    def as_dict(self):
+        return {
+            "p1_wins": self.p1_wins,
+            "p2_wins": self.p2_wins,
+            "draw": self.draw,
+            "error": self.errors,
+            "states": self.states,
+            "largest_cycle": self.largest_cycle,
+            "elapsed": self.elapsed
+        }
+
+    def __str__(self):
+        return ("Player 1 wins: {:.6f}  Player 2 wins: {:.6f}  Draw: {:.6f}  "
+        "Error: {:.6f}\n{} states solved in {:.2f}s").format(self.p1_wins,
+        self.p2_wins, self.draw, self.errors, self.states, self.elapsed)
+
+class WinProbabilitySolver:
+    """ Solves battles between two Pokemon exactly.
+
+    Attributes:
+        pokemon (tuple of Pokemon) = copies of player 1's and player 2's
+        Pokemon, in the state the battle starts from
+        policies (tuple of function) = how each player picks its moves
+        max_states (int) = the most states a solve may visit
+        max_memory (float) = the most megabytes the process may use while
+        solving; None for no limit
+        values (dict) = the solved outcome probabilities of every state, by
+        its phase (TURN_START, P2_TO_MOVE or P1_TO_MOVE) and both Pokemon's
+        state_keys; kept between solves
+        damage_cache (dict) = the damage distribution of each move by seat
+        and the stats it is worked out from
+    """
+    def __init__(self, pokemon1, pokemon2, policy1=random_policy,
+    policy2=random_policy, max_states=MAX_STATES, max_memory=MAX_MEMORY):
+        self.pokemon = tuple(self.detach(pokemon) for pokemon in (pokemon1,
+        pokemon2))
+        self.policies = (policy1, policy2)
+        self.max_states = max_states
+        self.max_memory = max_memory
+        self.values = {}
+        self.damage_cache = {}
+
+    @staticmethod
+    def detach(pokemon):
+        "A copy of a Pokemon that reports nowhere"
+        pokemon = pokemon.copy()
+        pokemon.setEvents(Events.NULL)
+        return pokemon
+
+    def solve(self):
+        """ Works out the outcome probabilities of the battle.
+
+        Returns:
+            A Solution
+
+        Raises:
+            SolverLimitExceeded if the battle has too many states
+        """
+        start = time.perf_counter()
+        p1, p2 = self.pokemon
+        key = (TURN_START, state_key(p1), state_key(p2))
+        self.largest_cycle = 1
+        if key not in self.values:
+            self.search(key, p1, p2)
+        return Solution(self.values[key], len(self.values),
+        self.largest_cycle, time.perf_counter() - start)
+
+    def search(self, root, p1, p2):
+        """ Tarjan's strongly connected components algorithm over the states
+        reachable from root, without recursion; each component is solved as
+        soon as it is complete, so only the states on the stack keep their
+        transitions.
+        """
+        index = {}
+        low = {}
+        transitions = {}
+        stack = []
+        frames = []
+        counter = 0
+
+        def visit(key, p1, p2):
+            nonlocal counter
+            if len(self.values) + len(index) >= self.max_states:
+                raise SolverLimitExceeded("More than {} states".format(
+                    self.max_states))
+            if (self.max_memory is not None and counter % 1024 == 0 and
+            peak_memory() > self.max_memory):
+                raise SolverLimitExceeded("More than {} MB of memory".format(
+                    self.max_memory))
+            index[key] = low[key] = counter
+            counter += 1
+            stack.append(key)
+            successors, terminal = self.expand(key[0], p1, p2)
+            transitions[key] = ([(next_key, p) for next_key, (p, _, _)
+            in successors.items()], terminal)
+            frames.append([key, list(successors.items()), 0])
+
+        visit(root, p1, p2)
+        while frames:
+            frame = frames[-1]
+            key, successors, position = frame
+            if position < len(successors):
+                frame[2] += 1
+                next_key, (p, next_p1, next_p2) = successors[position]
+                successors[position] = None # the copies aren't needed again
+                if next_key in self.values:
+                    continue
+                if next_key not in index:
+                    visit(next_key, next_p1, next_p2)
+                elif index[next_key] < low[key]:
+                    low[key] = index[next_key] # on the stack
+                continue
+            frames.pop()
+            if frames:
+                parent = frames[-1][0]
+                if low[key] < low[parent]:
+                    low[parent] = low[key]
+            if low[key] == index[key]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    component.append(member)
+                    if member == key:
+                        break
+                self.solve_component(component, transitions)
+                for member in component:
+                    del index[member], low[member], transitions[member]
+
+    def solve_component(self, component, transitions):
+        "Solves a complete strongly connected component of states"
+        values = self.values
+        if len(component) == 1:
+            key = component[0]
+            successors, terminal = transitions[key]
+            total = list(terminal)
+            stay = 0.0
+            for next_key, p in successors:
+                if next_key == key:
+                    stay += p
+                    continue
+                value = values[next_key]
+                for outcome in range(3):
+                    total[outcome] += p * value[outcome]
+            leave = 1.0 - stay
+            if leave <= 1e-15:
+                values[key] = (0.0, 0.0, 0.0) # it never ends
+            else:
+                values[key] = tuple(t / leave for t in total)
+            return
+        self.largest_cycle = max(self.largest_cycle, len(component))
+        position = {key: i for i, key in enumerate(component)}
+        k = len(component)
+        constant = np.zeros((k, 3))
+        inside = []
+        for i, key in enumerate(component):
+            successors, terminal = transitions[key]
+            constant[i] += terminal
+            row = []
+            for next_key, p in successors:
+                j = position.get(next_key)
+                if j is None:
+                    constant[i] += np.multiply(p, values[next_key])
+                else:
+                    row.append((j, p))
+            inside.append(row)
+        if not constant.any():
+            solution = constant # a cycle it never leaves
+        elif k <= DENSE_LIMIT:
+            matrix = np.eye(k)
+            for i, row in enumerate(inside):
+                for j, p in row:
+                    matrix[i, j] -= p
+            solution = np.linalg.solve(matrix, constant)
+        else:
+            solution = self.iterate(inside, constant)
+        for i, key in enumerate(component):
+            values[key] = tuple(float(v) for v in solution[i])
+
+    @staticmethod
+    def iterate(inside, constant, tolerance=1e-14, max_sweeps=100000):
+        "Solves x = constant + Qx by Gauss-Seidel sweeps"
+        solution = constant.copy()
+        for _ in range(max_sweeps):
+            change = 0.0
+            for i, row in enumerate(inside):
+                value = constant[i].copy()
+                for j, p in row:
+                    value += p * solution[j]
+                change = max(change, float(np.abs(value - solution[i]).max()))
+                solution[i] = value
+            if change < tolerance:
+                break
+        return solution
+
+    def expand(self, phase, p1, p2):
+        """ Every way the next move of a turn can go from a state, as in
+        Battle.play_turn: the faster Pokemon's at the start of the turn,
+        and the other's with the end of the turn after it.
+
+        Returns:
+            (successors, terminal): the states the battle goes on in, as a
+            dict from key to [probability, player 1's Pokemon, player 2's],
+            and the probability that the battle ends in each outcome
+        """
+        terminal = [0.0, 0.0, 0.0]
+        if phase == TURN_START:
+            if p1.currentSpeed >= p2.currentSpeed:
+                return self.act(0, p1, p2, False, terminal, P2_TO_MOVE), terminal
+            return self.act(1, p1, p2, False, terminal, P1_TO_MOVE), terminal
+        if phase == P2_TO_MOVE:
+            return self.act(1, p1, p2, True, terminal, TURN_START), terminal
+        after = self.act(0, p1, p2, True, terminal, TURN_START)
+        # burn and poison only hurt when player 2 moved first
+        for seat in (0, 1):
+            chipped = {}
+            for p, q1, q2 in after.values():
+                pair = [q1, q2]
+                pokemon = pair[seat]
+                if pokemon.status_id in CHIP_IDS:
+                    pokemon = pair[seat] = self.chip_damage(pokemon)
+                    if pokemon.currentHP <= 0:
+                        terminal[self.winner(pair[0])] += p
+                        continue
+                self.merge(chipped, TURN_START, p, pair[0], pair[1])
+            after = chipped
+        return after, terminal
+
+    @staticmethod
+    def merge(states, phase, p, p1, p2):
+        "Adds probability p of the state (p1, p2) at phase to states"
+        key = (phase, state_key(p1), state_key(p2))
+        entry = states.get(key)
+        if entry is None:
+            states[key] = [p, p1, p2]
+        else:
+            entry[0] += p
+
+    @staticmethod
+    def winner(p1):
+        "The outcome when the battle ends, as in Battle.finish"
+        return P2_WINS if p1.currentHP == 0 else P1_WINS
+
+    def act(self, seat, p1, p2, check_flinch, terminal, phase):
+        """ The move of the Pokemon in seat (0 or 1), with the check for
+        whether the battle is over after it.
+
+        Parameters:
+            seat (int): 0 for player 1, 1 for player 2
+            p1, p2 (Pokemon): the state
+            check_flinch (bool): whether a flinched Pokemon loses its move
+            terminal (list of float): where to add the probabilities of the
+            outcomes that end the battle
+            phase (int): the phase of the states that follow
+
+        Returns:
+            The states the battle goes on in, merged by key
+        """
+        result = {}
+        pair = (p1, p2)
+        user = pair[seat]
+        target = pair[1 - seat]
+        for q, mobile_user, mobile in self.mobility(user):
+            if not mobile:
+                outcomes = ((1.0, mobile_user, target, IDLE),)
+            elif check_flinch and mobile_user.flinchedThisTurn:
+                steady = mobile_user.copy()
+                steady.setFlinch(False)
+                outcomes = ((1.0, steady, target, IDLE),)
+            else:
+                outcomes = self.take_turn(seat, mobile_user, target)
+            for r, next_user, next_target, status in outcomes:
+                weight = q * r
+                if status == ERROR:
+                    terminal[ERROR] += weight
+                    continue
+                pair = [None, None]
+                pair[seat] = next_user
+                pair[1 - seat] = next_target
+                if status == ACTED and next_target.currentHP <= 0:
+                    terminal[self.winner(pair[0])] += weight
+                    continue
+                self.merge(result, phase, weight, pair[0], pair[1])
+        return result
+
+    def mobility(self, pokemon):
+        """ Whether a Pokemon can move this turn, as in Battle.is_mobile.
+
+        Returns:
+            A list of (probability, pokemon, whether it can move)
+        """
+        status = pokemon.status_id
+        if pokemon.recharging and status != SLP_ID:
+            rested = pokemon.copy()
+            rested.setRecharging(False)
+            return [(1.0, rested, False)]
+        checks = [(1.0, pokemon)]
+        outcomes = []
+        if status == PRZ_ID:
+            outcomes.append((0.25, pokemon, False))
+            checks = [(0.75, pokemon)]
+        elif status == SLP_ID:
+            turns = pokemon.inflicted_turns
+            asleep = pokemon.copy()
+            asleep.incrementInflictedTurns()
+            awake = pokemon.copy()
+            awake.setStatus(Statuses.HEALTHY)
+            awake.resetInflictedTurns()
+            if turns == 0:
+                return [(1.0, asleep, False)]
+            elif turns < 3:
+                outcomes.append((2 / 3, asleep, False))
+                checks = [(1 / 3, awake)]
+            else:
+                checks = [(1.0, awake)]
+        elif status == FRZ_ID:
+            thawed = pokemon.copy()
+            thawed.setStatus(Statuses.HEALTHY)
+            outcomes.append((0.8, pokemon, False))
+            checks = [(0.2, thawed)]
+        elif status in CHIP_IDS:
+            return [(1.0, pokemon, True)]
+        for p, checked in checks:
+            if not checked.confused:
+                outcomes.append((p, checked, True))
+            elif checked.confusedTurns >= 2:
+                snap = 1 / (7 - checked.confusedTurns)
+                cured = checked.copy()
+                cured.setStatus(Statuses.HEALTHY)
+                cured.resetConfusedTurns()
+                outcomes.append((p * snap, cured, True))
+                outcomes.append((p * (1 - snap), checked, True))
+            else:
+                hurt = checked.copy()
+                ad_ratio = hurt.getAttack() / hurt.getDefense()
+                damage = ((DamageFormula.LEVEL_FACTOR
+                * DamageFormula.CONFUSION_POWER * ad_ratio)
+                / DamageFormula.DIVISOR) + DamageFormula.BASE
+                hurt.setCurrentHP(damage)
+                hurt.incrementConfusedTurns()
+                steady = checked.copy()
+                steady.incrementConfusedTurns()
+                outcomes.append((p / 2, hurt, False))
+                outcomes.append((p / 2, steady, True))
+        return outcomes
+
+    def take_turn(self, seat, user, target):
+        """ The outcomes of a Pokemon that can move taking its turn, as in
+        ComputerPlayer.take_turn with its player's policy choosing the move.
+
+        Returns:
+            A list of (probability, user, target, IDLE, ACTED or ERROR)
+        """
+        if user.charging:
+            # released without an accuracy check or secondary effect
+            move = user.chargingMove
+            outcomes = []
+            released = user.copy()
+            released.resetChargingMove()
+            released.set_charging(False)
+            for p, damage, flinch in self.damage_outcomes(seat, user, move,
+            target):
+                if damage is None:
+                    outcomes.append((p, user, target, ERROR))
+                    continue
+                hurt = self.hurt(target, damage, flinch)
+                outcomes.append((p, released, hurt, ACTED))
+            return outcomes
+        if user.thrash_turns > 0:
+            # the damage is worked out but not dealt
+            move = user.thrash_move
+            outcomes = []
+            for p, damage, flinch in self.flinch_outcomes(seat, user, move,
+            target):
+                if damage is None:
+                    outcomes.append((p, user, target, ERROR))
+                    continue
+                thrashed = user.copy()
+                thrashed.incrementThrashTurns()
+                flinched = self.hurt(target, 0, flinch)
+                turns = thrashed.thrash_turns
+                if turns > 3:
+                    outcomes.append((p, self.fatigue(thrashed), flinched,
+                    ACTED))
+                elif turns == 2:
+                    outcomes.append((p / 2, self.fatigue(thrashed), flinched,
+                    ACTED))
+                    outcomes.append((p / 2, thrashed, flinched, ACTED))
+                else:
+                    outcomes.append((p, thrashed, flinched, ACTED))
+            return outcomes
+        outcomes = []
+        for p, slot in self.policies[seat](user, target):
+            for q, next_user, next_target, status in self.use(seat, user,
+            user.moves[slot], target):
+                outcomes.append((p * q, next_user, next_target, status))
+        return outcomes
+
+    def use(self, seat, user, move, target):
+        "The outcomes of using a chosen move, as in ComputerPlayer.take_turn"
+        code = move.descriptor.code
+        if code == Effect.TWO_TURN:
+            charging = user.copy()
+            charging.set_charging(True)
+            charging.setChargingMove(move)
+            return [(1.0, charging, target, ACTED)]
+        outcomes = []
+        p_hit = 1.0
+        if move.accuracy != "None":
+            p_hit = min(max(move.accuracy, 0), 100) / 100
+            if p_hit < 1:
+                # a Crash move that misses raises an error
+                outcomes.append((1 - p_hit, user, target,
+                ERROR if code == Effect.CRASH else ACTED))
+            if p_hit == 0:
+                return outcomes
+        if move.category == "Physical" or move.category == "Special":
+            next_user = user
+            if code == Effect.THRASH:
+                next_user = user.copy()
+                next_user.incrementThrashTurns()
+                next_user.setThrashMove(move)
+            for p, damage, flinch in self.damage_outcomes(seat, user, move,
+            target):
+                if damage is None:
+                    outcomes.append((p * p_hit, user, target, ERROR))
+                    continue
+                hurt = self.hurt(target, damage, flinch)
+                for q, u, t in self.secondary(next_user, move, damage, hurt):
+                    outcomes.append((p * p_hit * q, u, t, ACTED))
+        else:
+            u, t = self.status_move(user, move, target)
+            outcomes.append((p_hit, u, t, ACTED))
+        return outcomes
+
+    @staticmethod
+    def hurt(target, damage, flinch):
+        "A copy of target after taking damage, flinched if flinch is True"
+        if damage == 0 and not flinch:
+            return target
+        hurt = target.copy()
+        hurt.setCurrentHP(damage)
+        if flinch:
+            hurt.setFlinch(True)
+        return hurt
+
+    @staticmethod
+    def fatigue(pokemon):
+        "A Pokemon that has stopped thrashing and become confused"
+        pokemon.resetThrashMove()
+        pokemon.resetThrashTurns()
+        pokemon.set_confusion(True)
+        return pokemon
+
+    def damage_outcomes(self, seat, user, move, target):
+        """ The damage of one use of a move, as in Player.damageCalc: only
+        the last hit of a multi-hit move counts, but each hit can make the
+        target flinch. Damage beyond the target's HP is cut off and merged,
+        except for recoil and draining moves, whose effect depends on it.
+
+        Returns:
+            A list of (probability, damage, whether the target flinches);
+            the damage is None if the move raises an error
+        """
+        flinch_chance = self.flinch_chance(user, move, target)
+        cap = target.currentHP
+        if move.descriptor.code in (Effect.RECOIL, Effect.ABSORB):
+            cap = None
+        totals = {}
+        for p, damage in self.damage_distribution(seat, user, move, target):
+            if damage is not None and cap is not None and damage > cap:
+                damage = cap
+            if flinch_chance > 0 and damage is not None:
+                choices = ((p * flinch_chance, True),
+                (p * (1 - flinch_chance), False))
+            else:
+                choices = ((p, False),)
+            for q, flinch in choices:
+                key = (damage, flinch)
+                totals[key] = totals.get(key, 0.0) + q
+        return [(p, damage, flinch) for (damage, flinch), p in totals.items()]
+
+    def flinch_outcomes(self, seat, user, move, target):
+        "damage_outcomes for a move whose damage isn't dealt"
+        if move.power == "None":
+            return [(1.0, None, False)]
+        flinch_chance = self.flinch_chance(user, move, target)
+        if flinch_chance > 0:
+            return [(flinch_chance, 0, True), (1 - flinch_chance, 0, False)]
+        return [(1.0, 0, False)]
+
+    @staticmethod
+    def flinch_chance(user, move, target):
+        "The chance that one use of a move makes the target flinch"
+        effect = move.descriptor
+        if (effect.code != Effect.FLINCH or
+        user.getSpeed() < target.getSpeed()):
+            return 0.0
+        chance = (effect.chance // 10) / 10
+        hits = effect.hits
+        return sum(1 - (1 - chance) ** n for n in hits) / len(hits)
+
+    def damage_distribution(self, seat, user, move, target):
+        """ The damage one hit of a move can do, by probability.
+
+        Returns:
+            A tuple of (probability, damage) pairs; ((1.0, None),) if the
+            move has no power, which raises an error
+        """
+        if move.category == "Physical":
+            attack, defense = user.getAttack(), target.getDefense()
+        else:
+            attack, defense = user.getSpAtk(), target.getSpdef()
+        key = (seat, move.id, attack, defense, user.critBoost)
+        outcomes = self.damage_cache.get(key)
+        if outcomes is not None:
+            return outcomes
+        if move.power == "None":
+            outcomes = ((1.0, None),)
+        else:
+            high_crit = move.descriptor.code == Effect.HIGH_CRIT
+            if user.critBoost:
+                p_crit = 1.0 if high_crit else 1 / DamageFormula.BOOSTED_CRIT_ROLL
+            else:
+                p_crit = 1 / (DamageFormula.HIGH_CRIT_ROLL if high_crit
+                else DamageFormula.CRIT_ROLL)
+            ad_ratio = attack / defense
+            base = ((DamageFormula.LEVEL_FACTOR * move.power * ad_ratio)
+            / DamageFormula.DIVISOR) + DamageFormula.BASE
+            base = base * move.effectiveness(target.type_ids)
+            stab = move.type in user.types
+            totals = {}
+            for crit, p in ((False, 1 - p_crit), (True, p_crit)):
+                if p == 0:
+                    continue
+                for roll in ROLLS:
+                    damage = base
+                    if crit:
+                        damage *= DamageFormula.CRIT_MULTIPLIER
+                    if stab:
+                        damage *= DamageFormula.STAB
+                    damage *= (roll / 100)
+                    damage = math.floor(damage)
+                    totals[damage] = totals.get(damage, 0.0) + p / len(ROLLS)
+            outcomes = tuple((p, damage) for damage, p in totals.items())
+        self.damage_cache[key] = outcomes
+        return outcomes
+
+    def secondary(self, user, move, damage, target):
+        """ The outcomes of a damaging move's secondary effect, as in
+        Player.secondaryEffectHandler.
+
+        Returns:
+            A list of (probability, user, target)
+        """
+        effect = move.descriptor
+        code = effect.code
+        if code == Effect.RECOIL or code == Effect.ABSORB:
+            recoiled = user.copy()
+            recoiled.setCurrentHP(math.floor(damage / effect.divisor))
+            return [(1.0, recoiled, target)]
+        if code == Effect.RECHARGE:
+            tired = user.copy()
+            tired.setRecharging(True)
+            return [(1.0, tired, target)]
+        chance = (effect.chance // 10) / 10
+        if code == Effect.STAT_DROP_CHANCE:
+            dropped = target.copy()
+            for stat, stages in effect.stats:
+                dropped.setCurrentStat(stat, stages)
+        elif code == Effect.STATUS_CHANCE:
+            dropped = None
+            for status in effect.statuses:
+                if status == Statuses.CON:
+                    dropped = target.copy()
+                    dropped.set_confusion(True)
+                    break
+                if (target.status_id == HEALTHY_ID and
+                STATUS_IMMUNITIES.get(status) not in target.types):
+                    dropped = target.copy()
+                    dropped.setStatus(status)
+                    break
+            if dropped is None:
+                return [(1.0, user, target)]
+        else:
+            return [(1.0, user, target)]
+        if chance <= 0:
+            return [(1.0, user, target)]
+        if chance >= 1:
+            return [(1.0, user, dropped)]
+        return [(chance, user, dropped), (1 - chance, user, target)]
+
+    @staticmethod
+    def status_move(user, move, target):
+        """ The result of a status move that hits, as in Player.executeStatus
+
+        Returns:
+            (user, target), copied if changed
+        """
+        effect = move.descriptor
+        if effect.code == Effect.INFLICT:
+            if target.status_id != HEALTHY_ID or (move.name == "Thunder Wave"
+            and Type.GROUND in target.types):
+                return user, target
+            target = target.copy()
+            target.setStatus(effect.statuses[0])
+        elif effect.code == Effect.STAT_CHANGE:
+            user = user.copy()
+            target = target.copy()
+            for stat, stages in effect.stats:
+                (user if stages > 0 else target).setCurrentStat(stat, stages)
+        elif not user.critBoost:
+            user = user.copy()
+            user.setCritBoost()
+        return user, target
+
+    @staticmethod
+    def chip_damage(pokemon):
+        "A Pokemon after end of turn status damage, as in Battle.chip_damage"
+        pokemon = pokemon.copy()
+        if pokemon.status_id == Statuses.ids[Statuses.TOX]:
+            damage = pokemon.getMaxHP() * math.floor(0.0625 *
+            (pokemon.inflicted_turns + 1))
+        else:
+            damage = math.floor(pokemon.getMaxHP() * 0.125)
+        pokemon.setCurrentHP(damage)
+        pokemon.incrementInflictedTurns()
+        return pokemon
+
+# chooseMove draws a policy's probabilities with this resolution
+POLICY_RESOLUTION = 1 << 30
+
+class PolicyPlayer(ComputerPlayer):
+    """ A computer player that picks its moves by a solver policy, for
+    checking the solver's answers with a policy other than random_policy.
+
+    Attributes:
+        policy (function) = as for WinProbabilitySolver
+    """
+    def __init__(self, name, dexno=None, events=None, rng=None,
+    policy=random_policy):
+        super().__init__(name, dexno, events, rng)
+        self.policy = policy
+
+    def chooseMove(self, other_pkmn):
+        roll = self.rng.randint(0, POLICY_RESOLUTION - 1) / POLICY_RESOLUTION
+        choices = self.policy(self.pokemon, other_pkmn)
+        for p, slot in choices:
+            roll -= p
+            if roll < 0:
+                return slot
+        return choices[-1][1]
+
+def monte_carlo(pokemon1, pokemon2, n, seed=None, policy1=None, policy2=None,
+max_turns=MAX_TURNS, backend="python"):
+    """ Plays n battles between copies of two Pokemon with Battle.start.
+
+    Parameters:
+        pokemon1, pokemon2 (Pokemon): the Pokemon, in the state every battle
+        starts from
+        n (int): the number of battles
+        seed (int): master seed; each battle gets its own seed drawn from it
+        policy1, policy2 (function): how each player picks its moves; None
+        for ComputerPlayer's own random choice
+        max_turns (int): the number of turns after which a battle is a draw
+        backend (str): the random number backend, one of Rng.BACKENDS
+
+    Returns:
+        The numbers of battles won by player 1, won by player 2, drawn and
+        stopped by an error, as a list indexed by P1_WINS, P2_WINS and ERROR
+        with draws last
+    """
+    counts = [0, 0, 0, 0]
+    seeder = make_rng(seed)
+    for _ in range(n):
+        rng = make_rng(seeder.getrandbits(32), backend)
+        players = []
+        for name, pokemon, policy in (("Brock", pokemon1, policy1),
+        ("Misty", pokemon2, policy2)):
+            if policy is None:
+                player = ComputerPlayer(name, pokemon.dexno, Events.NULL, rng)
+            else:
+                player = PolicyPlayer(name, pokemon.dexno, Events.NULL, rng,
+                policy)
+            player.pokemon = pokemon.copy()
+            players.append(player)
+        battle = Battle(players[0], players[1], max_turns, Events.NULL, rng)
+        try:
+            winner = battle.start()
+        except Exception:
+            counts[ERROR] += 1
+            continue
+        if winner is None:
+            counts[3] += 1
+        else:
+            counts[P1_WINS if winner is players[0] else P2_WINS] += 1
+    return counts
+
+def validate(solution, counts):
+    """ Compares a Solution with Monte Carlo counts.
+
+    Returns:
+        A list of (outcome, exact probability, sampled rate, z score), one
+        per outcome; the sampled rates should be within about 3 standard
+        errors of the exact ones
+    """
+    n = sum(counts)
+    exact = list(solution.probabilities) + [solution.draw]
+    rows = []
+    for name, p, count in zip(("p1_wins", "p2_wins", "error", "draw"), exact,
+    counts):
+        rate = count / n
+        error = math.sqrt(p * (1 - p) / n)
+        if error > 0:
+            z = (rate - p) / error
+        else:
+            z = 0.0 if rate == p else float("inf")
+        rows.append((name, p, rate, z))
+    return rows
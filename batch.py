@@ -0,0 +1,448 @@
+import sys, time, random, json
+from argparse import ArgumentParser
+from Players import ComputerPlayer
+from Search import SearchPlayer
+from MonteCarlo import MCTSPlayer
+from battle import Battle
+from Rng import make_rng, BACKENDS
+from Instrumentation import BattleMetrics
+from VectorBattle import run_vector_batch, cross_validate
+from ResultStore import ResultWriter, ROW_GROUP_SIZE
+from OnlineStats import BattleAggregator
+import Events
+
+# EXAMPLE: run 10,000 silent computer vs. computer battles
+# python batch.py 10000 --seed 42
+# EXAMPLE: pit the search AI against the random one
+# python batch.py 200 --seed 42 --ai1 search
+# EXAMPLE: see where the time goes, as JSON and for Prometheus
+# python batch.py 10000 --seed 42 --metrics-json m.json --metrics-prom m.prom
+# EXAMPLE: a million random battles with the vectorized engine
+# python batch.py 1000000 --seed 42 --engine lockstep
+# EXAMPLE: check that both engines agree
+# python batch.py 20000 --seed 42 --cross-validate
+# EXAMPLE: check that reused players are instrumented like new ones
+# python batch.py 2000 --seed 42 --check-metrics
+# EXAMPLE: stream a million results to a columnar file, adding to last night's
+# python batch.py 1000000 --seed 43 --results nightly.pkr --append
+# EXAMPLE: win rates with confidence intervals and move statistics
+# python batch.py 100000 --seed 42 --stats-json stats.json
+
+""" Headless batch runner for computer vs. computer battles.
+
+    Every battle is played by the regular Battle, ComputerPlayer and Pokemon
+    classes, so the rules are exactly the ones used by battle.py. The only
+    differences are that events go to the null sink instead of the console
+    and that each battle gets its own random number stream seeded from a
+    master seed, which makes a whole batch (and any single battle in it)
+    reproducible.
+"""
+
+# Battles that last longer than this are called a draw so that matchups
+# where neither Pokemon can hurt the other don't loop forever
+MAX_TURNS = 500
+
+# The computer players a batch can use, by name
+AI_PLAYERS = {
+    "random": ComputerPlayer,
+    "search": SearchPlayer,
+    "mcts": MCTSPlayer
+}
+
+# the computer players that keep no state of their own between battles, so
+# play can reuse them (see seat_player)
+RECYCLABLE = ("random",)
+
+# objects plays each battle with the Battle class; lockstep plays them all
+# at once with VectorBattle
+ENGINES = ("objects", "lockstep")
+
+class BattleResult:
+    """ The outcome of a single simulated battle
+
+    Attributes:
+        seed (int) = the seed the battle was played with
+        winner (int) = 1 or 2 for the winning player; None for a draw or
+        a battle that raised an error
+        turns (int) = the number of turns the battle lasted
+        species (tuple of str) = the names of player 1's and player 2's Pokemon
+        dexnos (tuple of int) = the rows of player 1's and player 2's Pokemon
+        remaining_hp (tuple of int) = each Pokemon's HP at the end of battle
+        max_hp (tuple of int) = each Pokemon's max HP
+        error (str) = description of the exception the battle raised, if any
+        natures (tuple of int) = each Pokemon's nature id
+        stats (tuple of list) = each Pokemon's six stats, in Stats.stat_list
+        order
+        moves (tuple of list) = the ids of each Pokemon's four moves
+        move_uses (tuple of list) = how many times each Pokemon used each of
+        its moves, in the same order
+    """
+    def __init__(self, seed, winner, turns, species, dexnos, remaining_hp,
+    max_hp, error=None, natures=(), stats=(), moves=(), move_uses=()):
+        self.seed = seed
+        self.winner = winner
+        self.turns = turns
+        self.species = species
+        self.dexnos = dexnos
+        self.remaining_hp = remaining_hp
+        self.max_hp = max_hp
+        self.error = error
+        self.natures = natures
+        self.stats = stats
+        self.moves = moves
+        self.move_uses = move_uses
+
+    def as_dict(self):
+        return {
+            "seed": self.seed,
+            "winner": self.winner,
+            "turns": self.turns,
+            "species": list(self.species),
+            "dexnos": list(self.dexnos),
+            "remaining_hp": list(self.remaining_hp),
+            "max_hp": list(self.max_hp),
+            "error": self.error,
+            "natures": list(self.natures),
+            "stats": list(self.stats),
+            "moves": list(self.moves),
+            "move_uses": list(self.move_uses)
+        }
+
+class BatchReport:
+    """ The results of a batch run
+
+    Attributes:
+        results (list of BattleResult) = one result per battle, in order;
+        empty if the batch didn't keep them
+        elapsed (float) = wall-clock seconds spent simulating
+        battles (int) = the number of battles
+        tallies (dict) = the battles won by player 1 and 2 and drawn, by
+        winner (1, 2 or None), and the battles that raised an error, under
+        "errors"
+    """
+    def __init__(self, results, elapsed):
+        self.results = []
+        self.elapsed = elapsed
+        self.battles = 0
+        self.tallies = {1: 0, 2: 0, None: 0, "errors": 0}
+        for result in results:
+            self.add(result)
+
+    def add(self, result, keep=True):
+        "Counts one more result, and keeps it in results if keep is True"
+        self.battles += 1
+        if result.error is not None:
+            self.tallies["errors"] += 1
+        else:
+            self.tallies[result.winner] += 1
+        if keep:
+            self.results.append(result)
+
+    def battles_per_second(self):
+        if self.elapsed <= 0:
+            return float("inf")
+        return self.battles / self.elapsed
+
+    def count(self, winner):
+        """ Counts the battles won by player 1 or 2, or drawn if winner is
+        None. Battles that raised an error are not counted as draws.
+        """
+        return self.tallies[winner]
+
+    def errors(self):
+        return self.tallies["errors"]
+
+    def __str__(self):
+        return ("{} battles in {:.2f}s ({:.1f} battles/sec)\n"
+        "Player 1 wins: {}  Player 2 wins: {}  Draws: {}  Errors: {}").format(
+            self.battles, self.elapsed, self.battles_per_second(),
+            self.count(1), self.count(2), self.count(None), self.errors())
+
+def seat_player(spares, seat, ai, name, dexno, events, rng):
+    """ Makes the player for one seat of a battle.
+
+    Parameters:
+        spares (dict): players from earlier battles by seat, to reset and
+        reuse instead of building new ones; None to always build new ones.
+        New players of a kind in RECYCLABLE are added to it.
+        seat (int): 1 or 2
+        ai (str): the kind of computer player, a key of AI_PLAYERS
+        name, dexno, events, rng: as for Player
+
+    Returns:
+        The player
+    """
+    if spares is None or ai not in RECYCLABLE:
+        return AI_PLAYERS[ai](name, dexno, events, rng)
+    player = spares.get(seat)
+    if player is None or type(player) is not AI_PLAYERS[ai]:
+        player = AI_PLAYERS[ai](name, dexno, events, rng)
+        spares[seat] = player
+    else:
+        player.reset(dexno, events, rng)
+    return player
+
+def play(seed, dexno1=None, dexno2=None, max_turns=MAX_TURNS,
+events=Events.NULL, backend="python", rng=None, ai1="random", ai2="random",
+metrics=None, count_moves=False, aggregator=None, spares=None,
+movesets=None, spreads=None):
+    """ Plays one computer vs. computer battle.
+
+    Parameters:
+        seed (int): the seed for the battle's random numbers
+        dexno1 (int): row of player 1's Pokemon; random if None
+        dexno2 (int): row of player 2's Pokemon; random if None
+        max_turns (int): the number of turns after which it is a draw
+        events (sink): where the battle's events go; discarded by default
+        backend (str): the random number backend, one of Rng.BACKENDS
+        rng (random number stream): a stream of that backend to reseed and
+        reuse instead of creating a new one
+        ai1 (str): player 1's kind of computer player, a key of AI_PLAYERS
+        ai2 (str): player 2's kind of computer player
+        metrics (BattleMetrics): attached to the battle to time and count
+        it; None (the default) leaves the battle uninstrumented
+        count_moves (bool): whether to count the moves each Pokemon uses,
+        which costs an extra call per event; the result's move_uses are
+        empty if not
+        aggregator (BattleAggregator): taps the battle's events and counts
+        its result
+        spares (dict): players to recycle, as for seat_player; the battle
+        plays out exactly as it would with new ones
+        movesets (tuple): the moves to give player 1's and player 2's
+        Pokemon instead of their species' moves, as a pair of Move tuples;
+        None, or a None entry, keeps the species' moves
+        spreads (tuple): the (EVs, IVs, nature id) spreads to give player
+        1's and player 2's Pokemon instead of their random ones, as for
+        Pokemon.setSpread; None, or a None entry, keeps the random spread
+
+    Returns:
+        A BattleResult
+    """
+    if rng is None:
+        rng = make_rng(seed, backend)
+    else:
+        rng.seed(seed)
+    usage = tap = None
+    if count_moves:
+        usage = events = Events.MoveUsageSink(events)
+    if aggregator is not None:
+        tap = events = aggregator.tap(events)
+    p1 = p2 = None
+    try:
+        p1 = seat_player(spares, 1, ai1, "Brock", dexno1, events, rng)
+        p2 = seat_player(spares, 2, ai2, "Misty", dexno2, events, rng)
+        if movesets is not None:
+            for player, moves in zip((p1, p2), movesets):
+                if moves is not None:
+                    player.getPokemon().moves = moves
+        if spreads is not None:
+            for player, spread in zip((p1, p2), spreads):
+                if spread is not None:
+                    player.getPokemon().setSpread(*spread)
+        battle = Battle(p1, p2, max_turns, events, rng)
+        if metrics is not None:
+            metrics.attach(battle)
+        winner = battle.start()
+        error = None
+    except Exception as e:
+        if metrics is not None:
+            metrics.counters["errors"] += 1
+        winner = None
+        error = "{}: {}".format(type(e).__name__, e)
+    players = [player for player in (p1, p2) if player is not None]
+    if metrics is not None:
+        metrics.detach(players)
+    pkmn = [player.getPokemon() for player in players]
+    result = BattleResult(
+        seed,
+        None if winner is None or error else (1 if winner is p1 else 2),
+        battle.turns if error is None else 0,
+        tuple(p.getName() for p in pkmn),
+        tuple(p.dexno for p in pkmn),
+        tuple(p.getCurrentHP() for p in pkmn),
+        tuple(p.getMaxHP() for p in pkmn),
+        error,
+        tuple(p.nature_id for p in pkmn),
+        tuple([p.getMaxHP(), p.attack, p.defense, p.spatk, p.spdef, p.speed]
+        for p in pkmn),
+        tuple([move.id for move in p.moves] for p in pkmn),
+        tuple(usage.counts(p) for p in pkmn) if usage is not None else ()
+    )
+    if aggregator is not None:
+        aggregator.add(result, tap)
+    return result
+
+def run_batch(n, seed=None, dexno1=None, dexno2=None, max_turns=MAX_TURNS,
+silent=True, backend="python", ai1="random", ai2="random", metrics=None,
+writer=None, keep_results=True, aggregator=None, recycle=True):
+    """ Runs n computer vs. computer battles in this process.
+
+    Parameters:
+        n (int): the number of battles
+        seed (int): master seed; every battle's seed is drawn from it, so the
+        same master seed always produces the same batch
+        dexno1 (int): row of player 1's Pokemon; random per battle if None
+        dexno2 (int): row of player 2's Pokemon; random per battle if None
+        max_turns (int): the number of turns after which a battle is a draw
+        silent (bool): whether to discard the battles' events instead of
+        printing them
+        backend (str): the random number backend, one of Rng.BACKENDS
+        ai1 (str): player 1's kind of computer player, a key of AI_PLAYERS
+        ai2 (str): player 2's kind of computer player
+        metrics (BattleMetrics): totals the timings and counters of every
+        battle; None (the default) runs them uninstrumented
+        writer (ResultWriter): every result, with its move usage counted,
+        is written to it as soon as its battle ends
+        keep_results (bool): whether the report keeps every result; a batch
+        that only writes them uses the same memory however long it runs
+        aggregator (BattleAggregator): keeps online statistics of every
+        battle
+        recycle (bool): whether to reuse players between battles, as for
+        seat_player; the results are the same either way
+
+    Returns:
+        A BatchReport
+    """
+    seeder = random.Random(seed)
+    report = BatchReport([], 0.0)
+    events = Events.NULL if silent else Events.CONSOLE
+    rng = make_rng(None, backend)
+    spares = {} if recycle else None
+    start = time.perf_counter()
+    for _ in range(n):
+        result = play(seeder.getrandbits(32), dexno1, dexno2, max_turns, events,
+        backend, rng, ai1, ai2, metrics, writer is not None, aggregator, spares)
+        if writer is not None:
+            writer.write(result)
+        report.add(result, keep_results)
+    report.elapsed = time.perf_counter() - start
+    return report
+
+def check_metrics(n, seed=None, dexno1=None, dexno2=None, max_turns=MAX_TURNS):
+    """ Plays a batch with metrics twice, reusing players and building new
+    ones, and compares them. A reused player that kept the instrumentation
+    of an earlier battle would count its calls again in every later one.
+
+    Returns:
+        A list of (counter or "phase:" and a phase, with reused players,
+        with new players) for every count; they should all be equal. Phases
+        are prefixed because some share a counter's name.
+    """
+    counts = []
+    for recycle in (True, False):
+        metrics = BattleMetrics()
+        run_batch(n, seed, dexno1, dexno2, max_turns, metrics=metrics,
+        keep_results=False, recycle=recycle)
+        calls = dict(metrics.counters)
+        calls.update(("phase:" + phase, phase_calls)
+        for phase, (phase_calls, _) in metrics.timings.items())
+        counts.append(calls)
+    names = sorted(set(counts[0]) | set(counts[1]))
+    return [(name, counts[0].get(name, 0), counts[1].get(name, 0))
+    for name in names]
+
+def parse_args(arglist):
+    """ Parse command line arguments. """
+    parser = ArgumentParser()
+    parser.add_argument("battles", type=int, help="number of battles to run")
+    parser.add_argument("--seed", type=int, default=None,
+    help="master seed for reproducible batches")
+    parser.add_argument("--p1", type=int, default=None,
+    help="row of player 1's Pokemon (random if omitted)")
+    parser.add_argument("--p2", type=int, default=None,
+    help="row of player 2's Pokemon (random if omitted)")
+    parser.add_argument("--max-turns", type=int, default=MAX_TURNS,
+    help="turns after which a battle is a draw")
+    parser.add_argument("--rng", choices=BACKENDS, default="python",
+    help="random number backend; numpy is faster")
+    parser.add_argument("--ai1", choices=sorted(AI_PLAYERS), default="random",
+    help="player 1's computer player")
+    parser.add_argument("--ai2", choices=sorted(AI_PLAYERS), default="random",
+    help="player 2's computer player")
+    parser.add_argument("--json", default=None,
+    help="write every battle's result to this file")
+    parser.add_argument("--metrics-json", default=None,
+    help="instrument the battles and write the totals to this JSON file")
+    parser.add_argument("--metrics-prom", default=None,
+    help="instrument the battles and write the totals to this Prometheus "
+    "text file")
+    parser.add_argument("--results", default=None,
+    help="stream every battle's result to this columnar file (ResultStore)")
+    parser.add_argument("--append", action="store_true",
+    help="add to the --results file instead of replacing it")
+    parser.add_argument("--row-group-size", type=int, default=ROW_GROUP_SIZE,
+    help="rows per row group of the --results file")
+    parser.add_argument("--stats-json", default=None,
+    help="keep online win rate, move and turn statistics and write them to "
+    "this JSON file")
+    parser.add_argument("--engine", choices=ENGINES, default="objects",
+    help="objects plays each battle with Battle; lockstep plays random vs. "
+    "random battles together as arrays (VectorBattle), much faster")
+    parser.add_argument("--cross-validate", action="store_true",
+    help="play the battles in both engines and compare the results")
+    parser.add_argument("--check-metrics", action="store_true",
+    help="play the battles with metrics, reusing players and not, and "
+    "compare the counts")
+    args = parser.parse_args(arglist)
+    if args.engine == "lockstep" and (args.ai1 != "random" or
+    args.ai2 != "random" or args.json or args.metrics_json or
+    args.metrics_prom or args.results or args.stats_json):
+        parser.error("the lockstep engine only plays random computer players "
+        "and keeps no per-battle results or metrics")
+    return args
+
+def main(arglist):
+    """ Run a batch of battles and report the results """
+    args = parse_args(arglist)
+    if args.cross_validate:
+        print("{:<14}{:>10}{:>10}{:>8}".format("statistic", "objects",
+        "lockstep", "z"))
+        for row in cross_validate(args.battles, args.seed, args.p1, args.p2,
+        args.max_turns):
+            print("{:<14}{:>10.4f}{:>10.4f}{:>8.2f}".format(*row))
+        return
+    if args.check_metrics:
+        rows = check_metrics(args.battles, args.seed, args.p1, args.p2,
+        args.max_turns)
+        print("{:<24}{:>10}{:>10}".format("count", "reused", "new"))
+        for row in rows:
+            print("{:<24}{:>10}{:>10}".format(*row))
+        if any(reused != new for _, reused, new in rows):
+            sys.exit("Reusing players changed the metrics")
+        return
+    if args.engine == "lockstep":
+        print(run_vector_batch(args.battles, args.seed, args.p1, args.p2,
+        args.max_turns))
+        return
+    metrics = None
+    if args.metrics_json or args.metrics_prom:
+        metrics = BattleMetrics()
+    aggregator = None
+    if args.stats_json:
+        aggregator = BattleAggregator()
+    writer = None
+    if args.results:
+        writer = ResultWriter(args.results, args.row_group_size, args.append)
+    try:
+        report = run_batch(args.battles, args.seed, args.p1, args.p2,
+        args.max_turns, backend=args.rng, ai1=args.ai1, ai2=args.ai2,
+        metrics=metrics, writer=writer, keep_results=args.json is not None,
+        aggregator=aggregator)
+    finally:
+        if writer is not None:
+            writer.close()
+    print(report)
+    if aggregator is not None:
+        aggregator.write_json(args.stats_json)
+    if metrics is not None:
+        print(metrics)
+        if args.metrics_json:
+            metrics.write_json(args.metrics_json)
+        if args.metrics_prom:
+            metrics.write_prometheus(args.metrics_prom)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([result.as_dict() for result in report.results], f)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,11 +1,15 @@
-import sys, random, math
+import sys, random, math, json
 from argparse import ArgumentParser
 from Players import HumanPlayer, ComputerPlayer
-from Constants import Statuses
+from Constants import Statuses, DamageFormula
+from Rng import make_rng, BACKENDS
+import Events
 
 # THIS IS WHERE MAIN IS LOCATED. EXAMPLE TEST SCRIPTS ARE BELOW
 # python battle.py computer Player
 # python battle.py Player computer
+# python battle.py Player computer --seed 7 --record battle.json
+# python battle.py --replay battle.json
 
 """ This is a Pokemon battle simulator; it is unfinished.
 
@@ -27,11 +31,32 @@ class Battle:
     Attributes:
         player1 (Player) = one of the players
         player2 (Player) = the other player
+        max_turns (int) = the number of turns after which the battle is
+        called a draw; None (the default) lets it run until a Pokemon faints
+        turns (int) = the number of turns that have been started so far
+        events (sink) = where everything that happens in this battle is
+        reported; both players and their Pokemon report there too
+        rng (random number stream) = where this battle's random numbers come
+        from; both players and their Pokemon draw from it too. Defaults to
+        player 1's.
+        over (bool) = whether the battle has ended
+        winner (Player) = the winning player once it is over; None for a
+        draw or a battle that is still going
     """
 
-    def __init__(self, p1, p2):
+    def __init__(self, p1, p2, max_turns=None, events=None, rng=None):
         self.player1 = p1
         self.player2 = p2
+        self.max_turns = max_turns
+        self.turns = 0
+        self.over = False
+        self.winner = None
+        self.events = events if events is not None else Events.CONSOLE
+        self.rng = rng if rng is not None else p1.rng
+        p1.setEvents(self.events)
+        p2.setEvents(self.events)
+        p1.setRng(self.rng)
+        p2.setRng(self.rng)
 
     def is_game_over(self, defender_HP):
         """ Checks if the game is over yet.
@@ -60,78 +85,80 @@ class Battle:
             FALSE otherwise
         
         Side Effects:
-            May print something if the Pokemon is immobile this turn or its
+            May report something if the Pokemon is immobile this turn or its
             status changes.
         """
         # Make functions out of repeated code (eventually)
         # PUT THIS IN PLAYER; ALLOW PKMN TO TRY AND USE MOVE
         status = pokemon.getStatus()
-        name = pokemon.getName()
+        events = self.events
         if (pokemon.is_recharging() and pokemon.getStatus() != Statuses.SLP
         and pokemon.getStatus != Statuses.FRZ):
-            print(name + " is recharging!")
+            events.emit(Events.Recharging, pokemon)
             pokemon.setRecharging(False)
             return False
         if status == Statuses.HEALTHY:
             pass
         elif status == Statuses.PRZ:
-            print()
-            PRZ_roll = random.randint(0,3)
+            events.emit(Events.StatusCheck, pokemon, status)
+            PRZ_roll = self.rng.randint(0,3)
             if PRZ_roll == 0:
-                print(name + " is fully paralyzed!")
+                events.emit(Events.Immobilized, pokemon, status)
                 return False
         elif status == Statuses.SLP:
-            print()
+            events.emit(Events.StatusCheck, pokemon, status)
             sleeping_turns = pokemon.getInflictedTurns()
             if sleeping_turns == 0:
-                print(name + " is fast asleep!")
+                events.emit(Events.Immobilized, pokemon, status)
                 pokemon.incrementInflictedTurns()
                 return False
             elif sleeping_turns >= 1 and sleeping_turns < 3:
-                SLP_roll = random.randint(0,2)
+                SLP_roll = self.rng.randint(0,2)
                 if SLP_roll == 0:
-                    print(name + " woke up!")
+                    events.emit(Events.StatusCured, pokemon, status)
                     pokemon.setStatus(Statuses.HEALTHY)
                     pokemon.resetInflictedTurns()
                 else:
-                    print(name + " is fast asleep!")
+                    events.emit(Events.Immobilized, pokemon, status)
                     pokemon.incrementInflictedTurns()
                     return False
             else: # sleeping_turns == 3
-                print(name + " woke up!")
+                events.emit(Events.StatusCured, pokemon, status)
                 pokemon.setStatus(Statuses.HEALTHY)
                 pokemon.resetInflictedTurns()
         elif status == Statuses.FRZ:
-            print()
-            FRZ_roll = random.randint(0,4)
+            events.emit(Events.StatusCheck, pokemon, status)
+            FRZ_roll = self.rng.randint(0,4)
             if FRZ_roll == 0:
-                print(name + " thawed out!")
+                events.emit(Events.StatusCured, pokemon, status)
                 pokemon.setStatus(Statuses.HEALTHY)
             else:
-                print(name + " is frozen solid!")
+                events.emit(Events.Immobilized, pokemon, status)
                 return False
         elif status in Statuses.CHIP_DAMAGE:
             return True
         if pokemon.is_confused():
-            print()
+            events.emit(Events.StatusCheck, pokemon, Statuses.CON)
             confused_turns = pokemon.getConfusedTurns()
-            print(name + " is confused!")
+            events.emit(Events.ConfusionCheck, pokemon)
             if confused_turns >= 2:
-                snap_roll = random.randint(confused_turns, 6)
+                snap_roll = self.rng.randint(confused_turns, 6)
                 if snap_roll == confused_turns:
-                    print(name + " snapped out of confusion!")
+                    events.emit(Events.StatusCured, pokemon, Statuses.CON)
                     pokemon.setStatus(Statuses.HEALTHY)
                     pokemon.resetConfusedTurns()
                     return True
             else:
-                print(name + " is confused!")
-                confusion_roll = random.randint(0,1)
+                events.emit(Events.ConfusionCheck, pokemon)
+                confusion_roll = self.rng.randint(0,1)
                 if confusion_roll == 0:
                     # hits self
                     ad_ratio = pokemon.getAttack() / pokemon.getDefense()
-                    damage = ((42 * 40 * ad_ratio) / 50) + 2
+                    damage = ((DamageFormula.LEVEL_FACTOR
+                    * DamageFormula.CONFUSION_POWER * ad_ratio)
+                    / DamageFormula.DIVISOR) + DamageFormula.BASE
                     pokemon.setCurrentHP(damage)
-                    print(name + " hit itself in confusion!")
+                    events.emit(Events.ConfusionSelfHit, pokemon, damage)
                     pokemon.incrementConfusedTurns()
                     return False
                 else: # confusion_roll == 1
@@ -140,7 +167,6 @@ class Battle:
         return True
 
     def chip_damage(self, status, pokemon):
-        name = pokemon.getName()
         if status == Statuses.BRN or status == Statuses.PSN:
             damage = math.floor(pokemon.getMaxHP() * 0.125)
             pokemon.setCurrentHP(damage)
@@ -151,10 +177,7 @@ class Battle:
             damage = pokemon.getMaxHP() * tox_multiplier
             pokemon.setCurrentHP(damage)
             pokemon.incrementInflictedTurns()
-        if status == Statuses.BRN:
-            print(name + " is hurt by its burn!")
-        else: # status == TOX or PSN
-            print(name + " is hurt by poison!")
+        self.events.emit(Events.ChipDamage, pokemon, status, damage)
         
     def criticalHit(self, randNo):
         """ Determines whether or not a critical hit will occur. Called at the
@@ -172,106 +195,240 @@ class Battle:
     def start(self):
         """ This is the function that handles the battle.
 
+        Returns:
+            The winning Player, or None if the battle reached max_turns
+
         Side Effects:
-            - Frequently prints important information for battling purposes
+            - Frequently reports important information for battling purposes
+        """
+        self.begin()
+        while not self.play_turn():
+            pass
+        return self.winner
+
+    def begin(self):
+        "Announces the battle; call once before the first play_turn"
+        self.events.emit(Events.BattleStarted, self.player1, self.player2)
+
+    def play_turn(self):
+        """ Plays one turn, or calls the battle a draw if it has reached
+        max_turns. start plays every turn; a caller that needs to do
+        something between turns (such as wait for a human's move) can call
+        begin and then this until it returns True.
+
+        Returns:
+            True if the battle is over, in which case winner is set
         """
         p1_pkmn = self.player1.getPokemon()
         p2_pkmn = self.player2.getPokemon()
         battle_over = False
-        print("{} has {}. {} has {}.".format(
-            self.player1.getName(),
-            p1_pkmn.getName(),
-            self.player2.getName(),
-            p2_pkmn.getName()
-        ))
-        while True:
-            p1_speed = p1_pkmn.getSpeed()
-            p2_speed = p2_pkmn.getSpeed()
-            print()
-            if p1_speed >= p2_speed:
-                # p1 turn (faster)
-                if self.is_mobile(p1_pkmn):
-                    print(self.player1)
-                    print()
-                    self.player1.take_turn(p2_pkmn)
-                    p2_HP = p2_pkmn.getCurrentHP()
-                    battle_over = self.is_game_over(p2_HP)
-                    if battle_over:
-                        break
-                # p2 turn (slower)
-                if self.is_mobile(p2_pkmn):
-                    if p2_pkmn.flinched():
-                        print(p2_pkmn.getName() + " flinched!")
-                        p2_pkmn.setFlinch(False)
-                    else: # p2_pkmn did not flinch
-                        print(self.player2)
-                        print()
-                        self.player2.take_turn(p1_pkmn)
-                        p1_HP = p1_pkmn.getCurrentHP()
-                        battle_over = self.is_game_over(p1_HP)
+        events = self.events
+        if self.max_turns is not None and self.turns >= self.max_turns:
+            events.emit(Events.Draw, self.turns)
+            self.over = True
+            return True
+        self.turns += 1
+        p1_speed = p1_pkmn.getSpeed()
+        p2_speed = p2_pkmn.getSpeed()
+        events.emit(Events.TurnStarted, self.turns)
+        if p1_speed >= p2_speed:
+            # p1 turn (faster)
+            if self.is_mobile(p1_pkmn):
+                events.emit(Events.ActionRequested, self.player1)
+                self.player1.take_turn(p2_pkmn)
+                p2_HP = p2_pkmn.getCurrentHP()
+                battle_over = self.is_game_over(p2_HP)
                 if battle_over:
-                    break
-            else:
-                # p2 turn (faster)
-                if self.is_mobile(p2_pkmn):
-                    print(self.player2)
-                    print()
+                    return self.finish()
+            # p2 turn (slower)
+            if self.is_mobile(p2_pkmn):
+                if p2_pkmn.flinched():
+                    events.emit(Events.Flinched, p2_pkmn)
+                    p2_pkmn.setFlinch(False)
+                else: # p2_pkmn did not flinch
+                    events.emit(Events.ActionRequested, self.player2)
                     self.player2.take_turn(p1_pkmn)
                     p1_HP = p1_pkmn.getCurrentHP()
                     battle_over = self.is_game_over(p1_HP)
-                if battle_over:
-                    break
-                # p1 turn (slower)
-                if self.is_mobile(p1_pkmn):
-                    if p1_pkmn.flinched():
-                        print(p1_pkmn.getName() + " flinched!")
-                        p1_pkmn.setFlinch(False)
-                    else: # p1_pkmn did not flinch
-                        print(self.player1)
-                        print()
-                        self.player1.take_turn(p2_pkmn)
-                        p2_HP = p2_pkmn.getCurrentHP()
-                        battle_over = self.is_game_over(p2_HP)
-                if battle_over:
-                    break
-                # psn, tox, or burn check (and decrement)
-                if p1_pkmn.getStatus() in Statuses.CHIP_DAMAGE:
-                    self.chip_damage(p1_pkmn.getStatus(), p1_pkmn)
-                    p1_HP = p1_pkmn.getCurrentHP()
-                    battle_over = self.is_game_over(p1_HP)
-                if battle_over:
-                    break
-                if p2_pkmn.getStatus() in Statuses.CHIP_DAMAGE:
-                    self.chip_damage(p2_pkmn.getStatus(), p2_pkmn)
+            if battle_over:
+                return self.finish()
+        else:
+            # p2 turn (faster)
+            if self.is_mobile(p2_pkmn):
+                events.emit(Events.ActionRequested, self.player2)
+                self.player2.take_turn(p1_pkmn)
+                p1_HP = p1_pkmn.getCurrentHP()
+                battle_over = self.is_game_over(p1_HP)
+            if battle_over:
+                return self.finish()
+            # p1 turn (slower)
+            if self.is_mobile(p1_pkmn):
+                if p1_pkmn.flinched():
+                    events.emit(Events.Flinched, p1_pkmn)
+                    p1_pkmn.setFlinch(False)
+                else: # p1_pkmn did not flinch
+                    events.emit(Events.ActionRequested, self.player1)
+                    self.player1.take_turn(p2_pkmn)
                     p2_HP = p2_pkmn.getCurrentHP()
                     battle_over = self.is_game_over(p2_HP)
-                if battle_over:
-                    break
-        print()
+            if battle_over:
+                return self.finish()
+            # psn, tox, or burn check (and decrement)
+            if p1_pkmn.getStatus() in Statuses.CHIP_DAMAGE:
+                self.chip_damage(p1_pkmn.getStatus(), p1_pkmn)
+                p1_HP = p1_pkmn.getCurrentHP()
+                battle_over = self.is_game_over(p1_HP)
+            if battle_over:
+                return self.finish()
+            if p2_pkmn.getStatus() in Statuses.CHIP_DAMAGE:
+                self.chip_damage(p2_pkmn.getStatus(), p2_pkmn)
+                p2_HP = p2_pkmn.getCurrentHP()
+                battle_over = self.is_game_over(p2_HP)
+            if battle_over:
+                return self.finish()
+        return False
+
+    def finish(self):
+        "Reports the fainted Pokemon and the loser, and sets the winner"
+        p1_pkmn = self.player1.getPokemon()
+        p2_pkmn = self.player2.getPokemon()
+        events = self.events
         if p1_pkmn.getCurrentHP() == 0:
-            print(p1_pkmn.getName() + " fainted.")
-            print(self.player1.getName() + " lost!")
+            events.emit(Events.Fainted, p1_pkmn)
+            events.emit(Events.PlayerLost, self.player1, self.turns)
+            self.winner = self.player2
         else:
-            print(p2_pkmn.getName() + " fainted.")
-            print(self.player2.getName() + " lost!")
+            events.emit(Events.Fainted, p2_pkmn)
+            events.emit(Events.PlayerLost, self.player2, self.turns)
+            self.winner = self.player1
+        self.over = True
+        return True
+
+class BattleRecord:
+    """ Everything needed to replay a battle exactly: the seed its random
+    numbers were drawn from, how its players were set up and every line the
+    human players typed, in order.
+
+    Attributes:
+        seed (int) = the seed of the battle's random number stream
+        player1_name (str) = player 1's name, or "computer"
+        player2_name (str) = player 2's name, or "computer"
+        max_turns (int) = the battle's turn limit; None for no limit
+        backend (str) = the random number backend, one of Rng.BACKENDS
+        inputs (list of str) = the lines typed by human players
+    """
+    def __init__(self, seed, player1_name, player2_name, max_turns=None,
+    backend="python", inputs=None):
+        self.seed = seed
+        self.player1_name = player1_name
+        self.player2_name = player2_name
+        self.max_turns = max_turns
+        self.backend = backend
+        self.inputs = inputs if inputs is not None else []
+
+    def as_dict(self):
+        return {
+            "seed": self.seed,
+            "player1_name": self.player1_name,
+            "player2_name": self.player2_name,
+            "max_turns": self.max_turns,
+            "backend": self.backend,
+            "inputs": list(self.inputs)
+        }
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(**json.load(f))
+
+    def recorder(self, read_input=input):
+        """ Returns a function that reads a line with read_input and adds it
+        to this record """
+        def read(prompt):
+            line = read_input(prompt)
+            self.inputs.append(line)
+            return line
+        return read
+
+    def replayer(self):
+        """ Returns a function that hands out this record's inputs in order.
+
+        Raises:
+            EOFError from the returned function once every input is used
+        """
+        remaining = iter(self.inputs)
+        def read(prompt):
+            try:
+                return next(remaining)
+            except StopIteration:
+                raise EOFError("The recorded battle has no more inputs")
+        return read
+
+    def build(self, read_input=None, events=None):
+        """ Sets up the recorded battle with a fresh random number stream.
+
+        Parameters:
+            read_input (callable): where human players read their moves
+            from; input by default
+            events (sink): where the battle reports to; defaults to the
+            console
+
+        Returns:
+            A Battle that hasn't been started yet
+        """
+        rng = make_rng(self.seed, self.backend)
+        p1 = (ComputerPlayer("Brock", events=events, rng=rng)
+              if self.player1_name == "computer"
+              else HumanPlayer(self.player1_name, events=events, rng=rng,
+              read_input=read_input))
+        p2 = (ComputerPlayer("Misty", events=events, rng=rng)
+              if self.player2_name == "computer"
+              else HumanPlayer(self.player2_name, events=events, rng=rng,
+              read_input=read_input))
+        return Battle(p1, p2, self.max_turns, events, rng)
 
 def parse_args(arglist):
     """ Parse command line arguments. """
     parser = ArgumentParser()
-    parser.add_argument("player1_name", help="Player 1 name (or 'computer')")
-    parser.add_argument("player2_name", help="Player 2 name (or 'computer')")
+    parser.add_argument("player1_name", nargs="?",
+    help="Player 1 name (or 'computer')")
+    parser.add_argument("player2_name", nargs="?",
+    help="Player 2 name (or 'computer')")
+    parser.add_argument("--seed", type=int, default=None,
+    help="seed for the battle's random numbers (random if omitted)")
+    parser.add_argument("--rng", choices=BACKENDS, default="python",
+    help="random number backend")
+    parser.add_argument("--record", default=None,
+    help="save the seed and every move typed to this file")
+    parser.add_argument("--replay", default=None,
+    help="replay a battle saved with --record")
     args = parser.parse_args(arglist)
+    if args.replay is None and (args.player1_name is None
+    or args.player2_name is None):
+        parser.error("two player names are needed unless replaying")
     return args
 
 def main(arglist):
     """ Create two Player objects and start a Pokemon battle"""
     args = parse_args(arglist)
-    p1 = (ComputerPlayer("Brock") if args.player1_name == "computer"
-          else HumanPlayer(args.player1_name))
-    p2 = (ComputerPlayer("Misty") if args.player2_name == "computer"
-          else HumanPlayer(args.player2_name))
-    battle = Battle(p1, p2)
-    battle.start()
+    if args.replay is not None:
+        record = BattleRecord.load(args.replay)
+        record.build(record.replayer()).start()
+        return
+    seed = args.seed if args.seed is not None else random.getrandbits(32)
+    record = BattleRecord(seed, args.player1_name, args.player2_name,
+    backend=args.rng)
+    battle = record.build(record.recorder())
+    try:
+        battle.start()
+    finally:
+        # saved even if the battle crashes, so the crash can be replayed
+        if args.record is not None:
+            record.save(args.record)
 
 if __name__ == "__main__":
     main(sys.argv[1:])
\ No newline at end of file
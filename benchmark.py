@@ -0,0 +1,556 @@
+import sys, os, gc, math, time, random, tempfile, json, platform, statistics
+from argparse import ArgumentParser
+from Constants import Data, DataSet, Stats, Statuses, Type
+from PokemonGenerator import Pokemon
+from Moves import Move, MoveTable
+from Rng import BACKENDS
+from batch import run_batch
+from battle import Battle
+from Players import ComputerPlayer
+from MonteCarlo import MonteCarloSearch
+from BulkPokemon import PokemonSpreads
+from VectorBattle import run_vector_batch
+import Events
+
+# EXAMPLE: run the suite and save it as the baseline
+# python benchmark.py --save baseline.json
+# EXAMPLE: after a change, flag anything more than 10% slower
+# python benchmark.py --baseline baseline.json --threshold 0.10
+# EXAMPLE: the before/after comparisons of earlier optimizations
+# python benchmark.py --comparisons --pokemon 2000
+
+""" Benchmarks for the simulator's hot paths.
+
+    The suite times a fixed set of seeded scenarios, from single operations
+    (Move lookups, damage calculation, stat changes, status checks) up to
+    whole computer vs. computer battles. Every scenario does the same work
+    on every run, and is timed over several repeats so each result comes
+    with its spread. Results can be saved as a JSON baseline, and a later run
+    compared against it flags every scenario that got slower by more than a
+    threshold.
+"""
+
+# the format of saved baselines
+BASELINE_VERSION = 1
+
+def legacy_moveset(self, moveset):
+    """ Pokemon.setMoves as it worked before the MoveTable: one boolean mask
+    scan of the movelist per move. Only used as the "before" measurement.
+    """
+    the_moves = []
+    for move_name in moveset:
+        row = Data.movelist.loc[Data.movelist['Name'] == move_name].values[0]
+        the_moves.append((move_name, row[2], row[3], row[6], row[7]))
+    return the_moves
+
+# the Pokemon attributes holding each stat, in Stats.stat_list order
+STAT_ATTRIBUTES = ("maxHP", "attack", "defense", "spatk", "spdef", "speed")
+
+def legacy_pokemon(dexno, events):
+    """ Pokemon() as it worked before species templates and the MoveTable:
+    the species' DataFrame row, one setStats call per stat and
+    legacy_moveset. Only used as the "before" measurement.
+    """
+    pokemon = object.__new__(Pokemon)
+    pokemon.events = events
+    pokemon.rng = random
+    info = Data.pokedex.loc[dexno + 1].values
+    pokemon.dexno = dexno
+    pokemon.name = info[1]
+    events.emit(Events.PokemonCreated, pokemon)
+    pokemon.types = (info[2], info[3])
+    pokemon.type_ids = (Type.get_id(info[2]), Type.get_id(info[3]))
+    pokemon.EVs = tuple(pokemon.setEVs())
+    pokemon.IVs = tuple(pokemon.setIVs())
+    pokemon.nature_id = random.randint(0,24)
+    for index, (name, attribute) in enumerate(zip(Stats.stat_list,
+    STAT_ATTRIBUTES)):
+        setattr(pokemon, attribute, pokemon.setStats(int(info[4 + index]),
+        name))
+    pokemon.resetBattleState()
+    pokemon.moves = tuple(legacy_moveset(pokemon, info[10:14]))
+    return pokemon
+
+def construction_rate(n, build, seed=0):
+    """ Builds n random Pokemon with build(dexno) and returns the number
+    built per second
+    """
+    rng = random.Random(seed)
+    dexnos = [rng.randint(0, 97) for _ in range(n)]
+    random.seed(seed)
+    start = time.perf_counter()
+    for dexno in dexnos:
+        try:
+            build(dexno)
+        except (IndexError, KeyError):
+            pass # misspelled moves in the pokedex
+    elapsed = time.perf_counter() - start
+    return n / elapsed
+
+def bench_construction(n, seed=0):
+    """ Measures Pokemon construction from the species' DataFrame row with
+    the legacy moveset lookup, from species templates, and by resetting
+    one recycled Pokemon.
+
+    Returns:
+        (before, templates, recycled) in Pokemon per second
+    """
+    Data.pokedex # build the DataFrame outside the timing
+    before = construction_rate(n, lambda dexno: legacy_pokemon(dexno,
+    Events.NULL), seed)
+    templates = construction_rate(n, lambda dexno: Pokemon(dexno, Events.NULL),
+    seed)
+    spare = Pokemon(valid_dexnos(seed, 1)[0], Events.NULL)
+    recycled = construction_rate(n, spare.reset, seed)
+    return before, templates, recycled
+
+def bench_data_load(repeats=20):
+    """ Measures loading the csv data from scratch and from the snapshot.
+
+    Returns:
+        (csv, snapshot) in seconds per load
+    """
+    snapshot = os.path.join(tempfile.mkdtemp(), "data_snapshot.pickle")
+    data = DataSet(snapshot_path=snapshot)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        data.tables = None
+        data.tables = data.compile()
+    from_csv = (time.perf_counter() - start) / repeats
+    data.reload()
+    data.load() # writes the snapshot
+    start = time.perf_counter()
+    for _ in range(repeats):
+        data.reload()
+        data.load()
+    from_snapshot = (time.perf_counter() - start) / repeats
+    os.remove(snapshot)
+    return from_csv, from_snapshot
+
+def bench_rng_backends(n, seed=0):
+    """ Measures batch throughput with each random number backend.
+
+    Returns:
+        A dict from backend name to battles per second
+    """
+    return {backend: run_batch(n, seed, backend=backend).battles_per_second()
+    for backend in BACKENDS}
+
+def bench_mcts(decisions, rollouts, workers=1, seed=0):
+    """ Measures Monte Carlo rollouts from the opening position of random
+    matchups.
+
+    Returns:
+        The MonteCarloSearch's metrics
+    """
+    rng = random.Random(seed)
+    search = MonteCarloSearch(rollouts, workers=workers)
+    try:
+        for _ in range(decisions):
+            me = ComputerPlayer("me", None, Events.NULL, rng).getPokemon()
+            opp = ComputerPlayer("opponent", None, Events.NULL, rng).getPokemon()
+            search.best_move(me, opp, rng.getrandbits(32))
+    finally:
+        search.close()
+    return search.metrics()
+
+class Scenario:
+    """ One benchmark of the suite.
+
+    Attributes:
+        name (str) = the scenario's name in reports and baselines
+        description (str) = what one operation is
+        prepare (callable) = prepare(seed) builds the input of one timed run;
+        it isn't timed
+        run (callable) = run(state) does the timed work on what prepare built
+        and returns the number of operations it did
+    """
+    def __init__(self, name, description, prepare, run):
+        self.name = name
+        self.description = description
+        self.prepare = prepare
+        self.run = run
+
+    def measure(self, seed=0, repeats=5):
+        """ Times the scenario, after one untimed warm-up run. The garbage
+        collector is off while a run is timed, as in timeit.
+
+        Returns:
+            A list of operations per second, one per repeat
+        """
+        self.run(self.prepare(seed))
+        rates = []
+        for _ in range(repeats):
+            state = self.prepare(seed)
+            gc.collect()
+            gc.disable()
+            try:
+                start = time.perf_counter()
+                ops = self.run(state)
+                elapsed = time.perf_counter() - start
+            finally:
+                gc.enable()
+            rates.append(ops / elapsed)
+        return rates
+
+def valid_dexnos(seed, n):
+    """ n random rows whose Pokemon can be built (some have misspelled
+    moves in the pokedex)
+    """
+    rng = random.Random(seed)
+    dexnos = []
+    while len(dexnos) < n:
+        dexno = rng.randint(0, 97)
+        try:
+            Pokemon(dexno, Events.NULL, rng)
+        except (IndexError, KeyError):
+            continue
+        dexnos.append(dexno)
+    return dexnos
+
+def random_pokemon(rng, n):
+    "n random Pokemon that report nowhere, drawing from rng"
+    return [Pokemon(dexno, Events.NULL, rng)
+    for dexno in valid_dexnos(rng.getrandbits(32), n)]
+
+def prepare_construction(seed):
+    return valid_dexnos(seed, 1500), random.Random(seed)
+
+def run_construction(state):
+    dexnos, rng = state
+    for dexno in dexnos:
+        Pokemon(dexno, Events.NULL, rng)
+    return len(dexnos)
+
+def prepare_reset(seed):
+    dexnos, rng = prepare_construction(seed)
+    return dexnos, Pokemon(dexnos[0], Events.NULL, rng)
+
+def run_reset(state):
+    dexnos, pokemon = state
+    for dexno in dexnos:
+        pokemon.reset(dexno)
+    return len(dexnos)
+
+def prepare_bulk_generation(seed):
+    return seed
+
+def run_bulk_generation(seed):
+    return len(PokemonSpreads.generate(100000, seed=seed))
+
+def prepare_move_lookup(seed):
+    names = [move.name for move in MoveTable.by_id]
+    random.Random(seed).shuffle(names)
+    return names * 500
+
+def run_move_lookup(names):
+    for name in names:
+        Move(name)
+    return len(names)
+
+def prepare_move_compile(seed):
+    columns = [Data.move_columns.index(column) for column in
+    ("Name", "Type", "Category", "Power", "Accuracy", "Effect")]
+    rows = [[row[column] for column in columns] for row in Data.move_rows]
+    return [(move_id, *row) for move_id, row in enumerate(rows)] * 50
+
+def run_move_compile(rows):
+    for move_id, name, move_type, category, power, accuracy, effect in rows:
+        Move.compile(move_id, name.strip(), move_type, category, power,
+        accuracy, effect)
+    return len(rows)
+
+def prepare_damage_calc(seed):
+    """ Attacks with every damaging move of 50 random Pokemon against
+    another random Pokemon. Thrashing moves are left out because damageCalc
+    starts the thrash.
+    """
+    rng = random.Random(seed)
+    attackers = random_pokemon(rng, 50)
+    defenders = random_pokemon(rng, 50)
+    attacks = []
+    for attacker, defender in zip(attackers, defenders):
+        player = ComputerPlayer("attacker", attacker.dexno, Events.NULL, rng)
+        player.pokemon = attacker
+        for move in attacker.moves:
+            if (move.category != "Status" and move.power != "None" and
+            move.effect != "Thrash-Like"):
+                attacks.append((player, move, defender))
+    rng.seed(seed)
+    return attacks * 50, rng
+
+def run_damage_calc(state):
+    attacks, rng = state
+    for player, move, defender in attacks:
+        player.rng = rng
+        player.damageCalc(move, defender)
+    return len(attacks)
+
+def prepare_effect_multiplier(seed):
+    rng = random.Random(seed)
+    moves = list(MoveTable.by_id)
+    types = [(row[2], row[3]) for row in Data.pokedex_rows[1:]]
+    return [(rng.choice(moves), *rng.choice(types)) for _ in range(50000)]
+
+def run_effect_multiplier(checks):
+    for move, type1, type2 in checks:
+        move.effect_multiplier(type1, type2, Events.NULL)
+    return len(checks)
+
+def prepare_set_current_stat(seed):
+    """ Lowers each stat of 100 random Pokemon by two stages and raises it
+    back, so every call changes the stat and none hits the limits.
+    """
+    rng = random.Random(seed)
+    changes = []
+    for pokemon in random_pokemon(rng, 100):
+        for stat in Stats.stat_list[1:]:
+            for stages in (-1, -1, 1, 1):
+                changes.append((pokemon, stat, stages))
+    return changes * 40
+
+def run_set_current_stat(changes):
+    for pokemon, stat, stages in changes:
+        pokemon.setCurrentStat(stat, stages)
+    return len(changes)
+
+def prepare_is_mobile(seed):
+    """ Status checks of random Pokemon in every status (and confused),
+    each on its own copy because is_mobile changes them
+    """
+    rng = random.Random(seed)
+    pokemon = random_pokemon(rng, 20)
+    p1 = ComputerPlayer("Brock", pokemon[0].dexno, Events.NULL, rng)
+    p2 = ComputerPlayer("Misty", pokemon[1].dexno, Events.NULL, rng)
+    battle = Battle(p1, p2, None, Events.NULL, random.Random(seed))
+    checks = []
+    for status in Statuses.status_list:
+        for confused in (False, True):
+            for template in pokemon:
+                checked = template.copy()
+                checked.setStatus(status)
+                checked.set_confusion(confused)
+                checks.append(checked)
+    return battle, checks * 50
+
+def run_is_mobile(state):
+    battle, checks = state
+    for pokemon in checks:
+        battle.is_mobile(pokemon)
+    return len(checks)
+
+def prepare_battle(seed):
+    """ 600 computer vs. computer battles between random Pokemon, each with
+    its own seeded stream
+    """
+    seeder = random.Random(seed)
+    battles = []
+    for dexno1, dexno2 in zip(valid_dexnos(seed, 600),
+    valid_dexnos(seed + 1, 600)):
+        rng = random.Random(seeder.getrandbits(32))
+        p1 = ComputerPlayer("Brock", dexno1, Events.NULL, rng)
+        p2 = ComputerPlayer("Misty", dexno2, Events.NULL, rng)
+        battles.append(Battle(p1, p2, 500, Events.NULL, rng))
+    return battles
+
+def run_battle(battles):
+    for battle in battles:
+        try:
+            battle.start()
+        except Exception:
+            pass # moves whose damage can't be calculated yet
+    return len(battles)
+
+def prepare_lockstep_battle(seed):
+    return seed
+
+def run_lockstep_battle(seed):
+    return len(run_vector_batch(20000, seed))
+
+SCENARIOS = [
+    Scenario("pokemon_construction", "Pokemon()", prepare_construction,
+    run_construction),
+    Scenario("pokemon_reset", "Pokemon.reset()", prepare_reset, run_reset),
+    Scenario("bulk_generation", "one Pokemon's spread in PokemonSpreads",
+    prepare_bulk_generation, run_bulk_generation),
+    Scenario("move_lookup", "Move(name)", prepare_move_lookup,
+    run_move_lookup),
+    Scenario("move_compile", "Move.compile()", prepare_move_compile,
+    run_move_compile),
+    Scenario("damage_calc", "Player.damageCalc()", prepare_damage_calc,
+    run_damage_calc),
+    Scenario("effect_multiplier", "Move.effect_multiplier()",
+    prepare_effect_multiplier, run_effect_multiplier),
+    Scenario("set_current_stat", "Pokemon.setCurrentStat()",
+    prepare_set_current_stat, run_set_current_stat),
+    Scenario("is_mobile", "Battle.is_mobile()", prepare_is_mobile,
+    run_is_mobile),
+    Scenario("battle", "Battle.start() to the end", prepare_battle,
+    run_battle),
+    Scenario("lockstep_battle", "one battle of run_vector_batch()",
+    prepare_lockstep_battle, run_lockstep_battle),
+]
+
+def run_suite(seed=0, repeats=5, names=None):
+    """ Measures every scenario of the suite, or only the named ones.
+
+    Returns:
+        A dict from scenario name to its summary: the mean and standard
+        deviation of its operations per second and every repeat's rate
+    """
+    results = {}
+    for scenario in SCENARIOS:
+        if names and scenario.name not in names:
+            continue
+        rates = scenario.measure(seed, repeats)
+        results[scenario.name] = {
+            "mean": statistics.mean(rates),
+            "stdev": statistics.stdev(rates) if len(rates) > 1 else 0.0,
+            "rates": rates
+        }
+    return results
+
+def save_baseline(results, path, seed, repeats):
+    "Writes suite results to a JSON baseline file"
+    with open(path, "w") as f:
+        json.dump({
+            "version": BASELINE_VERSION,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "seed": seed,
+            "repeats": repeats,
+            "scenarios": results
+        }, f, indent=2)
+
+def load_baseline(path):
+    """ Reads a JSON baseline file.
+
+    Raises:
+        ValueError if the file is from a different baseline version
+    """
+    with open(path) as f:
+        baseline = json.load(f)
+    if baseline.get("version") != BASELINE_VERSION:
+        raise ValueError("{} is not a version {} baseline".format(path,
+        BASELINE_VERSION))
+    return baseline
+
+def compare(results, baseline, threshold=0.10):
+    """ Compares suite results with a baseline.
+
+    Parameters:
+        results (dict): as returned by run_suite
+        baseline (dict): as returned by load_baseline
+        threshold (float): the fraction of the baseline's throughput a
+        scenario may lose before it counts as a regression
+
+    Returns:
+        A dict from the name of each scenario in both to (change, regressed),
+        where change is the relative change in mean operations per second.
+        A scenario regressed if it lost more than threshold and the drop is
+        also more than twice the standard error of the difference of the
+        means, so noisy scenarios aren't flagged by chance.
+    """
+    comparison = {}
+    for name, result in results.items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            continue
+        change = result["mean"] / before["mean"] - 1
+        error = math.sqrt(result["stdev"] ** 2 / len(result["rates"]) +
+        before["stdev"] ** 2 / len(before["rates"]))
+        regressed = (change < -threshold and
+        before["mean"] - result["mean"] > 2 * error)
+        comparison[name] = (change, regressed)
+    return comparison
+
+def report(results, comparison=None):
+    "Formats suite results, with their change against a baseline if given"
+    lines = ["{:<22}{:>14}{:>9}{:>10}".format("scenario", "ops/sec", "+/-",
+    "change" if comparison else "")]
+    for scenario in SCENARIOS:
+        result = results.get(scenario.name)
+        if result is None:
+            continue
+        line = "{:<22}{:>14.1f}{:>8.1f}%".format(scenario.name, result["mean"],
+        100 * result["stdev"] / result["mean"])
+        if comparison and scenario.name in comparison:
+            change, regressed = comparison[scenario.name]
+            line += "{:>+9.1f}%".format(100 * change)
+            if regressed:
+                line += "  REGRESSION"
+        lines.append(line)
+    return "\n".join(lines)
+
+def run_comparisons(args):
+    "Prints the before/after measurements of earlier optimizations"
+    before, templates, recycled = bench_construction(args.pokemon, args.seed)
+    print("Pokemon construction, DataFrame rows:  {:10.1f}/sec".format(before))
+    print("Pokemon construction, species table:   {:10.1f}/sec".format(
+        templates))
+    print("Pokemon reset, recycled object:        {:10.1f}/sec".format(
+        recycled))
+    print("Speedup: {:.2f}x, recycled {:.2f}x".format(templates / before,
+    recycled / before))
+    from_csv, from_snapshot = bench_data_load()
+    print("Data load from csv:      {:8.3f} ms".format(from_csv * 1000))
+    print("Data load from snapshot: {:8.3f} ms".format(from_snapshot * 1000))
+    for backend, rate in bench_rng_backends(args.battles, args.seed).items():
+        print("Battles, {:6} rng: {:10.1f}/sec".format(backend, rate))
+    metrics = bench_mcts(args.decisions, args.rollouts, args.workers,
+    args.seed)
+    print("MCTS rollouts: {:10.1f}/sec".format(metrics["rollouts_per_second"]))
+    print("MCTS decision latency: mean {:.1f} ms, p99 {:.1f} ms".format(
+        metrics["latency_mean"] * 1000, metrics["latency_p99"] * 1000))
+
+def parse_args(arglist):
+    """ Parse command line arguments. """
+    parser = ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=5,
+    help="timed runs per scenario")
+    parser.add_argument("--only", nargs="+", default=None,
+    choices=[scenario.name for scenario in SCENARIOS],
+    help="run only these scenarios")
+    parser.add_argument("--save", default=None,
+    help="write the results to this JSON baseline file")
+    parser.add_argument("--baseline", default=None,
+    help="compare the results with this JSON baseline file")
+    parser.add_argument("--threshold", type=float, default=0.10,
+    help="slowdown (as a fraction) that counts as a regression")
+    parser.add_argument("--comparisons", action="store_true",
+    help="run the before/after comparisons instead of the suite")
+    parser.add_argument("--pokemon", type=int, default=2000,
+    help="number of Pokemon to construct")
+    parser.add_argument("--battles", type=int, default=3000,
+    help="number of battles per random number backend")
+    parser.add_argument("--decisions", type=int, default=20,
+    help="number of Monte Carlo decisions")
+    parser.add_argument("--rollouts", type=int, default=1000,
+    help="rollouts per Monte Carlo decision")
+    parser.add_argument("--workers", type=int, default=1,
+    help="processes playing Monte Carlo rollouts")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(arglist)
+    return args
+
+def main(arglist):
+    """ Run the suite (or the comparisons); exits with status 1 if a
+    scenario regressed against the baseline
+    """
+    args = parse_args(arglist)
+    if args.comparisons:
+        run_comparisons(args)
+        return
+    results = run_suite(args.seed, args.repeats, args.only)
+    comparison = None
+    if args.baseline:
+        comparison = compare(results, load_baseline(args.baseline),
+        args.threshold)
+    print(report(results, comparison))
+    if args.save:
+        save_baseline(results, args.save, args.seed, args.repeats)
+    if comparison and any(regressed for _, regressed in comparison.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,208 @@
+import sys, json, time, random, asyncio
+from argparse import ArgumentParser
+from server import BattleServer, DEFAULT_PORT
+
+# EXAMPLE: 1,000 players battling a server that is already running
+# python loadtest.py 1000 --port 8765
+# EXAMPLE: 200 players taking up to a second per move, while 5,000 more sit
+# idle, against a server started in this process
+# python loadtest.py 200 --think-time 1 --idle 5000 --serve
+
+""" Load test for server.py.
+
+    Opens many connections at once and plays a battle on each, choosing
+    moves at random, and measures the turn latency: the time from sending a
+    move to receiving that turn's result. Idle connections can be added
+    that start a battle and then never move, to check that waiting sessions
+    don't slow the active ones down.
+"""
+
+def percentile(values, q):
+    "The q-th percentile of a sorted list, by the nearest rank"
+    if not values:
+        return None
+    rank = max(0, min(len(values) - 1, int(round(q / 100 * len(values))) - 1))
+    return values[rank]
+
+class LoadReport:
+    """ What the players of a load test saw.
+
+    Attributes:
+        latencies (list of float) = the latency of every turn, in seconds
+        battles (int) = the battles that ended
+        errors (int) = the battles the server reported an error in
+        failures (int) = the connections that broke or were refused
+        elapsed (float) = the length of the test in seconds
+    """
+    def __init__(self):
+        self.latencies = []
+        self.battles = 0
+        self.errors = 0
+        self.failures = 0
+        self.elapsed = 0.0
+
+    def as_dict(self):
+        latencies = sorted(self.latencies)
+        def ms(q):
+            value = percentile(latencies, q)
+            return None if value is None else value * 1000
+        return {
+            "battles": self.battles,
+            "errors": self.errors,
+            "failures": self.failures,
+            "turns": len(latencies),
+            "elapsed_seconds": self.elapsed,
+            "turns_per_second": len(latencies) / self.elapsed
+            if self.elapsed else 0.0,
+            "p50_ms": ms(50),
+            "p99_ms": ms(99),
+            "max_ms": ms(100)
+        }
+
+    def __str__(self):
+        d = self.as_dict()
+        lines = ["{} battles, {} errors and {} failed connections in {:.2f}s"
+        .format(d["battles"], d["errors"], d["failures"],
+        d["elapsed_seconds"]),
+        "{} turns ({:.0f} per second)".format(d["turns"],
+        d["turns_per_second"])]
+        if d["turns"]:
+            lines.append("turn latency: p50 {:.2f} ms, p99 {:.2f} ms, max {:.2f} ms"
+            .format(d["p50_ms"], d["p99_ms"], d["max_ms"]))
+        return "\n".join(lines)
+
+async def send(writer, message):
+    writer.write((json.dumps(message) + "\n").encode())
+    await writer.drain()
+
+async def player(host, port, seed, think_time, report):
+    """ Plays one battle with random moves.
+
+    Side Effects:
+        Adds the battle's turn latencies and outcome to report
+    """
+    rng = random.Random(seed)
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        report.failures += 1
+        return
+    try:
+        await send(writer, {"name": "Player", "seed": seed})
+        sent = None
+        while True:
+            line = await reader.readline()
+            if not line:
+                report.failures += 1
+                return
+            message = json.loads(line)
+            kind = message["type"]
+            if kind == "prompt":
+                if think_time:
+                    await asyncio.sleep(rng.uniform(0, think_time))
+                await send(writer, {"move": rng.randint(1, 4)})
+                sent = time.perf_counter()
+            elif kind == "turn":
+                if sent is not None:
+                    report.latencies.append(time.perf_counter() - sent)
+                    sent = None
+            elif kind == "end":
+                report.battles += 1
+                return
+            elif kind == "error":
+                report.errors += 1
+                return
+    except ConnectionError:
+        report.failures += 1
+    finally:
+        writer.close()
+
+async def idler(host, port, seed, ready, done, report):
+    "Starts a battle and waits, without moving, until done is set"
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        report.failures += 1
+        ready.release()
+        return
+    await send(writer, {"name": "Idle", "seed": seed})
+    await reader.readline() # the first prompt
+    ready.release()
+    await done.wait()
+    writer.close()
+
+async def run_load_test(players, host="127.0.0.1", port=DEFAULT_PORT, seed=0,
+think_time=0.0, idle=0, serve=False):
+    """ Runs a load test.
+
+    Parameters:
+        players (int): the number of battles to play at once
+        host (str), port (int): the server to test
+        seed (int): seeds the players' battles and moves
+        think_time (float): each move waits a random time up to this many
+        seconds first
+        idle (int): the number of idle sessions to open before the players
+        start
+        serve (bool): whether to start a server in this process, on a free
+        port, instead of using one that is already running
+
+    Returns:
+        A LoadReport
+    """
+    server = None
+    if serve:
+        server = BattleServer(host, 0)
+        port = await server.start()
+    report = LoadReport()
+    done = asyncio.Event()
+    ready = asyncio.Semaphore(0)
+    idlers = [asyncio.ensure_future(idler(host, port, seed + players + i,
+    ready, done, report)) for i in range(idle)]
+    for _ in range(idle):
+        await ready.acquire()
+    start = time.perf_counter()
+    await asyncio.gather(*[player(host, port, seed + i, think_time, report)
+    for i in range(players)])
+    report.elapsed = time.perf_counter() - start
+    done.set()
+    await asyncio.gather(*idlers)
+    if server is not None:
+        server.close()
+    return report
+
+def parse_args(arglist):
+    """ Parse command line arguments. """
+    parser = ArgumentParser()
+    parser.add_argument("players", type=int,
+    help="number of battles to play at once")
+    parser.add_argument("--host", default="127.0.0.1",
+    help="server address")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+    help="server port")
+    parser.add_argument("--seed", type=int, default=0,
+    help="seeds the battles and the players' moves")
+    parser.add_argument("--think-time", type=float, default=0.0,
+    help="wait up to this many seconds before each move")
+    parser.add_argument("--idle", type=int, default=0,
+    help="number of idle sessions to hold open during the test")
+    parser.add_argument("--serve", action="store_true",
+    help="start a server in this process instead of using a running one")
+    parser.add_argument("--json", action="store_true",
+    help="print the report as JSON")
+    args = parser.parse_args(arglist)
+    if args.players < 1:
+        parser.error("players must be at least 1")
+    return args
+
+def main(arglist):
+    """ Run a load test and print its report """
+    args = parse_args(arglist)
+    report = asyncio.run(run_load_test(args.players, args.host, args.port,
+    args.seed, args.think_time, args.idle, args.serve))
+    if args.json:
+        print(json.dumps(report.as_dict(), indent=2))
+    else:
+        print(report)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,66 @@
+import sys
+from argparse import ArgumentParser
+from MovesetSearch import successive_halving, POOLS
+from batch import AI_PLAYERS, MAX_TURNS
+from tournament import ROSTER_SIZE
+from Rng import BACKENDS
+
+# EXAMPLE: race 64 movesets for Persian (row 24) against the whole roster
+# python optimize_moves.py 24 --seed 42
+# EXAMPLE: a longer search over every playable move, saved as JSON
+# python optimize_moves.py 24 --candidates 256 --battles 50 --pool all --json persian.json
+
+""" Finds better movesets for a species.
+
+    Draws candidate movesets from the movelist and races them against the
+    roster with successive halving (see MovesetSearch), then prints the
+    candidates ranked by how far they got and their win rate, with the
+    species' current moveset for comparison.
+"""
+
+def parse_args(arglist):
+    """ Parse command line arguments. """
+    parser = ArgumentParser()
+    parser.add_argument("dexno", type=int, help="the species' Pokedex row")
+    parser.add_argument("--candidates", type=int, default=64,
+    help="number of movesets to try, counting the current one")
+    parser.add_argument("--battles", type=int, default=24,
+    help="battles per candidate in the first round")
+    parser.add_argument("--eta", type=int, default=2,
+    help="keep 1/ETA of the candidates after each round")
+    parser.add_argument("--seed", type=int, default=0, help="master seed")
+    parser.add_argument("--workers", type=int, default=None,
+    help="worker processes (defaults to the number of CPUs)")
+    parser.add_argument("--pool", choices=POOLS, default="types",
+    help="draw moves of the species' types and Normal, or every move")
+    parser.add_argument("--size", type=int, default=ROSTER_SIZE,
+    help="only battle the first SIZE species")
+    parser.add_argument("--ai", choices=AI_PLAYERS.keys(), default="random",
+    help="the computer player both sides use")
+    parser.add_argument("--max-turns", type=int, default=MAX_TURNS,
+    help="turns after which a battle is a draw")
+    parser.add_argument("--rng", choices=BACKENDS, default="python",
+    help="random number backend")
+    parser.add_argument("--top", type=int, default=10,
+    help="number of candidates to print")
+    parser.add_argument("--json", default=None,
+    help="write every candidate's results to this JSON file")
+    args = parser.parse_args(arglist)
+    if not 0 <= args.dexno < ROSTER_SIZE:
+        parser.error("dexno must be a row from 0 to {}".format(ROSTER_SIZE - 1))
+    if args.eta < 2:
+        parser.error("eta must be at least 2")
+    return args
+
+def main(arglist):
+    """ Run a moveset search and print its ranking """
+    args = parse_args(arglist)
+    report = successive_halving(args.dexno, args.candidates, args.battles,
+    args.eta, args.seed, args.workers, args.pool, range(args.size),
+    args.max_turns, args.rng, args.ai)
+    print("\n".join(report.lines(args.top)))
+    if args.json:
+        report.write_json(args.json)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
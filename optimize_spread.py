@@ -0,0 +1,94 @@
+import sys, os
+from argparse import ArgumentParser
+from SpreadSearch import SpreadSearch
+from batch import AI_PLAYERS, MAX_TURNS
+from tournament import ROSTER_SIZE
+from Rng import BACKENDS
+
+# EXAMPLE: evolve Persian's (row 24) EVs, IVs and nature for 20 generations
+# python optimize_spread.py 24 --generations 20 --seed 42
+# EXAMPLE: checkpoint every generation, and carry on from the checkpoint
+# python optimize_spread.py 24 --generations 40 --checkpoint persian.ckpt --resume
+
+""" Finds a strong EV, IV and nature spread for a species.
+
+    Runs a SpreadSearch (see SpreadSearch) and prints each generation's
+    best and mean win rate, then the best spreads found.
+"""
+
+def parse_args(arglist):
+    """ Parse command line arguments. """
+    parser = ArgumentParser()
+    parser.add_argument("dexno", type=int, help="the species' Pokedex row")
+    parser.add_argument("--generations", type=int, default=20,
+    help="generations to evolve, counting any in a resumed checkpoint")
+    parser.add_argument("--population", type=int, default=32,
+    help="spreads per generation")
+    parser.add_argument("--battles", type=int, default=200,
+    help="battles that make up a spread's fitness")
+    parser.add_argument("--seed", type=int, default=0, help="master seed")
+    parser.add_argument("--elite", type=int, default=2,
+    help="best spreads carried over unchanged")
+    parser.add_argument("--mutation-rate", type=float, default=0.3,
+    help="chance of each kind of mutation")
+    parser.add_argument("--crossover-rate", type=float, default=0.7,
+    help="chance that a child has two parents")
+    parser.add_argument("--workers", type=int, default=None,
+    help="worker processes (defaults to the number of CPUs)")
+    parser.add_argument("--batch-size", type=int, default=4,
+    help="spreads per unit of work")
+    parser.add_argument("--size", type=int, default=ROSTER_SIZE,
+    help="only battle the first SIZE species")
+    parser.add_argument("--ai", choices=AI_PLAYERS.keys(), default="random",
+    help="the computer player both sides use")
+    parser.add_argument("--max-turns", type=int, default=MAX_TURNS,
+    help="turns after which a battle is a draw")
+    parser.add_argument("--rng", choices=BACKENDS, default="python",
+    help="random number backend")
+    parser.add_argument("--checkpoint", default=None,
+    help="write the search's state to this file after every generation")
+    parser.add_argument("--resume", action="store_true",
+    help="carry on from the checkpoint file if it exists")
+    parser.add_argument("--top", type=int, default=5,
+    help="number of spreads to print")
+    parser.add_argument("--json", default=None,
+    help="write the best spreads and the history to this JSON file")
+    args = parser.parse_args(arglist)
+    if not 0 <= args.dexno < ROSTER_SIZE:
+        parser.error("dexno must be a row from 0 to {}".format(ROSTER_SIZE - 1))
+    if args.resume and not args.checkpoint:
+        parser.error("--resume needs --checkpoint")
+    return args
+
+def main(arglist):
+    """ Run a spread search and print the best spreads """
+    args = parse_args(arglist)
+    search = SpreadSearch(args.dexno, args.population, args.battles, args.seed,
+    range(args.size), args.max_turns, args.rng, args.ai, args.elite,
+    crossover_rate=args.crossover_rate, mutation_rate=args.mutation_rate,
+    workers=args.workers, batch_size=args.batch_size,
+    checkpoint=args.checkpoint)
+    if args.resume and os.path.exists(args.checkpoint):
+        try:
+            search.load(args.checkpoint)
+        except ValueError as e:
+            sys.exit(str(e))
+        print("Resuming after generation {}".format(search.generation))
+    search.run(args.generations)
+    for entry in search.history:
+        print("generation {:3}: best {:.3f}  mean {:.3f}  {} simulated, {} "
+        "cached".format(entry["generation"], entry["best"], entry["mean"],
+        entry["simulated"], entry["cached"]))
+    report = search.as_dict(args.top)
+    print("{} spreads, {} battles in {:.2f}s".format(
+        report["spreads_evaluated"], report["battles_simulated"],
+        report["elapsed_seconds"]))
+    for rank, entry in enumerate(report["best"], 1):
+        print("{}. {:.3f}  {:8} EVs {}  IVs {}  stats {}".format(rank,
+        entry["win_rate"], entry["nature"], entry["EVs"], entry["IVs"],
+        entry["stats"]))
+    if args.json:
+        search.write_json(args.json, args.top)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
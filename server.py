@@ -0,0 +1,258 @@
+import sys, json, random, asyncio
+from argparse import ArgumentParser
+from Players import HumanPlayer
+from battle import Battle
+from batch import AI_PLAYERS, MAX_TURNS
+from Rng import make_rng, BACKENDS
+import Events
+
+# EXAMPLE: serve human vs. computer battles on localhost
+# python server.py --port 8765
+# EXAMPLE: then play one by hand (type JSON lines such as {"move": 1})
+# nc localhost 8765
+
+""" Local battle server for many human players at once.
+
+    Each connection is one session: a human vs. computer Battle whose human
+    moves arrive over the network instead of from input(). The server runs
+    on asyncio, so a session waiting for its player costs only a suspended
+    coroutine and one process can hold thousands of them. A turn is played
+    with Battle.play_turn once the human's move for it has arrived; random
+    computer players and damage calculation take microseconds and run on
+    the event loop, while the search AIs' turns run on a worker thread so
+    they don't hold up other sessions.
+
+    The protocol is one JSON object per line in both directions:
+        client: {"name": "Ash", "dexno": 24, "ai": "random", "seed": 7}
+            to start (every field is optional), then {"move": n} with n
+            from 1 to 4 whenever asked
+        server: {"type": "prompt", "turn": t, "text": ...} asking for a
+            move; {"type": "turn", "turn": t, "events": [...]} with the
+            console text of a turn; {"type": "rejected", "message": ...}
+            for a bad message; {"type": "end", "winner": ..., "turns": t};
+            {"type": "error", "message": ...} if the battle raised an error
+    The human moves only when prompted. Like the console game, a human is
+    asked for a move every turn it isn't releasing a charged move; a move
+    sent for a turn the human can't move in is dropped.
+"""
+
+DEFAULT_PORT = 8765
+
+# seconds a session may wait for its player before it is closed
+IDLE_TIMEOUT = 600
+
+# computer players cheap enough to run on the event loop
+INLINE_AIS = ("random",)
+
+class QueuedInput:
+    """ The read_input of a networked HumanPlayer: hands out the move sent
+    for the current turn.
+
+    Attributes:
+        line (str) = the move, or None once it has been read
+    """
+    def __init__(self):
+        self.line = None
+
+    def __call__(self, prompt):
+        line, self.line = self.line, None
+        if line is None:
+            raise EOFError("No move was sent for this turn")
+        return line
+
+class Disconnected(Exception):
+    "The client closed the connection or stayed idle for too long"
+
+class BattleSession:
+    """ One human vs. computer battle over a connection.
+
+    Attributes:
+        server (BattleServer) = the server the session belongs to
+        reader, writer (asyncio streams) = the connection
+        input (QueuedInput) = where the human player reads its moves
+    """
+    def __init__(self, server, reader, writer):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.input = QueuedInput()
+
+    async def send(self, message):
+        self.writer.write((json.dumps(message) + "\n").encode())
+        await self.writer.drain()
+
+    async def receive(self):
+        """ The next message from the client.
+
+        Raises:
+            Disconnected if the client hung up or was idle too long
+        """
+        while True:
+            try:
+                line = await asyncio.wait_for(self.reader.readline(),
+                self.server.idle_timeout)
+            except (asyncio.TimeoutError, ConnectionError):
+                raise Disconnected()
+            if not line:
+                raise Disconnected()
+            try:
+                message = json.loads(line)
+            except ValueError:
+                message = None
+            if isinstance(message, dict):
+                return message
+            await self.send({"type": "rejected",
+            "message": "Send one JSON object per line"})
+
+    async def receive_move(self):
+        "Waits for a valid move; returns it as the line HumanPlayer reads"
+        while True:
+            move = (await self.receive()).get("move")
+            if isinstance(move, int) and 1 <= move <= 4:
+                return str(move)
+            await self.send({"type": "rejected",
+            "message": "Please enter a number between 1 and 4"})
+
+    def setup(self, hello):
+        "Builds the session's Battle from the client's first message"
+        seed = hello.get("seed")
+        if not isinstance(seed, int):
+            seed = random.getrandbits(32)
+        ai = hello.get("ai", "random")
+        if ai not in AI_PLAYERS:
+            raise ValueError("Unknown computer player: {}".format(ai))
+        dexno = hello.get("dexno")
+        if dexno is not None and not (isinstance(dexno, int)
+        and 0 <= dexno <= 97):
+            raise ValueError("dexno must be a row from 0 to 97")
+        self.events = Events.BufferedSink()
+        rng = make_rng(seed, self.server.backend)
+        human = HumanPlayer(str(hello.get("name", "Player")), dexno,
+        self.events, rng, self.input)
+        computer = AI_PLAYERS[ai]("Misty", None, self.events, rng)
+        self.inline = ai in INLINE_AIS
+        return Battle(human, computer, self.server.max_turns, self.events, rng)
+
+    def flush_events(self):
+        "The console text of the events since the last call"
+        lines = self.events.text().splitlines()
+        self.events.clear()
+        return lines
+
+    async def run(self):
+        "Plays the session's battle to the end"
+        try:
+            battle = self.setup(await self.receive())
+        except ValueError as e:
+            await self.send({"type": "rejected", "message": str(e)})
+            return
+        battle.begin()
+        human = battle.player1
+        loop = asyncio.get_running_loop()
+        while not battle.over:
+            if not human.getPokemon().is_charging():
+                await self.send({"type": "prompt", "turn": battle.turns + 1,
+                "text": str(human)})
+                self.input.line = await self.receive_move()
+            try:
+                if self.inline:
+                    battle.play_turn()
+                else:
+                    await loop.run_in_executor(None, battle.play_turn)
+            except Exception as e:
+                await self.send({"type": "error",
+                "message": "{}: {}".format(type(e).__name__, e)})
+                return
+            self.input.line = None
+            await self.send({"type": "turn", "turn": battle.turns,
+            "events": self.flush_events()})
+        winner = battle.winner
+        await self.send({"type": "end", "turns": battle.turns,
+        "winner": None if winner is None else winner.getName()})
+
+class BattleServer:
+    """ Accepts connections and runs a BattleSession on each.
+
+    Attributes:
+        host (str), port (int) = where to listen; port 0 picks a free port
+        max_turns (int) = the turn limit of every battle
+        idle_timeout (float) = seconds a session waits for its player
+        backend (str) = the random number backend, one of Rng.BACKENDS
+        sessions (int) = the sessions open right now
+        completed (int) = the sessions that have ended
+    """
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT,
+    max_turns=MAX_TURNS, idle_timeout=IDLE_TIMEOUT, backend="python"):
+        self.host = host
+        self.port = port
+        self.max_turns = max_turns
+        self.idle_timeout = idle_timeout
+        self.backend = backend
+        self.sessions = 0
+        self.completed = 0
+        self.server = None
+
+    async def handle(self, reader, writer):
+        self.sessions += 1
+        try:
+            await BattleSession(self, reader, writer).run()
+        except (Disconnected, ConnectionError):
+            pass
+        finally:
+            self.sessions -= 1
+            self.completed += 1
+            writer.close()
+
+    async def start(self):
+        """ Starts listening.
+
+        Returns:
+            The port being listened on
+        """
+        self.server = await asyncio.start_server(self.handle, self.host,
+        self.port, backlog=4096)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+
+def parse_args(arglist):
+    """ Parse command line arguments. """
+    parser = ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1",
+    help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+    help="port to listen on")
+    parser.add_argument("--max-turns", type=int, default=MAX_TURNS,
+    help="turns after which a battle is a draw")
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT,
+    help="seconds to wait for a player before closing their session")
+    parser.add_argument("--rng", choices=BACKENDS, default="python",
+    help="random number backend")
+    args = parser.parse_args(arglist)
+    return args
+
+def main(arglist):
+    """ Serve battles until interrupted """
+    args = parse_args(arglist)
+    server = BattleServer(args.host, args.port, args.max_turns,
+    args.idle_timeout, args.rng)
+    async def serve():
+        port = await server.start()
+        print("Serving battles on {}:{}".format(args.host, port))
+        await server.serve_forever()
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
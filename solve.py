@@ -0,0 +1,83 @@
+import sys, json, random
+from argparse import ArgumentParser
+from PokemonGenerator import Pokemon
+from WinProbability import (WinProbabilitySolver, SolverLimitExceeded,
+monte_carlo, validate, MAX_STATES, MAX_MEMORY)
+import Events
+
+# EXAMPLE: exact odds of Persian (row 24) vs. Fearow (row 6), both with the
+# EVs, IVs and natures rolled from seed 7
+# python solve.py 24 6 --seed 7
+# EXAMPLE: check the answer against 20,000 played battles
+# python solve.py 24 6 --seed 7 --validate 20000
+
+""" Exact win probabilities of one computer vs. computer matchup.
+
+    Builds the two Pokemon from their Pokedex rows, with each species' own
+    moves and EVs, IVs and natures rolled from the seed, and solves the
+    battle between them with both players picking moves at random, as
+    ComputerPlayer does.
+
+    Some matchups take minutes to solve: row 10 vs. row 77 took 115 seconds,
+    and row 90 vs. row 30 hadn't finished after 300. --max-states and
+    --max-memory bound the time and memory a solve may take.
+"""
+
+def parse_args(arglist):
+    """ Parse command line arguments. """
+    parser = ArgumentParser(epilog="Some matchups take minutes to solve; "
+    "--max-states and --max-memory give up on them sooner.")
+    parser.add_argument("dexno1", type=int, help="player 1's Pokedex row")
+    parser.add_argument("dexno2", type=int, help="player 2's Pokedex row")
+    parser.add_argument("--seed", type=int, default=0,
+    help="seeds the two Pokemon's EVs, IVs and natures")
+    parser.add_argument("--max-states", type=int, default=MAX_STATES,
+    help="give up after solving this many states")
+    parser.add_argument("--max-memory", type=float, default=MAX_MEMORY,
+    help="give up when the process uses this many megabytes")
+    parser.add_argument("--validate", type=int, default=0, metavar="N",
+    help="also play N battles and compare their results with the answer")
+    parser.add_argument("--json", action="store_true",
+    help="print the answer as JSON")
+    args = parser.parse_args(arglist)
+    for dexno in (args.dexno1, args.dexno2):
+        if not 0 <= dexno <= 97:
+            parser.error("Pokedex rows go from 0 to 97")
+    return args
+
+def main(arglist):
+    """ Solve a matchup and print its outcome probabilities """
+    args = parse_args(arglist)
+    rng = random.Random(args.seed)
+    pokemon1 = Pokemon(args.dexno1, Events.NULL, rng)
+    pokemon2 = Pokemon(args.dexno2, Events.NULL, rng)
+    solver = WinProbabilitySolver(pokemon1, pokemon2,
+    max_states=args.max_states, max_memory=args.max_memory)
+    try:
+        solution = solver.solve()
+    except SolverLimitExceeded as e:
+        sys.exit("Gave up: {}".format(e))
+    rows = []
+    if args.validate:
+        counts = monte_carlo(pokemon1, pokemon2, args.validate, args.seed)
+        rows = validate(solution, counts)
+    if args.json:
+        report = solution.as_dict()
+        report["pokemon"] = [pokemon1.name, pokemon2.name]
+        if rows:
+            report["validation"] = [dict(outcome=name, exact=p, sampled=rate,
+            z=z) for name, p, rate, z in rows]
+        print(json.dumps(report, indent=2))
+        return
+    for player, pokemon in (("Player 1", pokemon1), ("Player 2", pokemon2)):
+        print("{}: {} ({})".format(player, pokemon.name,
+        ", ".join(move.name for move in pokemon.moves)))
+    print(solution)
+    if rows:
+        print("{} battles played:".format(args.validate))
+        for name, p, rate, z in rows:
+            print("  {:8} exact {:.4f}  sampled {:.4f}  z {:+.2f}".format(name,
+            p, rate, z))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,420 @@
+import sys, os, math, time, hashlib
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from Constants import Data, ROSTER_SIZE
+from batch import play, MAX_TURNS
+from Rng import make_rng, BACKENDS
+from OnlineStats import BattleAggregator, wilson_interval, Z95
+
+# EXAMPLE: every pairing 10 times on all cores, saved as a csv matrix
+# python tournament.py 10 --seed 42 --csv win_rates.csv
+# EXAMPLE: also keep move and turn statistics, merged over the workers
+# python tournament.py 10 --seed 42 --stats-json stats.json
+# EXAMPLE: play each pairing until its win rate is known to within +-0.05,
+# up to 400 battles
+# python tournament.py 400 --seed 42 --target-width 0.1
+
+""" Round-robin tournament over every species vs. species pairing.
+
+    Each pairing (i, j) means species i is player 1 and species j is player 2,
+    so both seatings of a matchup are played. Work is split into chunks of
+    pairings and spread over a process pool. Battles report to the null
+    event sink, so nothing is printed. Every battle's seed is derived
+    from the master seed and the battle's (i, j, repetition) coordinates
+    alone, and per-chunk counts are merged by pairing, so the final matrix is
+    identical for a given master seed no matter how many workers ran it or
+    in which order the chunks finished.
+
+    An adaptive tournament doesn't play every pairing the same number of
+    times. It plays a pairing in blocks and stops once a StoppingRule says
+    its win rate is resolved: its confidence interval is narrow enough, or
+    a sequential test has decided which side is favoured. Lopsided
+    pairings, such as one side being immune to the other's moves, settle
+    in a block or two; close ones go on to the cap. Each pairing still
+    plays its first battles in order, so results stay reproducible.
+"""
+
+def battle_seed(master_seed, i, j, rep):
+    """ Derives the seed of one battle from the master seed and the battle's
+    coordinates in the tournament.
+
+    Returns:
+        A 64 bit integer
+    """
+    key = "{}:{}:{}:{}".format(master_seed, i, j, rep).encode()
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "big")
+
+# battles an adaptive tournament plays of a pairing between checks
+ADAPTIVE_BLOCK = 16
+
+# why an adaptive tournament stopped playing a pairing: its interval got
+# narrow enough, the sequential test decided it, or it reached the cap
+STOP_WIDTH, STOP_SPRT, STOP_CAP = "width", "sprt", "cap"
+STOP_REASONS = (STOP_WIDTH, STOP_SPRT, STOP_CAP)
+
+def interval_width(wins, games, z=Z95):
+    "The width of the Wilson interval of wins out of games"
+    low, high = wilson_interval(wins, games, z)
+    return high - low
+
+def fixed_reps(width, z=Z95, limit=10 ** 7):
+    """ The fewest games per pairing that make every win rate's interval at
+    most width wide, which is the worst case of a rate of one half: the
+    games a fixed-N tournament needs for that precision. Battles that raise
+    an error aren't games and would come on top.
+    """
+    low, high = 1, limit
+    while low < high:
+        n = (low + high) // 2
+        if interval_width(n / 2, n, z) <= width:
+            high = n
+        else:
+            low = n + 1
+    return low
+
+class StoppingRule:
+    """ When an adaptive tournament stops playing a pairing. A pairing is
+    checked after every block of battles and stops as soon as either test
+    resolves it.
+
+    Attributes:
+        width (float) = stop once player 1's win rate interval is at most
+        this wide; None to not test the width
+        delta (float) = stop once a sequential probability ratio test tells
+        a win rate of 1/2 + delta from one of 1/2 - delta; None to not test
+        alpha (float) = the error rate of each of the test's two mistakes
+        z (float) = the normal quantile of the interval's confidence level
+        block (int) = the battles between checks
+    """
+    def __init__(self, width=None, delta=None, alpha=0.05, z=Z95,
+    block=ADAPTIVE_BLOCK):
+        if width is None and delta is None:
+            raise ValueError("A stopping rule needs a width or a delta")
+        if block < 1:
+            raise ValueError("A stopping rule checks after blocks of at "
+            "least 1 battle")
+        self.width = width
+        self.delta = delta
+        self.alpha = alpha
+        self.z = z
+        self.block = block
+
+    def resolved(self, wins, games):
+        """ Whether wins out of games settles a pairing; draws count as
+        games that player 1 didn't win, as in TournamentReport.win_rate
+
+        Returns:
+            STOP_WIDTH or STOP_SPRT for the test that settles it; None if
+            neither does
+        """
+        if games == 0:
+            return None
+        if self.width is not None and interval_width(wins, games,
+        self.z) <= self.width:
+            return STOP_WIDTH
+        if self.delta is not None:
+            p0, p1 = 0.5 - self.delta, 0.5 + self.delta
+            llr = (wins * math.log(p1 / p0) +
+            (games - wins) * math.log((1 - p1) / (1 - p0)))
+            bound = math.log((1 - self.alpha) / self.alpha)
+            if abs(llr) >= bound:
+                return STOP_SPRT
+        return None
+
+    def fixed_reps(self):
+        """ The games per pairing a fixed-N tournament needs for the target
+        width; None without one
+        """
+        if self.width is None:
+            return None
+        return fixed_reps(self.width, self.z)
+
+def species_names(size=ROSTER_SIZE):
+    "Names of the first size species in the order used by the tournament"
+    return [Data.pokedex_rows[dexno + 1][1] for dexno in range(size)]
+
+def play_chunk(chunk, reps, master_seed, max_turns, backend="python",
+aggregate=False, rule=None):
+    """ Plays every repetition of every pairing in a chunk.
+
+    Parameters:
+        chunk (list of (int, int)): the pairings to play
+        reps (int): the number of battles per pairing; with a rule, the
+        most battles per pairing
+        master_seed (int): the tournament's master seed
+        max_turns (int): the number of turns after which a battle is a draw
+        backend (str): the random number backend, one of Rng.BACKENDS
+        aggregate (bool): whether to keep online statistics of the battles
+        rule (StoppingRule): stop playing a pairing once it is resolved;
+        None to play every pairing reps times
+
+    Returns:
+        A list with one (i, j, p1 wins, p2 wins, draws, errors) tuple per
+        pairing, in chunk order, with a rule followed by the reason the
+        pairing stopped, one of STOP_REASONS; with aggregate, a tuple of
+        that list and the chunk's BattleAggregator
+    """
+    counts = []
+    rng = make_rng(None, backend)
+    aggregator = BattleAggregator() if aggregate else None
+    spares = {}
+    for i, j in chunk:
+        p1_wins = p2_wins = draws = errors = 0
+        stop = STOP_CAP
+        for rep in range(reps):
+            result = play(battle_seed(master_seed, i, j, rep), i, j, max_turns,
+            backend=backend, rng=rng, aggregator=aggregator, spares=spares)
+            if result.error is not None:
+                errors += 1
+            elif result.winner == 1:
+                p1_wins += 1
+            elif result.winner == 2:
+                p2_wins += 1
+            else:
+                draws += 1
+            if rule is not None and (rep + 1) % rule.block == 0:
+                reason = rule.resolved(p1_wins, p1_wins + p2_wins + draws)
+                if reason is not None:
+                    stop = reason
+                    break
+        if rule is None:
+            counts.append((i, j, p1_wins, p2_wins, draws, errors))
+        else:
+            counts.append((i, j, p1_wins, p2_wins, draws, errors, stop))
+    if aggregate:
+        return counts, aggregator
+    return counts
+
+class TournamentReport:
+    """ Merged results of a tournament
+
+    Attributes:
+        size (int) = the number of species in the tournament
+        wins (list of int lists) = wins[i][j] is the number of battles species
+        i won against species j, counting both seatings
+        games (list of int lists) = games[i][j] is the number of decided or
+        drawn battles between species i and j, counting both seatings
+        errors (int) = the number of battles that raised an error
+        battles (int) = the total number of battles played
+        elapsed (float) = wall-clock seconds spent on the tournament
+        aggregator (BattleAggregator) = the online statistics merged from
+        every chunk, if they were kept
+        stops (dict) = for an adaptive tournament, [pairings, battles,
+        games] by the reason the pairings stopped, one of STOP_REASONS;
+        None otherwise
+        fixed_reps (int) = for an adaptive tournament with a target width,
+        the games per pairing a fixed-N tournament needs for that width
+    """
+    def __init__(self, size):
+        self.size = size
+        self.aggregator = None
+        self.stops = None
+        self.fixed_reps = None
+        self.wins = [[0] * size for _ in range(size)]
+        self.games = [[0] * size for _ in range(size)]
+        self.errors = 0
+        self.battles = 0
+        self.elapsed = 0.0
+
+    def add(self, i, j, p1_wins, p2_wins, draws, errors, stop=None):
+        """ Merges the counts of one pairing (species i as player 1), and
+        the reason it stopped if the tournament is adaptive
+        """
+        self.wins[i][j] += p1_wins
+        self.wins[j][i] += p2_wins
+        decided = p1_wins + p2_wins + draws
+        self.games[i][j] += decided
+        if i != j:
+            self.games[j][i] += decided
+        self.errors += errors
+        self.battles += decided + errors
+        if stop is not None:
+            tally = self.stops[stop]
+            tally[0] += 1
+            tally[1] += decided + errors
+            tally[2] += decided
+
+    def win_rate(self, i, j):
+        "Fraction of battles species i won against species j; None if unplayed"
+        if self.games[i][j] == 0:
+            return None
+        if i == j:
+            # a mirror match has one winner per game shared by both sides
+            return 0.5 * self.wins[i][i] / self.games[i][i]
+        return self.wins[i][j] / self.games[i][j]
+
+    def overall_win_rate(self, i):
+        "Fraction of all of species i's battles that it won"
+        games = sum(self.games[i])
+        if games == 0:
+            return None
+        # mirror wins are counted once for each copy of species i
+        return (sum(self.wins[i]) - 0.5 * self.wins[i][i]) / games
+
+    def games_saved(self):
+        """ The games the pairings that stopped on the target width saved
+        over a fixed-N tournament with the same width, and the games that
+        one would have played for them; None without a target width. Games
+        rather than battles are compared, since only games narrow an
+        interval.
+        """
+        if self.fixed_reps is None:
+            return None
+        pairings, _, games = self.stops[STOP_WIDTH]
+        fixed = pairings * self.fixed_reps
+        return fixed - games, fixed
+
+    def battles_per_second(self):
+        if self.elapsed <= 0:
+            return float("inf")
+        return self.battles / self.elapsed
+
+    def write_csv(self, path, names=None):
+        """ Writes the win rate matrix to a csv file; row i, column j holds
+        the fraction of battles species i won against species j.
+        """
+        names = names or species_names(self.size)
+        with open(path, "w") as f:
+            f.write(",".join(["Pokemon"] + names) + "\n")
+            for i in range(self.size):
+                rates = [self.win_rate(i, j) for j in range(self.size)]
+                f.write(",".join([names[i]] + ["" if rate is None
+                else "{:.6f}".format(rate) for rate in rates]) + "\n")
+
+def make_chunks(size, chunk_size):
+    """ Splits every (i, j) pairing of a size x size roster into lists of at
+    most chunk_size pairings.
+    """
+    pairings = [(i, j) for i in range(size) for j in range(size)]
+    return [pairings[k:k + chunk_size]
+    for k in range(0, len(pairings), chunk_size)]
+
+def run_tournament(reps, seed=0, workers=None, chunk_size=64,
+max_turns=MAX_TURNS, size=ROSTER_SIZE, backend="python", aggregate=False,
+rule=None):
+    """ Plays every pairing of the roster reps times, or until rule says
+    its win rate is resolved.
+
+    Parameters:
+        reps (int): the number of battles per pairing (per seating); the
+        most per pairing with a rule
+        seed (int): the master seed
+        workers (int): the number of worker processes; defaults to the number
+        of CPUs. 1 runs everything in this process.
+        chunk_size (int): the number of pairings handed to a worker at once
+        max_turns (int): the number of turns after which a battle is a draw
+        size (int): play only the first size species of the roster
+        backend (str): the random number backend, one of Rng.BACKENDS
+        aggregate (bool): whether to keep online statistics, in the
+        report's aggregator
+        rule (StoppingRule): makes the tournament adaptive
+
+    Returns:
+        A TournamentReport
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = make_chunks(size, chunk_size)
+    report = TournamentReport(size)
+    if aggregate:
+        report.aggregator = BattleAggregator()
+    if rule is not None:
+        report.stops = {reason: [0, 0, 0] for reason in STOP_REASONS}
+        report.fixed_reps = rule.fixed_reps()
+    def merge(chunk_result):
+        if aggregate:
+            chunk_result, aggregator = chunk_result
+            report.aggregator.merge(aggregator)
+        for counts in chunk_result:
+            report.add(*counts)
+    start = time.perf_counter()
+    if workers == 1:
+        for chunk in chunks:
+            merge(play_chunk(chunk, reps, seed, max_turns, backend, aggregate,
+            rule))
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            futures = [pool.submit(play_chunk, chunk, reps, seed, max_turns,
+            backend, aggregate, rule) for chunk in chunks]
+            for future in futures:
+                merge(future.result())
+    report.elapsed = time.perf_counter() - start
+    return report
+
+def parse_args(arglist):
+    """ Parse command line arguments. """
+    parser = ArgumentParser()
+    parser.add_argument("reps", type=int,
+    help="battles per pairing; the most per pairing if adaptive")
+    parser.add_argument("--seed", type=int, default=0, help="master seed")
+    parser.add_argument("--workers", type=int, default=None,
+    help="worker processes (defaults to the number of CPUs)")
+    parser.add_argument("--chunk-size", type=int, default=64,
+    help="pairings per unit of work")
+    parser.add_argument("--max-turns", type=int, default=MAX_TURNS,
+    help="turns after which a battle is a draw")
+    parser.add_argument("--size", type=int, default=ROSTER_SIZE,
+    help="only use the first SIZE species")
+    parser.add_argument("--rng", choices=BACKENDS, default="python",
+    help="random number backend; numpy is faster")
+    parser.add_argument("--csv", default=None,
+    help="write the win rate matrix to this file")
+    parser.add_argument("--stats-json", default=None,
+    help="keep online win rate, move and turn statistics and write them to "
+    "this JSON file")
+    parser.add_argument("--target-width", type=float, default=None,
+    help="adaptive: stop a pairing once its 95%% win rate interval is at "
+    "most this wide")
+    parser.add_argument("--sprt-delta", type=float, default=None,
+    help="adaptive: stop a pairing once a sequential test tells a win rate "
+    "of 0.5 + DELTA from 0.5 - DELTA")
+    parser.add_argument("--sprt-alpha", type=float, default=0.05,
+    help="error rate of the sequential test")
+    parser.add_argument("--block", type=int, default=ADAPTIVE_BLOCK,
+    help="adaptive: battles per pairing between checks")
+    args = parser.parse_args(arglist)
+    if args.block < 1:
+        parser.error("--block must be at least 1")
+    if args.target_width is not None and not 0 < args.target_width < 1:
+        parser.error("--target-width must be between 0 and 1")
+    if args.sprt_delta is not None and not 0 < args.sprt_delta < 0.5:
+        parser.error("--sprt-delta must be between 0 and 0.5")
+    return args
+
+def main(arglist):
+    """ Run a tournament and report the best species """
+    args = parse_args(arglist)
+    rule = None
+    if args.target_width is not None or args.sprt_delta is not None:
+        rule = StoppingRule(args.target_width, args.sprt_delta, args.sprt_alpha,
+        block=args.block)
+    report = run_tournament(args.reps, args.seed, args.workers,
+    args.chunk_size, args.max_turns, args.size, args.rng,
+    args.stats_json is not None, rule)
+    names = species_names(args.size)
+    print("{} battles in {:.2f}s ({:.1f} battles/sec), {} errors".format(
+        report.battles, report.elapsed, report.battles_per_second(),
+        report.errors))
+    if rule is not None:
+        for reason, label in ((STOP_WIDTH, "reached the target width"),
+        (STOP_SPRT, "decided by the sequential test"),
+        (STOP_CAP, "stopped at the cap of {}".format(args.reps))):
+            pairings, battles, games = report.stops[reason]
+            print("{} pairings {} in {} battles ({} games)".format(pairings,
+            label, battles, games))
+        saved = report.games_saved()
+        if saved is not None and saved[1]:
+            print("  the width pairings saved {} of the {} games a fixed {} "
+            "per pairing needs for the same width ({:.1f}%)".format(saved[0],
+            saved[1], report.fixed_reps, 100 * saved[0] / saved[1]))
+    ranking = sorted(range(args.size),
+    key=lambda i: report.overall_win_rate(i) or 0, reverse=True)
+    for rank, i in enumerate(ranking[:10], 1):
+        print("{:2}. {:12} {:.3f}".format(rank, names[i],
+        report.overall_win_rate(i) or 0))
+    if args.csv:
+        report.write_csv(args.csv, names)
+    if args.stats_json:
+        report.aggregator.write_json(args.stats_json)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])